@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Batch extraction: fan a set of editais out across the worker pool.
+
+The coordinator (``run_batch``) runs in a thread of the API process. It
+expands ZIP uploads, submits one ``extract_document`` task per edital to the
+process pool, gathers the rows in upload order and writes a single combined
+CNE CSV plus a JSON manifest. A failing document is recorded in the manifest
+and never aborts the rest of the batch.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app import metrics
+from app.csv_writer import write_cne_csv
+from app.extraction import extract_document
+
+BATCH_SUFFIXES = (".docx", ".pdf")
+MAX_BATCH_UPLOAD_BYTES = int(os.environ.get("MAX_BATCH_UPLOAD_BYTES", str(1024 * 1024 * 1024)))
+
+Submit = Callable[..., Future]
+
+
+def _safe_name(name: str) -> str:
+    return os.path.basename(name.replace("\\", "/")) or "documento"
+
+
+def expand_uploads(
+    uploads: List[Dict[str, str]],
+    work_dir: str,
+    *,
+    max_bytes: int = MAX_BATCH_UPLOAD_BYTES,
+) -> List[Dict[str, Any]]:
+    """Turn stored uploads into one entry per edital, unpacking ZIP archives.
+
+    Each entry has ``file`` (name shown in the manifest) and either ``path``
+    (ready to extract) or ``error`` (skipped, reported as failed).
+    """
+    documents: List[Dict[str, Any]] = []
+    for upload in uploads:
+        name, path = upload["file"], upload["path"]
+        if not name.lower().endswith(".zip"):
+            if name.lower().endswith(BATCH_SUFFIXES):
+                documents.append({"file": name, "path": path})
+            else:
+                documents.append({"file": name, "error": "tipo de ficheiro não suportado"})
+            continue
+        try:
+            with zipfile.ZipFile(path) as archive:
+                members = [m for m in archive.infolist() if not m.is_dir() and "__MACOSX" not in m.filename]
+                if sum(m.file_size for m in members) > max_bytes:
+                    documents.append({"file": name, "error": f"ZIP descompactado excede {max_bytes} bytes"})
+                    continue
+                for member in members:
+                    label = f"{name}/{member.filename}"
+                    if not member.filename.lower().endswith(BATCH_SUFFIXES):
+                        documents.append({"file": label, "error": "tipo de ficheiro não suportado"})
+                        continue
+                    target = os.path.join(work_dir, f"{len(documents):04d}_{_safe_name(member.filename)}")
+                    with archive.open(member) as src, open(target, "wb") as dst:
+                        while True:
+                            chunk = src.read(1024 * 1024)
+                            if not chunk:
+                                break
+                            dst.write(chunk)
+                    documents.append({"file": label, "path": target})
+        except zipfile.BadZipFile as exc:
+            documents.append({"file": name, "error": f"ZIP inválido: {exc}"})
+    return documents
+
+
+def run_batch(
+    uploads: List[Dict[str, str]],
+    options: Dict[str, Any],
+    *,
+    work_dir: str,
+    out_csv: str,
+    manifest_path: str,
+    submit: Submit,
+) -> Dict[str, Any]:
+    """Extract every edital in *uploads* in parallel and merge the rows."""
+    started = time.perf_counter()
+    documents = expand_uploads(uploads, work_dir)
+
+    futures: List[Optional[Future]] = [
+        submit(extract_document, doc["path"], options) if "path" in doc else None
+        for doc in documents
+    ]
+
+    all_rows: List[Dict[str, Any]] = []
+    entries: List[Dict[str, Any]] = []
+    total_lines = 0
+    for doc, future in zip(documents, futures):
+        entry: Dict[str, Any] = {"file": doc["file"], "status": "failed", "rows": 0}
+        if future is None:
+            entry["error"] = doc["error"]
+        else:
+            try:
+                result = future.result()
+            except Exception as exc:
+                entry["error"] = f"{type(exc).__name__}: {exc}"
+                metrics.DOCUMENTS_TOTAL.inc(kind="batch", status="failed")
+            else:
+                metrics.observe_stages(result["timings"])
+                metrics.observe_clean_text(result["clean_text"])
+                metrics.DOCUMENTS_TOTAL.inc(kind="batch", status="done")
+                metrics.ROWS_TOTAL.inc(len(result["rows"]), kind="batch")
+                metrics.LINES_TOTAL.inc(result["lines"], kind="batch")
+                entry.update(
+                    status="ok",
+                    rows=len(result["rows"]),
+                    lines=result["lines"],
+                    needs_review=result["needs_review"],
+                    encoding=result["encoding"],
+                    seconds=round(result["seconds"], 4),
+                )
+                total_lines += result["lines"]
+                all_rows.extend(result["rows"])
+        entries.append(entry)
+
+    write_cne_csv(all_rows, out_csv, encoding=options["encoding"])
+
+    elapsed = time.perf_counter() - started
+    ok = sum(1 for entry in entries if entry["status"] == "ok")
+    manifest = {
+        "output_csv": out_csv,
+        "manifest": manifest_path,
+        "documents": entries,
+        "docs": len(entries),
+        "ok": ok,
+        "failed": len(entries) - ok,
+        "rows": len(all_rows),
+        "lines": total_lines,
+        "seconds": round(elapsed, 4),
+        "docs_per_s": round(ok / elapsed, 3) if elapsed else 0.0,
+        "rows_per_s": round(len(all_rows) / elapsed, 3) if elapsed else 0.0,
+    }
+    Path(manifest_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(manifest_path).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return manifest
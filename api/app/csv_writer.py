@@ -3,9 +3,8 @@
 
 from pathlib import Path
 from typing import List, Dict
-import pandas as pd
 
-from app.utils_text import clean_text, sanitize_rows
+from app.utils_text import clean_column, sanitize_rows
 
 CNE_COLS = [
     "DTMNFR",
@@ -20,6 +19,9 @@ CNE_COLS = [
     "INDEPENDENTE",
 ]
 
+# Colunas de texto livre que voltam a passar por clean_text antes de escrever.
+CLEAN_COLS = ("NOME_CANDIDATO", "NOME_LISTA", "PARTIDO_PROPONENTE", "SIGLA")
+
 def write_cne_csv(
     rows: List[Dict[str, str]],
     out_path: str,
@@ -34,6 +36,8 @@ def write_cne_csv(
     ``excel_compat=True`` switches the encoding to Windows-1252 for legacy
     compatibility.
     """
+    import pandas as pd
+
     safe_rows = sanitize_rows(rows)
 
     if excel_compat:
@@ -45,9 +49,9 @@ def write_cne_csv(
     df = pd.DataFrame(safe_rows, columns=CNE_COLS)
     df = df.fillna("")
 
-    for col in ("NOME_CANDIDATO", "NOME_LISTA", "PARTIDO_PROPONENTE", "SIGLA"):
+    for col in CLEAN_COLS:
         if col in df.columns:
-            df[col] = df[col].map(clean_text)
+            df[col] = clean_column(df[col])
 
     df.to_csv(out_path_obj, sep=";", index=False, encoding=encoding)
     return str(out_path_obj)
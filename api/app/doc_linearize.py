@@ -3,12 +3,12 @@
 from __future__ import annotations
 
 import argparse
-import importlib.util
 from pathlib import Path
 from typing import Iterable, List, Sequence
 
 from app.utils_text import clean_text
-from extractor.rules import clean_lines, normalize_whitespace
+from extractor.rules import iter_normalized_lines
+from extractor.pdf import iter_pdf_text
 from extractor.pipeline import parse_docx
 
 
@@ -27,19 +27,13 @@ def _iter_clean_lines(raw_lines: Iterable[str]) -> List[str]:
 
 def _lines_from_docx(src_path: Path) -> List[str]:
     text = parse_docx(str(src_path))
-    normalized = normalize_whitespace(text)
-    return _iter_clean_lines(clean_lines(normalized))
+    return _iter_clean_lines(iter_normalized_lines(text))
 
 
 def _lines_from_pdf(src_path: Path) -> List[str]:
-    if importlib.util.find_spec("pdfminer.high_level") is None:
-        raise RuntimeError("PDF support requires the 'pdfminer.six' package to be installed.")
-
-    from pdfminer.high_level import extract_text  # type: ignore
-
-    text = extract_text(str(src_path))
-    normalized = normalize_whitespace(text or "")
-    return _iter_clean_lines(clean_lines(normalized))
+    # Páginas extraídas em paralelo e reunidas por ordem (ver extractor/pdf.py).
+    text = "".join(iter_pdf_text(str(src_path)))
+    return _iter_clean_lines(iter_normalized_lines(text))
 
 
 def _linearize(src_path: Path) -> List[str]:
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""Pluggable extraction engines, run side by side and scored by QA.
+
+An engine turns a :class:`ParsedDocument` into raw CNE rows and pipeline
+metadata. Three are registered here: ``rules`` (the line state machine in
+``extract_pipeline``), ``blocks`` (the header/block extractor of
+``extractor.pipeline``) and ``ner`` (``learn.infer.predict_rows``); more can
+be added with :func:`register_engine`.
+
+:func:`run_engines` runs the requested engines over the same parsed
+document. Engines registered with ``process=True`` (``ner``) go to the
+shared ``app.jobs.TASKS`` executor when it has more than one worker, and
+their ``clean_text`` work is added to the job's; the cheap ones (``rules``,
+``blocks``) run in the job's own process meanwhile, without copying the
+document. The rows of each are finalised and sanitised as usual and checked with
+``qa.collect_suspect_rows``. The best result has the most rows without a QA
+flag, then the fewest flagged rows, then comes first in the request.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.extraction import finalize_rows, iter_document_rows, parse_document, write_outputs
+from app.jobs import TASKS, ExtractionError
+from app.metrics import Timings
+from app.qa import collect_suspect_rows
+from app.utils_text import CLEAN_TEXT_TIMER, clean_text_stats, clean_text_stats_since, sanitize_rows
+from extractor.document import ParsedDocument
+from extractor.pipeline import extract_block_rows, infer_dtmnfr_from_path
+
+EngineFn = Callable[[ParsedDocument, Dict[str, Any]], Tuple[List[Dict[str, Any]], Dict[str, Any]]]
+
+
+@dataclass(frozen=True)
+class Engine:
+    name: str
+    run: EngineFn
+    description: str = ""
+    process: bool = False  # corre no executor partilhado (TASKS) quando este tem mais de um worker
+
+
+ENGINES: Dict[str, Engine] = {}
+
+
+def register_engine(name: str, description: str = "", *, process: bool = False) -> Callable[[EngineFn], EngineFn]:
+    """Decorator: register *fn* as engine *name* (replacing any previous one)."""
+
+    def decorator(fn: EngineFn) -> EngineFn:
+        ENGINES[name] = Engine(name, fn, description, process)
+        return fn
+
+    return decorator
+
+
+def parse_engine_names(value: Optional[str]) -> List[str]:
+    """``"rules, blocks"`` -> ``["rules", "blocks"]``; raises ``ValueError`` on unknown names."""
+    names = [n.strip() for n in (value or "").split(",") if n.strip()]
+    unknown = [n for n in names if n not in ENGINES]
+    if unknown:
+        raise ValueError(f"motor desconhecido: {', '.join(unknown)} (disponíveis: {', '.join(ENGINES)})")
+    return list(dict.fromkeys(names))
+
+
+def _line_engine(document: ParsedDocument, options: Dict[str, Any], use_ner: bool) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    metadata: Dict[str, Any] = {}
+    rows = list(
+        iter_document_rows(
+            document,
+            enable_ia=options["enable_ia"],
+            use_ner=use_ner,
+            ner_model_dir=options["ner_model_dir"],
+            metadata=metadata,
+            timings=Timings(),
+        )
+    )
+    return rows, metadata
+
+
+@register_engine("rules", "máquina de estados por linha (app.extract_pipeline)")
+def _rules_engine(document: ParsedDocument, options: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    return _line_engine(document, options, use_ner=False)
+
+
+@register_engine("ner", "modelo spaCy (app.learn.infer.predict_rows)", process=True)
+def _ner_engine(document: ParsedDocument, options: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    return _line_engine(document, options, use_ner=True)
+
+
+@register_engine("blocks", "cabeçalhos SIGLA - nome e blocos efetivos/suplentes (extractor.pipeline)")
+def _blocks_engine(document: ParsedDocument, options: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    rows, _ = extract_block_rows(
+        document.text,
+        infer_dtmnfr_from_path(document.path),
+        orgao=options.get("orgao"),
+        ord_reset=options["ord_reset"],
+        enable_ia=options["enable_ia"],
+    )
+    return rows, {"needs_review": False, "encoding": document.encoding.to_dict()}
+
+
+@dataclass
+class EngineResult:
+    name: str
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    suspects: List[Dict[str, Any]] = field(default_factory=list)
+    seconds: float = 0.0
+    error: Optional[str] = None
+    # Trabalho de clean_text feito noutro processo (ver _run_engine_task).
+    clean_text: Dict[str, int] = field(default_factory=dict)
+    clean_text_seconds: float = 0.0
+
+    @property
+    def score(self) -> Tuple[int, int]:
+        return (len(self.rows) - len(self.suspects), -len(self.suspects))
+
+    def summary(self) -> Dict[str, Any]:
+        if self.error is not None:
+            return {"error": self.error, "seconds": round(self.seconds, 4)}
+        return {"rows": len(self.rows), "suspeitos": len(self.suspects), "seconds": round(self.seconds, 4)}
+
+
+def run_engine(name: str, document: ParsedDocument, options: Dict[str, Any]) -> EngineResult:
+    """Run one engine and score its finalised rows; errors are captured, not raised."""
+    started = time.perf_counter()
+    result = EngineResult(name)
+    try:
+        rows, metadata = ENGINES[name].run(document, options)
+        finalized = finalize_rows(
+            rows,
+            dtmnfr=infer_dtmnfr_from_path(document.path),
+            orgao=options.get("orgao"),
+            ord_reset=options["ord_reset"],
+        )
+        result.rows = sanitize_rows(finalized)
+        result.metadata = metadata
+        result.suspects = collect_suspect_rows(result.rows, metadata=metadata)
+    except Exception as exc:
+        result.error = f"{type(exc).__name__}: {exc}"
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def _run_engine_task(name: str, document: ParsedDocument, options: Dict[str, Any]) -> EngineResult:
+    """:func:`run_engine` in a task process, recording the ``clean_text`` work it did."""
+    stats_before, seconds_before = clean_text_stats(), CLEAN_TEXT_TIMER.seconds
+    result = run_engine(name, document, options)
+    result.clean_text = clean_text_stats_since(stats_before)
+    result.clean_text_seconds = CLEAN_TEXT_TIMER.seconds - seconds_before
+    return result
+
+
+def run_engines(
+    document: ParsedDocument,
+    names: Iterable[str],
+    options: Dict[str, Any],
+    *,
+    workers: Optional[int] = None,
+) -> List[EngineResult]:
+    """Run *names* over *document*; ``process`` engines go to ``TASKS`` when *workers* > 1."""
+    names = list(names)
+    workers = min(workers or TASKS.workers, len(names))
+    remote = [name for name in names if ENGINES[name].process] if workers > 1 else []
+    if remote:
+        # Só os dados de entrada seguem para o outro processo, sem as linhas já calculadas.
+        shipped = ParsedDocument(document.path, document.paragraphs, document.tables)
+        pending = TASKS.map(_run_engine_task, remote, [shipped] * len(remote), [options] * len(remote))
+    results = {name: run_engine(name, document, options) for name in names if name not in remote}
+    if remote:
+        results.update(zip(remote, pending))
+    return [results[name] for name in names]
+
+
+def best_result(results: List[EngineResult]) -> Optional[EngineResult]:
+    """Highest :attr:`EngineResult.score`; the earliest engine wins ties."""
+    best = None
+    for result in results:
+        if result.error is None and (best is None or result.score > best.score):
+            best = result
+    return best
+
+
+def run_engine_extraction(params: Dict[str, Any]) -> Dict[str, Any]:
+    """``run_extraction`` with ``params["engines"]`` competing on the same document.
+
+    The result names the winner (``engine``) and reports rows, QA flags and
+    duration per engine (``engines``). Raises :class:`ExtractionError` (422)
+    when every engine fails.
+    """
+    timings = Timings()
+    clean_before = clean_text_stats()
+    with CLEAN_TEXT_TIMER.charge(timings, "clean_text"):
+        document = parse_document(params["in_path"], timings)
+        with timings.stage("engines"):
+            results = run_engines(document, params["engines"], params)
+        for r in results:
+            timings.add("clean_text", r.clean_text_seconds)
+        summaries = {r.name: r.summary() for r in results}
+        best = best_result(results)
+        if best is None:
+            raise ExtractionError(422, {"error": "todos_os_motores_falharam", "engines": summaries})
+        result = write_outputs(
+            best.rows,
+            best.metadata,
+            params,
+            timings=timings,
+            lines=len(document.lines(params["enable_ia"])),
+            suspects=best.suspects,
+            extra={"engine": best.name, "engines": summaries},
+        )
+    result["timings"] = timings.as_dict()
+    stats = clean_text_stats_since(clean_before)
+    for r in results:
+        for key, calls in r.clean_text.items():
+            stats[key] += calls
+    result["clean_text"] = stats
+    return result
@@ -8,32 +8,13 @@ Corrige:
   - PARTIDO_PROPONENTE (procura "proposto por ..."; fallback em coligações)
 """
 
-from typing import Any, Dict, List, Tuple
-from app.utils_text import clean_text
-from extractor.pipeline import parse_docx
-from extractor.rules import clean_lines, normalize_whitespace
-from app.utils_listctx import ListContext, detect_orgao, is_new_list_heading
-from app.utils_party import (
-    find_sigla, find_nome_lista, is_coalition,
-    extract_proponente_from_line, normalize_proponente
-)
-
-# Usa as tuas versões reais se já existirem
-try:
-    from app.parsers import is_candidate_line, parse_candidate_fields  # type: ignore
-except Exception:
-    def is_candidate_line(line: str) -> bool:
-        return bool(line and line.strip() and line.strip()[0].isdigit() and " " in line.strip())
-    def parse_candidate_fields(line: str) -> Dict[str, str]:
-        import re
-        d = {"NUM_ORDEM": "", "NOME_CANDIDATO": "", "TIPO": "2", "INDEPENDENTE": "0"}
-        m = re.match(r"^\s*(\d{1,3})[\)\.\-]?\s+(.*)$", line)
-        if m:
-            d["NUM_ORDEM"] = m.group(1)
-            d["NOME_CANDIDATO"] = m.group(2).strip()
-        if "suplente" in line.lower():
-            d["TIPO"] = "3"
-        return d
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from app.utils_text import clean_text, ensure_clean
+from extractor.document import ParsedDocument, load_document
+from app.line_lexer import lex_lines, parse_candidate_fields
+from app.table_extract import CandidateTable
+from app.utils_listctx import ListContext
+from app.utils_party import is_coalition
 
 REQUIRED_FIELDS = (
     "DTMNFR","ORGAO","TIPO","SIGLA","SIMBOLO",
@@ -41,88 +22,118 @@ REQUIRED_FIELDS = (
     "PARTIDO_PROPONENTE","INDEPENDENTE"
 )
 
-def linearize_document_to_lines(doc_path: str, enable_ia: bool = True) -> List[str]:
-    """Return a list of cleaned text lines extracted from *doc_path*.
+def linearize_document_to_lines(
+    doc: Union[str, ParsedDocument], enable_ia: bool = True
+) -> List[str]:
+    """Return a list of cleaned text lines extracted from *doc*.
 
-    The function normalises whitespace, removes bullet markers and applies
-    ``clean_text`` when ``enable_ia`` is ``True`` (mirroring the previous
-    behaviour of the legacy extractor).
+    *doc* is either a DOCX/PDF path or a :class:`ParsedDocument` already
+    loaded with ``load_document``; passing the parsed document lets callers build both
+    line variants (and any fallback) from a single parse. The function
+    normalises whitespace, removes bullet markers and applies ``clean_text``
+    when ``enable_ia`` is ``True`` (mirroring the previous behaviour of the
+    legacy extractor).
     """
 
-    raw_text = parse_docx(doc_path)
-    normalised = normalize_whitespace(raw_text)
-    candidate_lines = clean_lines(normalised)
-
-    lines: List[str] = []
-    for raw in candidate_lines:
-        line = clean_text(raw) if enable_ia else raw.strip()
-        if line:
-            lines.append(line)
-    return lines
+    if not isinstance(doc, ParsedDocument):
+        doc = load_document(doc)
+    return doc.lines(enable_ia)
 
 def _sanitize_row(row: Dict[str, str]) -> Dict[str, str]:
-    row["NOME_CANDIDATO"] = clean_text(row.get("NOME_CANDIDATO", ""))
-    row["NOME_LISTA"] = clean_text(row.get("NOME_LISTA", ""))
-    row["PARTIDO_PROPONENTE"] = clean_text(row.get("PARTIDO_PROPONENTE", ""))
-    row["SIGLA"] = clean_text(row.get("SIGLA", ""))
+    row["NOME_CANDIDATO"] = ensure_clean(row.get("NOME_CANDIDATO", ""))
+    row["NOME_LISTA"] = ensure_clean(row.get("NOME_LISTA", ""))
+    row["PARTIDO_PROPONENTE"] = ensure_clean(row.get("PARTIDO_PROPONENTE", ""))
+    row["SIGLA"] = ensure_clean(row.get("SIGLA", ""))
     return row
 
-def process_document_lines(lines: List[str]) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
-    ctx = ListContext(orgao=None, sigla=None, nome_lista=None, simbolo=None, needs_review=0)
-    out_rows: List[Dict[str, str]] = []
-
-    for raw in lines:
-        # Limpeza logo à cabeça — isto já resolve "PESSOAS â€“ ..." -> "PESSOAS – ..."
-        line = clean_text(raw)
-
-        # 1) alternância de órgão
-        ctx.orgao = detect_orgao(line, ctx.orgao)
-
-        # 2) início de nova lista — reestimar SIGLA/NOME_LISTA e LIMPAR nome_lista
-        if is_new_list_heading(line):
-            sig = find_sigla(line) or ctx.sigla
-            nome = find_nome_lista(line) or ctx.nome_lista
-            ctx.sigla = sig
-            ctx.nome_lista = clean_text(nome) if nome else None  # <— limpar aqui
-            continue
+def _candidate_row(item: Dict[str, str], ctx: ListContext, proponente_inline: Optional[str]) -> Dict[str, str]:
+    """Complete one candidate's fields with the list context."""
+    # Limpeza de campos textuais por linha
+    item["NOME_CANDIDATO"] = clean_text(item.get("NOME_CANDIDATO", ""))
+    item["NOME_LISTA"] = clean_text(ctx.nome_lista) if ctx.nome_lista else clean_text(item.get("NOME_LISTA", ""))
 
-        # 3) partido proponente inline (em coligações)
-        proponente_inline = normalize_proponente(extract_proponente_from_line(line))
+    # Contexto
+    item["ORGAO"] = ctx.orgao or item.get("ORGAO") or "CM"
+    if ctx.sigla:
+        item["SIGLA"] = ctx.sigla
 
-        # 4) candidatos
-        if is_candidate_line(line):
-            item = parse_candidate_fields(line)
+    # PARTIDO_PROPONENTE
+    sigla = item.get("SIGLA") or ctx.sigla or ""
+    if is_coalition(sigla):
+        item["PARTIDO_PROPONENTE"] = proponente_inline or sigla
+        if not proponente_inline:
+            ctx.needs_review = 1
+    else:
+        item["PARTIDO_PROPONENTE"] = item.get("PARTIDO_PROPONENTE") or sigla
 
-            # Limpeza de campos textuais por linha
-            item["NOME_CANDIDATO"] = clean_text(item.get("NOME_CANDIDATO", ""))
-            item["NOME_LISTA"] = clean_text(ctx.nome_lista) if ctx.nome_lista else clean_text(item.get("NOME_LISTA", ""))
+    if sigla == "ICA":
+        item["INDEPENDENTE"] = "1"
 
-            # Contexto
-            item["ORGAO"] = ctx.orgao or item.get("ORGAO") or "CM"
-            if ctx.sigla:
-                item["SIGLA"] = ctx.sigla
+    for k in REQUIRED_FIELDS:
+        item.setdefault(k, "")
 
-            # PARTIDO_PROPONENTE
-            sigla = item.get("SIGLA") or ctx.sigla or ""
-            if is_coalition(sigla):
-                item["PARTIDO_PROPONENTE"] = proponente_inline or sigla
-                if not proponente_inline:
-                    ctx.needs_review = 1
-            else:
-                item["PARTIDO_PROPONENTE"] = item.get("PARTIDO_PROPONENTE") or sigla
+    # Limpeza final de segurança
+    item = _sanitize_row(item)
 
-            if sigla == "ICA":
-                item["INDEPENDENTE"] = "1"
+    # Passagem final (belt-and-braces)
+    return _sanitize_row(item)
+
+def process_document_lines(lines: List[str]) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+    metadata: Dict[str, Any] = {}
+    out_rows = list(iter_document_lines(lines, metadata))
+    return out_rows, metadata
+
+def advance_context(token: Any, ctx: ListContext) -> None:
+    """Apply the órgão switch and list heading of one lexed line to *ctx*."""
+    # 1) alternância de órgão
+    if token.orgao:
+        ctx.orgao = token.orgao
+
+    # 2) início de nova lista — reestimar SIGLA/NOME_LISTA e LIMPAR nome_lista
+    if token.heading:
+        sig = token.sigla or ctx.sigla
+        nome = token.nome_lista or ctx.nome_lista
+        ctx.sigla = sig
+        ctx.nome_lista = clean_text(nome) if nome else None  # <— limpar aqui
+
+def iter_document_lines(
+    lines: Iterable[Any],
+    metadata: Optional[Dict[str, Any]] = None,
+    context: Optional[ListContext] = None,
+) -> Iterator[Dict[str, str]]:
+    """Yield candidate rows as soon as each line is classified.
+
+    Streaming variant of :func:`process_document_lines`; ``needs_review`` is
+    written into *metadata* once the lines are exhausted. *lines* may hold
+    :class:`CandidateTable` items (see ``table_extract.document_items``),
+    whose rows take the list context of the lines before them, and already
+    lexed tokens. *context* starts the walk in the middle of a document
+    (see ``app.sections``); it is updated in place.
+    """
+    if context is None:
+        context = ListContext(orgao=None, sigla=None, nome_lista=None, simbolo=None, needs_review=0)
+    ctx = context
+
+    # Cada linha chega já limpa e classificada pelo lexer (ver app/line_lexer.py);
+    # as tabelas de candidatos chegam já lidas coluna a coluna (app/table_extract.py)
+    for token in lex_lines(lines):
+        if isinstance(token, CandidateTable):
+            for fields in token.rows:
+                yield _candidate_row(dict(fields), ctx, fields.get("PARTIDO_PROPONENTE"))
+            continue
+        line = token.line
 
-            for k in REQUIRED_FIELDS:
-                item.setdefault(k, "")
+        # 1) alternância de órgão; 2) início de nova lista
+        advance_context(token, ctx)
+        if token.heading:
+            continue
 
-            # Limpeza final de segurança
-            item = _sanitize_row(item)
+        # 3) partido proponente inline (em coligações)
+        proponente_inline = token.proponente
 
-            out_rows.append(item)
+        # 4) candidatos
+        if token.candidate:
+            yield _candidate_row(parse_candidate_fields(line), ctx, proponente_inline)
 
-    # Passagem final (belt-and-braces)
-    out_rows = [_sanitize_row(r) for r in out_rows]
-    metadata: Dict[str, Any] = {"needs_review": bool(ctx.needs_review)}
-    return out_rows, metadata
+    if metadata is not None:
+        metadata["needs_review"] = bool(ctx.needs_review)
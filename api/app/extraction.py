@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""Synchronous extraction job executed inside the worker process pool.
+
+``run_extraction`` holds the body that used to live in ``main.extract``:
+linearise the upload, run the rule engine (or the NER model), finalise the
+rows and write the CNE/QA CSV files. It only receives picklable arguments
+so it can be shipped to a ``ProcessPoolExecutor``.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.extract_pipeline import iter_document_lines, linearize_document_to_lines
+from app.learn.infer import predict_rows
+from app.csv_writer import write_cne_csv
+from app.utils_text import CLEAN_TEXT_TIMER, clean_text_stats, clean_text_stats_since, sanitize_rows
+from app.metrics import Timings
+from app.qa import collect_suspect_rows, write_qa_csv
+from app.jobs import ExtractionError
+from app.result_cache import ResultCache
+from app.sections import IncrementalRules, SectionStore
+from app.table_extract import document_items
+from extractor.document import ParsedDocument, load_document
+from extractor.pdf import is_pdf
+from extractor.pipeline import infer_dtmnfr_from_path
+
+ROW_FIELDS = (
+    "DTMNFR",
+    "ORGAO",
+    "TIPO",
+    "SIGLA",
+    "SIMBOLO",
+    "NOME_LISTA",
+    "NUM_ORDEM",
+    "NOME_CANDIDATO",
+    "PARTIDO_PROPONENTE",
+    "INDEPENDENTE",
+)
+
+LineEngine = Callable[..., Iterator[Dict[str, Any]]]
+
+
+def iter_finalized_rows(
+    rows: Iterable[Dict[str, Any]],
+    *,
+    dtmnfr: str,
+    orgao: Optional[str],
+    ord_reset: bool,
+) -> Iterator[Dict[str, Any]]:
+    """Fill missing fields, apply request overrides and renumber ``NUM_ORDEM``.
+
+    Rows are handled one at a time (the ``ord_reset`` counters are
+    incremental), so this also works on a stream of rows.
+    """
+    counters: Dict[Tuple[Any, ...], int] = {}
+    for row in rows:
+        item = dict(row)
+        for field in ROW_FIELDS:
+            item.setdefault(field, "")
+        if dtmnfr:
+            item["DTMNFR"] = item.get("DTMNFR") or dtmnfr
+        if orgao:
+            item["ORGAO"] = orgao
+
+        if ord_reset:
+            tipo = str(item.get("TIPO", "")).strip()
+            if tipo in {"2", "3"}:
+                key = (
+                    item.get("DTMNFR", ""),
+                    item.get("ORGAO", ""),
+                    item.get("SIGLA", ""),
+                    item.get("NOME_LISTA", ""),
+                    tipo,
+                )
+                counters[key] = counters.get(key, 0) + 1
+                item["NUM_ORDEM"] = str(counters[key])
+        yield item
+
+
+def finalize_rows(
+    rows: List[Dict[str, Any]],
+    *,
+    dtmnfr: str,
+    orgao: Optional[str],
+    ord_reset: bool,
+) -> List[Dict[str, Any]]:
+    """List form of :func:`iter_finalized_rows`."""
+    return list(iter_finalized_rows(rows, dtmnfr=dtmnfr, orgao=orgao, ord_reset=ord_reset))
+
+
+def iter_rows(
+    in_path: str,
+    *,
+    enable_ia: bool,
+    use_ner: bool,
+    ner_model_dir: str,
+    metadata: Dict[str, Any],
+    timings: Optional[Timings] = None,
+    rules: LineEngine = iter_document_lines,
+) -> Iterator[Dict[str, Any]]:
+    """Linearise *in_path* (DOCX or PDF) and yield rows from the NER model or the rule engine.
+
+    ``needs_review``, the document's encoding diagnosis (``encoding``) and
+    the number of lines read (``lines``) are recorded in *metadata*;
+    per-stage durations go to *timings*. The rule engine reads candidate
+    tables column by column (``table_extract``) and the other lines as
+    text. With ``enable_ia`` and no rows, the rule engine is re-run on the
+    plain line variant of the same parsed document. *rules* replaces
+    ``iter_document_lines`` (see ``app.sections.IncrementalRules``).
+    """
+    timings = timings if timings is not None else Timings()
+    document = parse_document(in_path, timings)
+    yield from iter_document_rows(
+        document,
+        enable_ia=enable_ia,
+        use_ner=use_ner,
+        ner_model_dir=ner_model_dir,
+        metadata=metadata,
+        timings=timings,
+        rules=rules,
+    )
+
+
+def parse_document(in_path: str, timings: Timings) -> ParsedDocument:
+    """``load_document`` timed as the ``parse_docx``/``parse_pdf`` stage."""
+    with timings.stage("parse_pdf" if is_pdf(in_path) else "parse_docx"):
+        return load_document(in_path)
+
+
+def iter_document_rows(
+    document: ParsedDocument,
+    *,
+    enable_ia: bool,
+    use_ner: bool,
+    ner_model_dir: str,
+    metadata: Dict[str, Any],
+    timings: Timings,
+    rules: LineEngine = iter_document_lines,
+) -> Iterator[Dict[str, Any]]:
+    """:func:`iter_rows` over an already parsed document."""
+    with timings.stage("linearize"):
+        lines = linearize_document_to_lines(document, enable_ia=enable_ia)
+    metadata.setdefault("needs_review", False)
+    metadata["encoding"] = document.encoding.to_dict()
+    metadata["lines"] = len(lines)
+
+    if use_ner:
+        yield from timings.iterate("ner", predict_rows(lines, model_dir=ner_model_dir))
+        return
+
+    with timings.stage("linearize"):
+        items = document_items(document, enable_ia)
+    produced = False
+    for row in timings.iterate("rules", rules(items, metadata)):
+        produced = True
+        yield row
+    if enable_ia and not produced:
+        with timings.stage("linearize"):
+            fallback_items = document_items(document, enable_ia=False)
+        yield from timings.iterate("rules", rules(fallback_items, metadata))
+
+
+def extract_rows(
+    in_path: str,
+    *,
+    enable_ia: bool,
+    use_ner: bool,
+    ner_model_dir: str,
+    timings: Optional[Timings] = None,
+    rules: LineEngine = iter_document_lines,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any], int]:
+    """Linearise *in_path* and run the NER model or the rule engine over it.
+
+    Returns the raw rows, the pipeline metadata and the number of lines read.
+    """
+    metadata: Dict[str, Any] = {}
+    rows = list(
+        iter_rows(
+            in_path,
+            enable_ia=enable_ia,
+            use_ner=use_ner,
+            ner_model_dir=ner_model_dir,
+            metadata=metadata,
+            timings=timings,
+            rules=rules,
+        )
+    )
+    n_lines = metadata.pop("lines")
+    return rows, metadata, n_lines
+
+
+def extract_document(in_path: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Batch worker: extract one document and return its sanitised rows."""
+    started = time.perf_counter()
+    timings = Timings()
+    clean_before = clean_text_stats()
+    with CLEAN_TEXT_TIMER.charge(timings, "clean_text"):
+        rows, pipeline_meta, n_lines = extract_rows(
+            in_path,
+            enable_ia=options["enable_ia"],
+            use_ner=options["use_ner"],
+            ner_model_dir=options["ner_model_dir"],
+            timings=timings,
+        )
+        processed_rows = finalize_rows(
+            rows,
+            dtmnfr=infer_dtmnfr_from_path(in_path),
+            orgao=options.get("orgao"),
+            ord_reset=options["ord_reset"],
+        )
+        with timings.stage("sanitize"):
+            safe_rows = sanitize_rows(processed_rows)
+    return {
+        "rows": safe_rows,
+        "lines": n_lines,
+        "needs_review": bool(pipeline_meta.get("needs_review")),
+        "encoding": pipeline_meta.get("encoding"),
+        "seconds": time.perf_counter() - started,
+        "timings": timings.as_dict(),
+        "clean_text": clean_text_stats_since(clean_before),
+    }
+
+
+def run_extraction(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the full extraction for one uploaded document.
+
+    ``params`` carries the upload path, the output CSV path and the request
+    options. Raises :class:`ExtractionError` (422) when ``strict_templates``
+    is set and the classification is weak.
+
+    With ``params["sections"]`` the rule engine goes list section by list
+    section (``app.sections``): sections already extracted for this
+    document or for the version it amends (``previous``) are reused, and
+    the result reports them (``sections``) and the lists changed since
+    ``previous`` (``listas``).
+    """
+    in_path = params["in_path"]
+    timings = Timings()
+    clean_before = clean_text_stats()
+    incremental, rules = _incremental_rules(params)
+
+    with CLEAN_TEXT_TIMER.charge(timings, "clean_text"):
+        rows, pipeline_meta, n_lines = extract_rows(
+            in_path,
+            enable_ia=params["enable_ia"],
+            use_ner=params["use_ner"],
+            ner_model_dir=params["ner_model_dir"],
+            timings=timings,
+            rules=rules,
+        )
+
+        processed_rows = finalize_rows(
+            rows,
+            dtmnfr=infer_dtmnfr_from_path(in_path),
+            orgao=params.get("orgao"),
+            ord_reset=params["ord_reset"],
+        )
+
+        with timings.stage("sanitize"):
+            safe_rows = sanitize_rows(processed_rows)
+        extra = _section_report(params, incremental) if incremental else None
+        result = write_outputs(safe_rows, pipeline_meta, params, timings=timings, lines=n_lines, extra=extra)
+    result["timings"] = timings.as_dict()
+    result["clean_text"] = clean_text_stats_since(clean_before)
+    return result
+
+
+def _incremental_rules(params: Dict[str, Any]) -> Tuple[Optional[IncrementalRules], LineEngine]:
+    config = params.get("sections")
+    if not config or params["use_ner"]:
+        return None, iter_document_lines
+    store = SectionStore(config["root"], config["max_bytes"])
+    previous = store.load(config["previous"]) if config.get("previous") else None
+    incremental = IncrementalRules(store.load(config["key"]), previous)
+    return incremental, incremental
+
+
+def _section_report(params: Dict[str, Any], incremental: IncrementalRules) -> Dict[str, Any]:
+    """Store the document's sections and describe what was reused and what changed."""
+    config = params["sections"]
+    current = incremental.stored()
+    SectionStore(config["root"], config["max_bytes"]).save(config["key"], current)
+    report: Dict[str, Any] = {"sections": incremental.summary()}
+    changes = incremental.changes()
+    if changes is not None:
+        report["listas"] = changes
+    return report
+
+
+def write_outputs(
+    safe_rows: List[Dict[str, Any]],
+    pipeline_meta: Dict[str, Any],
+    params: Dict[str, Any],
+    *,
+    timings: Optional[Timings] = None,
+    lines: int = 0,
+    suspects: Optional[List[Dict[str, Any]]] = None,
+    extra: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Run QA over the final rows, write the CNE/QA CSVs and fill the cache.
+
+    *suspects* skips the QA pass when the caller already ran it; *extra*
+    keys are added to the result before it is cached.
+    """
+    timings = timings if timings is not None else Timings()
+    in_path = params["in_path"]
+    out_csv = params["out_csv"]
+    if suspects is not None:
+        suspect_rows = list(suspects)
+    else:
+        with timings.stage("qa"):
+            suspect_rows = collect_suspect_rows(safe_rows, metadata=pipeline_meta)
+
+    if params.get("strict_templates") and (not safe_rows or suspect_rows):
+        detail = {
+            "error": "classificacao_fraca",
+            "rows": len(safe_rows),
+            "suspeitos": len(suspect_rows),
+        }
+        raise ExtractionError(422, detail)
+
+    with timings.stage("write_cne_csv"):
+        write_cne_csv(safe_rows, out_csv, encoding=params["encoding"])
+
+    qa_path = None
+    if params.get("qa") or suspect_rows:
+        with timings.stage("qa"):
+            qa_path, suspect_rows = write_qa_csv(
+                safe_rows,
+                out_csv,
+                metadata=pipeline_meta,
+                suspects=suspect_rows,
+            )
+
+    orgoes = sorted({row.get("ORGAO", "") for row in safe_rows if row.get("ORGAO")})
+    siglas = sorted({row.get("SIGLA", "") for row in safe_rows if row.get("SIGLA")})
+
+    result = {
+        "input": in_path,
+        "sha256": params.get("sha256"),
+        "output_csv": out_csv,
+        "rows": len(safe_rows),
+        "lines": lines,
+        "orgoes": orgoes,
+        "siglas": siglas,
+        "qa_csv": qa_path,
+        "suspeitos": len(suspect_rows),
+        "needs_review": bool(pipeline_meta.get("needs_review")),
+        "encoding": pipeline_meta.get("encoding"),
+        "cached": False,
+        **(extra or {}),
+    }
+
+    cache = params.get("cache")
+    if cache:
+        ResultCache(cache["root"], cache["max_bytes"]).put(cache["key"], result)
+    return result
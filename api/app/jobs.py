@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""Background job registry backed by a bounded process pool.
+
+CPU-bound stages (DOCX parsing, rule/NER extraction, CSV export) run in a
+``ProcessPoolExecutor`` so the event loop stays free for ``/health`` and
+other requests. Jobs are tracked in memory and addressed by a random,
+collision-free identifier.
+
+Work that one job splits further (PDF page ranges, rule-engine sections,
+the NER engine) goes to :data:`TASKS`, a single executor per process
+instead of a pool per document.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import multiprocessing.util
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from app import metrics
+
+EXTRACT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", "0")) or (os.cpu_count() or 1)
+MAX_PENDING_JOBS = int(os.environ.get("MAX_PENDING_JOBS", "64"))
+JOB_HISTORY = int(os.environ.get("JOB_HISTORY", "1000"))
+BATCH_COORDINATORS = int(os.environ.get("BATCH_COORDINATORS", "2"))
+# Processos auxiliares de cada job: os núcleos que sobram a cada um dos EXTRACT_WORKERS.
+TASK_WORKERS = int(os.environ.get("TASK_WORKERS", "0")) or max(1, (os.cpu_count() or 1) // EXTRACT_WORKERS)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class ExtractionError(Exception):
+    """Error raised inside a worker that maps to an HTTP status code."""
+
+    def __init__(self, status_code: int, detail: Any) -> None:
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class QueueFullError(RuntimeError):
+    """Raised when ``MAX_PENDING_JOBS`` jobs are already waiting."""
+
+
+def new_job_id() -> str:
+    """Return a random identifier safe to embed in file names."""
+    return uuid.uuid4().hex
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[Dict[str, Any]] = None
+    future: Optional[Future] = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        status = self.status
+        if status == QUEUED and self.future is not None and self.future.running():
+            status = RUNNING
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobStore:
+    """Thread-safe in-memory registry of jobs with bounded history."""
+
+    def __init__(self, workers: int = EXTRACT_WORKERS, history: int = JOB_HISTORY) -> None:
+        self.workers = max(1, workers)
+        self.history = max(1, history)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._coordinators = ThreadPoolExecutor(
+            max_workers=max(1, BATCH_COORDINATORS), thread_name_prefix="job-coordinator"
+        )
+
+    # -- pool -----------------------------------------------------------------
+    def pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _reset_pool(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    # -- registry -------------------------------------------------------------
+    def create(self, kind: str, job_id: Optional[str] = None) -> Job:
+        job = Job(id=job_id or new_job_id(), kind=kind)
+        with self._lock:
+            pending = sum(1 for j in self._jobs.values() if j.status in (QUEUED, RUNNING))
+            if pending >= MAX_PENDING_JOBS:
+                raise QueueFullError(f"{pending} jobs pendentes")
+            self._jobs[job.id] = job
+            self._trim()
+        return job
+
+    def discard(self, job: Job) -> None:
+        """Forget *job* (a request that was rejected before it was accepted)."""
+        with self._lock:
+            self._jobs.pop(job.id, None)
+
+    def pending_by_kind(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                if job.status in (QUEUED, RUNNING):
+                    counts[job.kind] = counts.get(job.kind, 0) + 1
+            return counts
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _trim(self) -> None:
+        excess = len(self._jobs) - self.history
+        if excess <= 0:
+            return
+        for key in [k for k, j in self._jobs.items() if j.status in (DONE, FAILED)][:excess]:
+            del self._jobs[key]
+
+    def start(self, job: Job) -> None:
+        job.status = RUNNING
+
+    def finish(self, job: Job, result: Dict[str, Any]) -> None:
+        job.result = result
+        job.finished_at = time.time()
+        job.status = DONE
+        metrics.record_job(job.kind, DONE, job.finished_at - job.created_at, result)
+
+    def fail(self, job: Job, exc: BaseException) -> None:
+        if isinstance(exc, ExtractionError):
+            job.error = {"status_code": exc.status_code, "detail": exc.detail}
+        else:
+            job.error = {"status_code": 500, "detail": f"{type(exc).__name__}: {exc}"}
+        job.finished_at = time.time()
+        job.status = FAILED
+        metrics.record_job(job.kind, FAILED, job.finished_at - job.created_at)
+
+    # -- execution ------------------------------------------------------------
+    def submit(self, job: Job, fn: Callable[..., Dict[str, Any]], *args: Any) -> Job:
+        """Run ``fn(*args)`` in the process pool and record its outcome on *job*."""
+        return self._track(job, self.submit_task(fn, *args))
+
+    def submit_task(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Submit a bare task to the process pool, recreating it if it broke."""
+        try:
+            return self.pool().submit(fn, *args)
+        except BrokenProcessPool:
+            self._reset_pool()
+            return self.pool().submit(fn, *args)
+
+    def coordinate(self, job: Job, fn: Callable[..., Dict[str, Any]], *args: Any) -> Job:
+        """Run ``fn(*args)`` in a coordinator thread of this process.
+
+        Used by jobs that fan work out to the process pool themselves (e.g.
+        batch extraction) and only gather the results here.
+        """
+        return self._track(job, self._coordinators.submit(fn, *args))
+
+    def _track(self, job: Job, future: Future) -> Job:
+        job.future = future
+
+        def _done(fut: Future) -> None:
+            if fut.cancelled():
+                self.fail(job, RuntimeError("job cancelado"))
+                return
+            exc = fut.exception()
+            if exc is not None:
+                self.fail(job, exc)
+                if isinstance(exc, BrokenProcessPool):
+                    self._reset_pool()
+            else:
+                self.finish(job, fut.result())
+
+        future.add_done_callback(_done)
+        return job
+
+
+class TaskPool:
+    """Executor shared by everything that splits one job into parallel tasks.
+
+    There is one per process, created on first use with the ``forkserver``
+    start method (``spawn`` where it is missing). The caller is a job worker
+    or the threaded server, and a plain fork of either can copy a lock held
+    by another thread. Callers run their tasks in-process when ``workers``
+    is 1, which is the default while the job pool already uses every core.
+    """
+
+    def __init__(self, workers: int = TASK_WORKERS) -> None:
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                # Num worker do JOBS, a saída do processo espera pelos filhos antes dos
+                # atexit do concurrent.futures: o executor tem de ser fechado antes.
+                multiprocessing.util.Finalize(None, self.shutdown, exitpriority=10)
+            return self._pool
+
+    def map(self, fn: Callable[..., Any], *iterables: Iterable[Any]) -> Iterator[Any]:
+        """``Executor.map`` on the shared processes (results in submission order)."""
+        try:
+            return self.executor().map(fn, *iterables)
+        except BrokenProcessPool:
+            self.shutdown(wait=False)
+            return self.executor().map(fn, *iterables)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _after_fork(self) -> None:
+        # Um worker do JOBS herda a cópia do servidor: cria o seu próprio executor.
+        self._lock = threading.Lock()
+        self._pool = None
+        _forget_forkserver()
+
+
+def _forget_forkserver() -> None:
+    """Drop the parent's forkserver in a forked child, so the child starts its own.
+
+    ``multiprocessing.forkserver`` keeps the server's pid and sockets in a
+    module global; a forked child inherits them, and its first
+    ``ensure_running`` fails with ``ChildProcessError`` (the pid is not its
+    child). The fields are those set by ``ForkServer.__init__``.
+    """
+    from multiprocessing import forkserver
+
+    server = forkserver._forkserver
+    if server._forkserver_alive_fd is not None:
+        try:
+            os.close(server._forkserver_alive_fd)
+        except OSError:
+            pass
+    server._forkserver_address = None
+    server._forkserver_alive_fd = None
+    server._forkserver_pid = None
+    server._inherited_fds = None
+    server._lock = threading.Lock()
+
+
+JOBS = JobStore()
+TASKS = TaskPool()
+os.register_at_fork(after_in_child=TASKS._after_fork)
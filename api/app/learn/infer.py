@@ -1,31 +1,44 @@
-"""Inference utilities for NER-driven candidate extraction."""
+"""Inference utilities for NER-driven candidate extraction.
+
+:func:`predict_rows` works in two passes: the list context is resolved line
+by line and the candidate texts are collected, then all texts go through
+``nlp.pipe`` in batches of ``NER_BATCH_SIZE`` (in ``NER_N_PROCESS``
+processes). Components that never touch the entities (``NER_SKIP_PIPES``,
+plus ``NER_TOKEN_PIPES`` when no ruler reads their attributes) are disabled;
+everything else runs as in a plain ``nlp(text)`` call. The model output
+never feeds the list context, so the rows are the same as calling ``nlp``
+once per candidate.
+"""
 from __future__ import annotations
 
+import os
 import re
 from functools import lru_cache
-from typing import Dict, List
-
-import spacy
-from spacy.language import Language
-from spacy.tokens import Doc
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
 
+from app.line_lexer import lex_lines
 from app.utils_text import clean_text
-from app.utils_listctx import ListContext, detect_orgao, is_new_list_heading
-from app.utils_party import (
-    extract_proponente_from_line,
-    find_nome_lista,
-    find_sigla,
-    is_coalition,
-    normalize_proponente,
-)
+from app.utils_listctx import ListContext
+from app.utils_party import is_coalition
 
+if TYPE_CHECKING:  # spaCy só é importado quando o modelo é carregado
+    from spacy.language import Language
+    from spacy.tokens import Doc
 
-_ORDER_RE = re.compile(r"^\s*(\d{1,3})[\)\.-]?\s+(.*)$")
+NER_BATCH_SIZE = int(os.environ.get("NER_BATCH_SIZE", "256"))
+NER_N_PROCESS = int(os.environ.get("NER_N_PROCESS", "1"))
+# Componentes que não mexem nas entidades; ficam desligados durante a inferência.
+NER_SKIP_PIPES = ("parser", "senter", "textcat", "textcat_multilabel")
+# Atributos de token que um padrão de entity_ruler/span_ruler pode usar (LEMMA, POS, TAG).
+NER_TOKEN_PIPES = ("tagger", "lemmatizer")
+NER_RULERS = ("entity_ruler", "span_ruler")
 
 
 @lru_cache(maxsize=1)
 def _load_model(model_dir: str) -> Language:
     """Load and cache the spaCy model used for NER."""
+    import spacy
+
     return spacy.load(model_dir)
 
 
@@ -40,6 +53,18 @@ def _extract_candidate_name(doc: Doc, text: str) -> str:
     return clean_text(fallback)
 
 
+def _candidate_names(
+    nlp: Language, texts: Sequence[str], *, batch_size: int, n_process: int
+) -> List[str]:
+    """Run *texts* through ``nlp.pipe`` and pick each candidate's name."""
+    skip = NER_SKIP_PIPES
+    if not any(name in NER_RULERS for name in nlp.pipe_names):
+        skip += NER_TOKEN_PIPES
+    disable = [name for name in nlp.pipe_names if name in skip]
+    docs = nlp.pipe(texts, batch_size=batch_size, n_process=n_process, disable=disable)
+    return [_extract_candidate_name(doc, text) for doc, text in zip(docs, texts)]
+
+
 def _base_row() -> Dict[str, str]:
     return {
         "DTMNFR": "",
@@ -55,59 +80,55 @@ def _base_row() -> Dict[str, str]:
     }
 
 
-def predict_rows(lines: List[str], model_dir: str = "/app/models/ner_pt") -> List[Dict[str, str]]:
+def predict_rows(
+    lines: List[str],
+    model_dir: str = "/app/models/ner_pt",
+    *,
+    batch_size: Optional[int] = None,
+    n_process: Optional[int] = None,
+) -> List[Dict[str, str]]:
     """Predict CNE-style rows from raw document lines using an NER model."""
     nlp = _load_model(model_dir)
     ctx = ListContext(orgao=None, sigla=None, nome_lista=None, simbolo=None, needs_review=0)
     ctx.extra["proponente"] = None
 
     rows: List[Dict[str, str]] = []
+    texts: List[str] = []
 
-    for raw_line in lines:
-        line = clean_text(raw_line)
-        if not line:
-            continue
-
-        ctx.orgao = detect_orgao(line, ctx.orgao)
+    for token in lex_lines(lines):
+        if token.orgao:
+            ctx.orgao = token.orgao
 
-        if is_new_list_heading(line):
-            new_sigla = find_sigla(line)
-            if new_sigla:
-                ctx.sigla = new_sigla
-            new_nome = find_nome_lista(line)
-            if new_nome:
-                ctx.nome_lista = clean_text(new_nome)
+        if token.heading:
+            if token.sigla:
+                ctx.sigla = token.sigla
+            if token.nome_lista:
+                ctx.nome_lista = clean_text(token.nome_lista)
             ctx.extra["proponente"] = None
             continue
 
-        nome_lista = find_nome_lista(line)
-        if nome_lista:
-            ctx.nome_lista = clean_text(nome_lista)
+        if token.nome_lista is not None:
+            ctx.nome_lista = clean_text(token.nome_lista)
             continue
 
-        sigla_inline = find_sigla(line)
+        sigla_inline = token.sigla
         if sigla_inline and sigla_inline != ctx.sigla:
             ctx.sigla = sigla_inline
 
-        proponente_inline = normalize_proponente(extract_proponente_from_line(line))
-        if proponente_inline:
-            ctx.extra["proponente"] = proponente_inline
+        if token.proponente:
+            ctx.extra["proponente"] = token.proponente
 
-        match = _ORDER_RE.match(line)
-        if not match:
+        if token.order is None:
             continue
 
-        num_ordem, remainder = match.groups()
+        num_ordem, remainder = token.order
         candidate_text = remainder.strip()
         if not candidate_text:
             continue
 
-        doc = nlp(candidate_text)
-        candidate_name = _extract_candidate_name(doc, candidate_text)
-
+        # NOME_CANDIDATO vem do modelo, no fim, com todos os textos de uma vez.
         row = _base_row()
         row["NUM_ORDEM"] = num_ordem
-        row["NOME_CANDIDATO"] = candidate_name
         row["ORGAO"] = ctx.orgao or "CM"
         row["NOME_LISTA"] = clean_text(ctx.nome_lista) if ctx.nome_lista else ""
 
@@ -132,5 +153,14 @@ def predict_rows(lines: List[str], model_dir: str = "/app/models/ner_pt") -> Lis
             ctx.nome_lista = row["NOME_LISTA"]
 
         rows.append(row)
-
+        texts.append(candidate_text)
+
+    names = _candidate_names(
+        nlp,
+        texts,
+        batch_size=batch_size or NER_BATCH_SIZE,
+        n_process=n_process or NER_N_PROCESS,
+    )
+    for row, name in zip(rows, names):
+        row["NOME_CANDIDATO"] = name
     return rows
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""Single-pass lexer for linearised document lines.
+
+Both extraction engines (the rule engine in ``extract_pipeline`` and the NER
+engine in ``learn.infer``) used to run the órgão, heading, NOME_LISTA,
+sigla, proponente and candidate regexes on every line on their own.
+:func:`lex_lines` classifies each line once into a :class:`LineToken` with
+the captured fields, and the engines only walk the tokens.
+
+The token is built in one call per line. The órgão switch and the heading
+test are computed up front; every other field is computed on first access
+and cached on the token, so each engine only pays for the fields it reads.
+``kind`` gives the line's main role, by priority: heading, NOME_LISTA label,
+candidate, efetivos/suplentes marker, proponente, órgão switch, noise. The
+fields stay available whatever the kind, because a line can play several
+roles (a heading that switches órgão, a candidate followed by ``- PS``).
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from app.utils_listctx import NEW_LIST_PATTERNS, detect_orgao
+from app.utils_party import extract_proponente_from_line, find_nome_lista, find_sigla, normalize_proponente
+from app.utils_text import clean_text
+from extractor.rules import EFETIVOS_REGEX, SUPLENTES_REGEX
+
+# Usa as tuas versões reais se já existirem
+try:
+    from app.parsers import is_candidate_line, parse_candidate_fields  # type: ignore
+except Exception:
+    def is_candidate_line(line: str) -> bool:
+        return bool(line and line.strip() and line.strip()[0].isdigit() and " " in line.strip())
+    def parse_candidate_fields(line: str) -> Dict[str, str]:
+        d = {"NUM_ORDEM": "", "NOME_CANDIDATO": "", "TIPO": "2", "INDEPENDENTE": "0"}
+        m = re.match(r"^\s*(\d{1,3})[\)\.\-]?\s+(.*)$", line)
+        if m:
+            d["NUM_ORDEM"] = m.group(1)
+            d["NOME_CANDIDATO"] = m.group(2).strip()
+        if "suplente" in line.lower():
+            d["TIPO"] = "3"
+        return d
+
+HEADING = "heading"
+NOME_LISTA = "nome_lista"
+CANDIDATE = "candidate"
+MARKER = "marker"
+PROPONENTE = "proponente"
+ORGAO = "orgao"
+NOISE = "noise"
+
+# Número de ordem no início da linha (motor NER).
+ORDER_RE = re.compile(r"^\s*(\d{1,3})[\)\.-]?\s+(.*)$")
+
+# Os quatro padrões de início de lista numa só expressão (equivale ao any()).
+_HEADING_RE = re.compile("|".join(f"(?:{p.pattern})" for p in NEW_LIST_PATTERNS), re.I)
+# Filtros baratos: só as linhas que os passam pagam os padrões completos.
+_ORGAO_GATE = re.compile(r"Assembleia|C[âa]mara", re.I)
+_PROPONENTE_GATE = re.compile(r"propo|[–-]", re.I)
+
+
+@dataclass
+class LineToken:
+    line: str
+    orgao: Optional[str] = None  # órgão anunciado nesta linha
+    heading: bool = False
+
+    @cached_property
+    def nome_lista(self) -> Optional[str]:
+        return (find_nome_lista(self.line) if ":" in self.line else None) or None
+
+    @cached_property
+    def sigla(self) -> Optional[str]:
+        # Fora dos cabeçalhos, uma linha de NOME_LISTA não é procurada por sigla.
+        if not self.heading and self.nome_lista is not None:
+            return None
+        return find_sigla(self.line)
+
+    @cached_property
+    def proponente(self) -> Optional[str]:
+        if self.heading or not _PROPONENTE_GATE.search(self.line):
+            return None
+        return normalize_proponente(extract_proponente_from_line(self.line))
+
+    @cached_property
+    def candidate(self) -> bool:
+        """``is_candidate_line`` (motor de regras)."""
+        return not self.heading and is_candidate_line(self.line)
+
+    @cached_property
+    def order(self) -> Optional[Tuple[str, str]]:
+        """``(NUM_ORDEM, resto)`` when the line starts with an order number (motor NER)."""
+        if self.heading or not self.line[0].isdigit():
+            return None
+        match = ORDER_RE.match(self.line)
+        return (match.group(1), match.group(2)) if match else None
+
+    @cached_property
+    def tipo(self) -> Optional[str]:
+        """``"2"``/``"3"`` for an efetivos/suplentes marker line."""
+        if EFETIVOS_REGEX.match(self.line):
+            return "2"
+        if SUPLENTES_REGEX.match(self.line):
+            return "3"
+        return None
+
+    @cached_property
+    def kind(self) -> str:
+        if self.heading:
+            return HEADING
+        if self.nome_lista is not None:
+            return NOME_LISTA
+        if self.candidate:
+            return CANDIDATE
+        if self.tipo:
+            return MARKER
+        if self.proponente:
+            return PROPONENTE
+        if self.orgao:
+            return ORGAO
+        return NOISE
+
+
+def lex_line(line: str) -> LineToken:
+    """Classify one already-cleaned, non-empty line."""
+    orgao = detect_orgao(line, None) if _ORGAO_GATE.search(line) else None
+    return LineToken(line, orgao, bool(_HEADING_RE.search(line)))
+
+
+def lex_lines(lines: Iterable[Any]) -> Iterator[Any]:
+    """``clean_text`` each line and yield its token; empty lines are dropped.
+
+    Items that are not strings (tokens already lexed, or structured blocks
+    such as candidate tables) are passed through unchanged.
+    """
+    for raw in lines:
+        if not isinstance(raw, str):
+            yield raw
+            continue
+        line = clean_text(raw)
+        if line:
+            yield lex_line(line)
@@ -1,24 +1,40 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query
-from fastapi.responses import JSONResponse, FileResponse
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from pathlib import Path
-import os, time
+from functools import partial
+import os
+import shutil
 
-from .extract_pipeline import linearize_document_to_lines, process_document_lines
-from .learn.infer import predict_rows
-from .csv_writer import write_cne_csv
-from .utils_text import sanitize_rows
-from .qa import collect_suspect_rows, write_qa_csv
+from .extraction import run_extraction, write_outputs
+from .engines import parse_engine_names, run_engine_extraction
+from .streaming import STREAM_FORMATS, csv_body, iter_safe_rows, ndjson_body
+from .batch import MAX_BATCH_UPLOAD_BYTES, run_batch
+from .jobs import JOBS, TASKS, QueueFullError
+from .result_cache import CACHE, cache_key
+from .sections import SECTIONS, section_key
+from . import metrics, preload, startup, uploads
+from .metrics import Timings
 from extractor.pipeline import infer_dtmnfr_from_path
-from utils.diff import diff_csvs, validate_csv_schema
 
 APP_DATA = os.environ.get("APP_DATA", "/app/data")
 MODEL_PATH = os.environ.get("MODEL_PATH", "/app/models")
+NER_MODEL_DIR = os.path.join(MODEL_PATH, "ner_pt") if MODEL_PATH else "/app/models/ner_pt"
 MERGE_OUT_DIR = Path(os.environ.get("MERGE_OUT_DIR", "/app/out"))
 STRICT_TEMPLATES = os.environ.get("STRICT_TEMPLATES", "").lower() in {"1", "true", "yes", "on"}
 
+# Carregado durante o import (antes de qualquer fork), ver app/preload.py.
+if preload.PRELOAD_NER:
+    preload.preload_ner(NER_MODEL_DIR)
+else:
+    preload.register("ner_pt", NER_MODEL_DIR)
+
 app = FastAPI(title="CNE On-Prem Extractor (Fixed V2)", version="0.4.0")
 
 app.add_middleware(
@@ -29,6 +45,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    # Recusa antes de o corpo multipart ser lido quando o Content-Length já excede o limite.
+    if request.method == "POST" and request.url.path == "/extract":
+        if uploads.content_length_exceeds(request.headers.get("content-length"), uploads.MAX_UPLOAD_BYTES):
+            exc = uploads.too_large(uploads.MAX_UPLOAD_BYTES)
+            return JSONResponse({"detail": exc.detail}, status_code=exc.status_code)
+    return await call_next(request)
+
+SERVER_TIMING_PATHS = ("/extract", "/merge", "/validate")
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    request.state.timings = Timings()
+    path = request.url.path
+    metrics.REQUESTS_IN_FLIGHT.inc(path=path)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.REQUESTS_IN_FLIGHT.dec(path=path)
+    elapsed = time.perf_counter() - started
+    route = request.scope.get("route")
+    metrics.REQUEST_SECONDS.observe(
+        elapsed, path=getattr(route, "path", "unmatched"), method=request.method
+    )
+    if path in SERVER_TIMING_PATHS:
+        request.state.timings.add("total", elapsed)
+        response.headers["Server-Timing"] = request.state.timings.server_timing()
+    return response
+
+metrics.REGISTRY.register(
+    metrics.Gauge(
+        "cne_jobs_in_flight",
+        "Jobs queued or running in this API process.",
+        ("kind",),
+        collect=lambda: {(kind,): float(n) for kind, n in JOBS.pending_by_kind().items()},
+    )
+)
+metrics.REGISTRY.register(
+    metrics.Gauge(
+        "cne_result_cache_hit_ratio",
+        "Result cache hits / lookups since start.",
+        collect=lambda: {(): CACHE.stats()["hit_ratio"]},
+    )
+)
+metrics.REGISTRY.register(
+    metrics.Gauge(
+        "cne_result_cache_lookups",
+        "Result cache lookups since start.",
+        ("result",),
+        collect=lambda: {("hit",): float(CACHE.hits), ("miss",): float(CACHE.misses)},
+    )
+)
+
 class MergeRequest(BaseModel):
     csv_a: str
     csv_b: str
@@ -41,8 +112,18 @@ class ValidateRequest(BaseModel):
 def health():
     return {"status": "ok", "models_dir": MODEL_PATH}
 
+@app.get("/ready")
+def ready():
+    status = preload.readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/extract")
 async def extract(
+    request: Request,
     file: UploadFile = File(...),
     operator: str = Form(...),
     orgao: Optional[str] = Form(None),
@@ -52,122 +133,246 @@ async def extract(
     excel_compat: bool = Query(False),
     encoding: Optional[str] = Query(None),
     qa: bool = Query(False),
+    stream: Optional[str] = Query(None),
+    engines: Optional[str] = Form(None),
+    previous: Optional[str] = Form(None),
 ):
     if operator not in ("A", "B"):
         raise HTTPException(status_code=400, detail="operator deve ser 'A' ou 'B'")
+    if stream is not None and stream not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"stream deve ser um de {sorted(STREAM_FORMATS)}")
+    if stream and STRICT_TEMPLATES:
+        raise HTTPException(status_code=400, detail="stream indisponível com STRICT_TEMPLATES")
+    try:
+        engine_names = parse_engine_names(engines)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if stream and engine_names:
+        raise HTTPException(status_code=400, detail="stream indisponível com engines")
+    if previous and (stream or engine_names or use_ner):
+        raise HTTPException(status_code=400, detail="previous só está disponível com o motor de regras, sem stream")
+    previous_key = section_key(previous, enable_ia) if previous else None
+    if previous_key and not SECTIONS.has(previous_key):
+        raise HTTPException(status_code=404, detail=f"versão anterior desconhecida: {previous}")
+
+    try:
+        job = JOBS.create("extract")
+    except QueueFullError as exc:
+        raise HTTPException(status_code=503, detail=f"Fila de extração cheia ({exc})")
 
     os.makedirs(APP_DATA, exist_ok=True)
-    ts = int(time.time())
-    in_path = os.path.join(APP_DATA, f"upload_{operator}_{ts}_{file.filename}")
-    with open(in_path, "wb") as f:
-        f.write(await file.read())
-
-    out_csv = os.path.join(APP_DATA, f"extract_{operator}_{ts}.csv")
-    csv_encoding = encoding or ("cp1252" if excel_compat else "utf-8-sig")
-    lines = linearize_document_to_lines(in_path, enable_ia=enable_ia)
-
-    pipeline_meta = {"needs_review": False}
-    if use_ner:
-        ner_model_dir = os.path.join(MODEL_PATH, "ner_pt") if MODEL_PATH else "/app/models/ner_pt"
-        rows = predict_rows(lines, model_dir=ner_model_dir)
-    else:
-        rows, pipeline_meta = process_document_lines(lines)
-        if enable_ia and not rows:
-            fallback_lines = linearize_document_to_lines(in_path, enable_ia=False)
-            rows, pipeline_meta = process_document_lines(fallback_lines)
-
-    dtmnfr = infer_dtmnfr_from_path(in_path)
-
-    processed_rows = []
-    for row in rows:
-        item = dict(row)
-        for field in (
-            "DTMNFR",
-            "ORGAO",
-            "TIPO",
-            "SIGLA",
-            "SIMBOLO",
-            "NOME_LISTA",
-            "NUM_ORDEM",
-            "NOME_CANDIDATO",
-            "PARTIDO_PROPONENTE",
-            "INDEPENDENTE",
-        ):
-            item.setdefault(field, "")
-        if dtmnfr:
-            item["DTMNFR"] = item.get("DTMNFR") or dtmnfr
-        if orgao:
-            item["ORGAO"] = orgao
-        processed_rows.append(item)
-
-    if ord_reset:
-        counters = {}
-        for item in processed_rows:
-            tipo = str(item.get("TIPO", "")).strip()
-            if tipo not in {"2", "3"}:
-                continue
-            key = (
-                item.get("DTMNFR", ""),
-                item.get("ORGAO", ""),
-                item.get("SIGLA", ""),
-                item.get("NOME_LISTA", ""),
-                tipo,
-            )
-            counters[key] = counters.get(key, 0) + 1
-            item["NUM_ORDEM"] = str(counters[key])
-
-    safe_rows = sanitize_rows(processed_rows)
-    suspect_rows = collect_suspect_rows(safe_rows, metadata=pipeline_meta)
-
-    if STRICT_TEMPLATES and (not safe_rows or suspect_rows):
-        detail = {
-            "error": "classificacao_fraca",
-            "rows": len(safe_rows),
-            "suspeitos": len(suspect_rows),
+    in_path = os.path.join(APP_DATA, f"upload_{operator}_{job.id}_{os.path.basename(file.filename or 'upload')}")
+    timings = request.state.timings
+    try:
+        with timings.stage("upload"):
+            stored = await uploads.store_upload(file, in_path)
+    except BaseException:
+        # O cliente nunca viu o job aceite: não fica no histórico como falhado.
+        JOBS.discard(job)
+        raise
+
+    out_csv = os.path.join(APP_DATA, f"extract_{operator}_{job.id}.csv")
+    options = {
+        "orgao": orgao,
+        "ord_reset": ord_reset,
+        "enable_ia": enable_ia,
+        "use_ner": use_ner,
+        "encoding": encoding or ("cp1252" if excel_compat else "utf-8-sig"),
+        "qa": qa,
+        # O DTMNFR vem do nome do ficheiro: o mesmo conteúdo noutro concelho é outro resultado.
+        "dtmnfr": infer_dtmnfr_from_path(in_path),
+    }
+    if engine_names:
+        options["engines"] = engine_names
+    if previous:
+        options["previous"] = previous
+    key = cache_key(stored.sha256, options, model_dir=NER_MODEL_DIR if use_ner else None)
+    params = {
+        **options,
+        "in_path": in_path,
+        "sha256": stored.sha256,
+        "size": stored.size,
+        "out_csv": out_csv,
+        "ner_model_dir": NER_MODEL_DIR,
+        "strict_templates": STRICT_TEMPLATES,
+        "cache": {"root": str(CACHE.root), "max_bytes": CACHE.max_bytes, "key": key},
+        "sections": {
+            "root": str(SECTIONS.root),
+            "max_bytes": SECTIONS.max_bytes,
+            "key": section_key(stored.sha256, enable_ia),
+            "previous": previous_key,
+        },
+    }
+
+    if stream:
+        return _stream_extraction(job, params, stream)
+
+    with timings.stage("cache"):
+        cached = CACHE.get(key, out_csv)
+    if cached is not None:
+        cached["input"] = in_path
+        JOBS.finish(job, cached)
+        return JSONResponse({**job.to_dict(), "status_url": f"/jobs/{job.id}"})
+
+    JOBS.submit(job, run_engine_extraction if engine_names else run_extraction, params)
+
+    return JSONResponse(
+        {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"},
+        status_code=202,
+    )
+
+def _stream_extraction(job, params, fmt: str) -> StreamingResponse:
+    """Stream rows while extracting; the CSV/QA artefacts are written afterwards."""
+    collected = []
+    metadata = {}
+    timings = Timings()
+    JOBS.start(job)
+
+    def rows():
+        try:
+            yield from iter_safe_rows(params, collected, metadata, timings)
+        except GeneratorExit:
+            JOBS.fail(job, RuntimeError("stream interrompido pelo cliente"))
+            raise
+        except Exception as exc:
+            JOBS.fail(job, exc)
+            raise
+
+    def summary():
+        return {
+            "job_id": job.id,
+            "rows": len(collected),
+            "needs_review": bool(metadata.get("needs_review")),
+            "encoding": metadata.get("encoding"),
+            "output_csv": params["out_csv"],
         }
-        raise HTTPException(status_code=422, detail=detail)
-
-    write_cne_csv(safe_rows, out_csv, encoding=csv_encoding)
-
-    qa_path = None
-    if qa or suspect_rows:
-        qa_path, suspect_rows = write_qa_csv(
-            safe_rows,
-            out_csv,
-            metadata=pipeline_meta,
-            suspects=suspect_rows,
-        )
-
-    orgoes = sorted({row.get("ORGAO", "") for row in safe_rows if row.get("ORGAO")})
-    siglas = sorted({row.get("SIGLA", "") for row in safe_rows if row.get("SIGLA")})
-
-    return JSONResponse({
-        "input": in_path,
-        "output_csv": out_csv,
-        "rows": len(safe_rows),
-        "orgoes": orgoes,
-        "siglas": siglas,
-        "qa_csv": qa_path,
-        "suspeitos": len(suspect_rows),
-    })
+
+    def write_artifacts():
+        if job.status != "running":
+            return
+        try:
+            meta = {"needs_review": bool(metadata.get("needs_review")), "encoding": metadata.get("encoding")}
+            result = write_outputs(collected, meta, params, timings=timings, lines=metadata.get("lines", 0))
+            result["timings"] = timings.as_dict()
+            JOBS.finish(job, result)
+        except Exception as exc:
+            JOBS.fail(job, exc)
+
+    if fmt == "ndjson":
+        body = ndjson_body(rows(), summary)
+        media_type = STREAM_FORMATS[fmt]
+    else:
+        body = csv_body(rows(), params["encoding"])
+        media_type = f"{STREAM_FORMATS[fmt]}; charset={params['encoding']}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"X-Job-Id": job.id, "X-Output-Csv": params["out_csv"]},
+        background=BackgroundTask(write_artifacts),
+    )
+
+@app.post("/extract/batch")
+async def extract_batch(
+    files: List[UploadFile] = File(...),
+    operator: str = Form(...),
+    orgao: Optional[str] = Form(None),
+    ord_reset: bool = Form(True),
+    enable_ia: bool = Form(True),
+    use_ner: bool = Form(False),
+    excel_compat: bool = Query(False),
+    encoding: Optional[str] = Query(None),
+):
+    if operator not in ("A", "B"):
+        raise HTTPException(status_code=400, detail="operator deve ser 'A' ou 'B'")
+
+    try:
+        job = JOBS.create("batch")
+    except QueueFullError as exc:
+        raise HTTPException(status_code=503, detail=f"Fila de extração cheia ({exc})")
+
+    work_dir = os.path.join(APP_DATA, f"batch_{operator}_{job.id}")
+    os.makedirs(work_dir, exist_ok=True)
+    stored = []
+    try:
+        for idx, upload in enumerate(files):
+            name = os.path.basename(upload.filename or f"documento_{idx}")
+            path = os.path.join(work_dir, f"upload_{idx:04d}_{name}")
+            await uploads.store_upload(upload, path, max_bytes=MAX_BATCH_UPLOAD_BYTES)
+            stored.append({"file": name, "path": path})
+    except BaseException:
+        JOBS.discard(job)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+
+    options = {
+        "orgao": orgao,
+        "ord_reset": ord_reset,
+        "enable_ia": enable_ia,
+        "use_ner": use_ner,
+        "ner_model_dir": NER_MODEL_DIR,
+        "encoding": encoding or ("cp1252" if excel_compat else "utf-8-sig"),
+    }
+    JOBS.coordinate(
+        job,
+        partial(
+            run_batch,
+            stored,
+            options,
+            work_dir=work_dir,
+            out_csv=os.path.join(APP_DATA, f"extract_batch_{operator}_{job.id}.csv"),
+            manifest_path=os.path.join(APP_DATA, f"extract_batch_{operator}_{job.id}.json"),
+            submit=JOBS.submit_task,
+        ),
+    )
+
+    return JSONResponse(
+        {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"},
+        status_code=202,
+    )
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job.to_dict()
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+@app.on_event("startup")
+def _log_startup_budget():
+    startup.log_report(_IMPORT_SECONDS)
+
+@app.on_event("shutdown")
+def _shutdown_pool():
+    JOBS.shutdown()
+    TASKS.shutdown()
 
 @app.post("/merge")
-def merge(req: MergeRequest):
+def merge(req: MergeRequest, request: Request):
     if not os.path.exists(req.csv_a) or not os.path.exists(req.csv_b):
         raise HTTPException(status_code=400, detail="CSV paths inválidos")
     base_out_dir = MERGE_OUT_DIR
     base_out_dir.mkdir(parents=True, exist_ok=True)
     out_path = Path(req.out_path) if req.out_path else base_out_dir / "final_merged.csv"
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    diffs, final_df = diff_csvs(req.csv_a, req.csv_b)
-    final_df.to_csv(out_path, index=False, sep=";", encoding="utf-8")
+    from utils.diff import diff_csvs
+
+    timings = request.state.timings
+    with timings.stage("diff"):
+        diffs, final_df = diff_csvs(req.csv_a, req.csv_b)
+    with timings.stage("write"):
+        final_df.to_csv(out_path, index=False, sep=";", encoding="utf-8")
     return {"diffs": diffs, "final_csv": str(out_path), "rows": int(final_df.shape[0])}
 
 @app.post("/validate")
-def validate(req: ValidateRequest):
+def validate(req: ValidateRequest, request: Request):
     if not os.path.exists(req.csv_path):
         raise HTTPException(status_code=400, detail="CSV inexistente")
-    report = validate_csv_schema(req.csv_path)
+    from utils.diff import validate_csv_schema
+
+    with request.state.timings.stage("validate"):
+        report = validate_csv_schema(req.csv_path)
     return report
 
 @app.get("/download")
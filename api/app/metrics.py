@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""Stage timing and a small Prometheus text-format registry.
+
+Worker processes cannot share counters with the API process, so the hot
+path only records plain ``{stage: seconds}`` dictionaries (:class:`Timings`)
+that travel back inside the job result. The API process folds them into
+the histograms exposed on ``/metrics`` and also turns request-level timings
+into a ``Server-Timing`` header.
+
+No dependency on ``prometheus_client``: the exposition format is simple
+enough to render here, and this module must stay import-cheap because
+``utils_text`` uses it.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _fmt_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, doc, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_fmt_labels(self.labels, k)} {v}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: Sequence[str] = (),
+        *,
+        collect: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ) -> None:
+        super().__init__(name, doc, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def render(self) -> List[str]:
+        if self._collect is not None:
+            items = sorted(self._collect().items())
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_fmt_labels(self.labels, k)} {v}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[idx] += 1
+            counts[-1] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def count(self, **labels: str) -> int:
+        counts = self._counts.get(self._key(labels))
+        return counts[-1] if counts else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = sorted((k, list(c), self._sums[k]) for k, c in self._counts.items())
+        for key, counts, total in items:
+            for bound, count in zip(self.buckets, counts):
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {count}")
+            le_inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le_inf)} {counts[-1]}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS: Histogram = REGISTRY.register(
+    Histogram("cne_stage_seconds", "Time spent per pipeline stage and document.", ("stage",))
+)
+JOB_SECONDS: Histogram = REGISTRY.register(
+    Histogram("cne_job_seconds", "Wall time of finished jobs.", ("kind", "status"))
+)
+REQUEST_SECONDS: Histogram = REGISTRY.register(
+    Histogram("cne_request_seconds", "HTTP request latency.", ("path", "method"))
+)
+ROWS_TOTAL: Counter = REGISTRY.register(Counter("cne_rows_total", "Candidate rows extracted.", ("kind",)))
+LINES_TOTAL: Counter = REGISTRY.register(Counter("cne_lines_total", "Document lines read.", ("kind",)))
+DOCUMENTS_TOTAL: Counter = REGISTRY.register(
+    Counter("cne_documents_total", "Documents processed.", ("kind", "status"))
+)
+CLEAN_TEXT_CALLS: Counter = REGISTRY.register(
+    Counter("cne_clean_text_calls_total", "clean_text calls by path (fast_path, hits, misses, uncached, already_clean).", ("path",))
+)
+REQUESTS_IN_FLIGHT: Gauge = REGISTRY.register(
+    Gauge("cne_requests_in_flight", "HTTP requests currently being served.", ("path",))
+)
+
+
+# -- per-document stage timings ---------------------------------------------------------
+
+
+class Timings:
+    """Accumulates ``{stage: seconds}`` for one document or request."""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def iterate(self, name: str, items: Iterable[Any]) -> Iterator[Any]:
+        """Yield from *items*, charging only the time spent producing them to *name*."""
+        iterator = iter(items)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - started)
+                return
+            self.add(name, time.perf_counter() - started)
+            yield item
+
+    def as_dict(self) -> Dict[str, float]:
+        return {k: round(v, 6) for k, v in self.stages.items()}
+
+    def server_timing(self) -> str:
+        """Render as a ``Server-Timing`` header value (durations in ms)."""
+        return ", ".join(f"{k};dur={v * 1000:.2f}" for k, v in self.stages.items())
+
+
+class CallTimer:
+    """Process-local accumulator for functions called too often to time individually."""
+
+    def __init__(self) -> None:
+        self.seconds = 0.0
+        self.calls = 0
+
+    def wrap(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - started
+                self.calls += 1
+
+        timed.__name__ = fn.__name__
+        timed.__doc__ = fn.__doc__
+        timed.__wrapped__ = fn  # type: ignore[attr-defined]
+        return timed
+
+    @contextmanager
+    def charge(self, timings: Timings, stage: str) -> Iterator[None]:
+        """Add the time accumulated inside the ``with`` block to *timings[stage]*."""
+        before = self.seconds
+        try:
+            yield
+        finally:
+            timings.add(stage, self.seconds - before)
+
+
+def observe_stages(stages: Dict[str, float]) -> None:
+    for stage, seconds in stages.items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def observe_clean_text(stats: Dict[str, int]) -> None:
+    for path, calls in stats.items():
+        CLEAN_TEXT_CALLS.inc(calls, path=path)
+
+
+def record_job(kind: str, status: str, seconds: float, result: Optional[Dict[str, Any]] = None) -> None:
+    JOB_SECONDS.observe(seconds, kind=kind, status=status)
+    if not result:
+        return
+    if result.get("timings"):
+        observe_stages(result["timings"])
+    if result.get("clean_text"):
+        observe_clean_text(result["clean_text"])
+    if kind == "extract" and not result.get("cached"):
+        DOCUMENTS_TOTAL.inc(kind=kind, status=status)
+        ROWS_TOTAL.inc(result.get("rows", 0), kind=kind)
+        LINES_TOTAL.inc(result.get("lines", 0), kind=kind)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""Party and coalition registry loaded from ``partidos.yaml``.
+
+The registry replaces the hard-coded ``SIGLAS_PARTIDOS``/``CANON_SIGLAS``
+lists and the ``normalize_proponente`` rewrites. Every sigla that
+``find_sigla`` looks for is compiled into one alternation (longest first),
+so a line is scanned once instead of once per party.
+
+The file is re-read when its mtime changes; the check runs at most every
+``PARTY_REGISTRY_CHECK_S`` seconds in each process, which covers the
+extraction pool workers too. A file that fails to load leaves the previous
+registry in place.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+PARTY_REGISTRY_PATH = os.environ.get("PARTY_REGISTRY", str(Path(__file__).with_name("partidos.yaml")))
+PARTY_REGISTRY_CHECK_S = float(os.environ.get("PARTY_REGISTRY_CHECK_S", "2"))
+
+logger = logging.getLogger("cne.parties")
+
+
+@dataclass(frozen=True)
+class PartyEntry:
+    sigla: str
+    coalition: bool = False
+    detect: bool = True
+    fuzzy: bool = True
+    canonical: Optional[str] = None
+    aliases: Tuple[str, ...] = ()
+
+
+def _alternation(words: List[str]) -> str:
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+class PartyRegistry:
+    """Compiled view of the registry entries."""
+
+    def __init__(self, entries: List[PartyEntry], source: Optional[str] = None, mtime: Optional[float] = None) -> None:
+        self.entries = tuple(entries)
+        self.source = source
+        self.mtime = mtime
+        self.detect_siglas = frozenset(e.sigla for e in self.entries if e.detect)
+        self.canonical_siglas = [e.sigla for e in self.entries if e.fuzzy]
+        self.canonical = {e.sigla: e.canonical for e in self.entries if e.canonical}
+        self._aliases = {alias: e.sigla for e in self.entries for alias in e.aliases}
+        self._sigla_re = (
+            re.compile(rf"\b(?:{_alternation(list(self.detect_siglas))})\b") if self.detect_siglas else None
+        )
+        self._alias_re = re.compile(_alternation(list(self._aliases))) if self._aliases else None
+        # Entra na chave da cache de resultados: mudar o registo muda a extração.
+        self.fingerprint = hashlib.sha256(repr(self.entries).encode("utf-8")).hexdigest()[:16]
+
+    def find_sigla(self, text: str) -> Optional[str]:
+        """Longest registered sigla present in *text* (leftmost on ties)."""
+        if self._sigla_re is None:
+            return None
+        best = None
+        for match in self._sigla_re.finditer(text):
+            found = match.group()
+            if best is None or len(found) > len(best):
+                best = found
+        return best
+
+    def rewrite_aliases(self, text: str) -> str:
+        """Replace unpunctuated spellings (``CDSPP``) with the sigla (``CDS-PP``)."""
+        if self._alias_re is None:
+            return text
+        return self._alias_re.sub(lambda m: self._aliases[m.group()], text)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "entries": len(self.entries),
+            "coalitions": sum(1 for e in self.entries if e.coalition),
+        }
+
+
+def _parse_entries(data: Any, source: str) -> List[PartyEntry]:
+    if not isinstance(data, dict) or not isinstance(data.get("partidos"), list):
+        raise ValueError(f"{source}: esperada uma lista 'partidos'")
+    entries: List[PartyEntry] = []
+    seen = set()
+    for item in data["partidos"]:
+        if not isinstance(item, dict) or not str(item.get("sigla") or "").strip():
+            raise ValueError(f"{source}: entrada sem 'sigla': {item!r}")
+        sigla = str(item["sigla"]).strip()
+        if sigla in seen:
+            raise ValueError(f"{source}: sigla repetida: {sigla}")
+        seen.add(sigla)
+        entries.append(
+            PartyEntry(
+                sigla=sigla,
+                coalition=bool(item.get("coalition", False)),
+                detect=bool(item.get("detect", True)),
+                fuzzy=bool(item.get("fuzzy", True)),
+                canonical=item.get("canonical"),
+                aliases=tuple(str(a) for a in item.get("aliases") or ()),
+            )
+        )
+    return entries
+
+
+def load_registry(path: str) -> PartyRegistry:
+    """Read and compile the registry at *path*; raises on a missing or invalid file."""
+    import yaml
+
+    mtime = os.stat(path).st_mtime
+    with open(path, encoding="utf-8") as fh:
+        data = yaml.safe_load(fh)
+    return PartyRegistry(_parse_entries(data, path), source=path, mtime=mtime)
+
+
+_registry: Optional[PartyRegistry] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def reload_registry(path: Optional[str] = None) -> PartyRegistry:
+    """Load *path* (default ``PARTY_REGISTRY_PATH``) now and make it current."""
+    global _registry, _checked_at
+    registry = load_registry(path or PARTY_REGISTRY_PATH)
+    with _lock:
+        _registry, _checked_at = registry, time.monotonic()
+    return registry
+
+
+def get_registry() -> PartyRegistry:
+    """Current registry, re-read if the file changed since the last check."""
+    global _registry, _checked_at
+    registry = _registry
+    now = time.monotonic()
+    if registry is not None and now - _checked_at < PARTY_REGISTRY_CHECK_S:
+        return registry
+    with _lock:
+        registry = _registry
+        if registry is not None and now - _checked_at < PARTY_REGISTRY_CHECK_S:
+            return registry
+        _checked_at = now
+        path = registry.source if registry is not None else PARTY_REGISTRY_PATH
+        try:
+            if registry is not None and os.stat(path).st_mtime == registry.mtime:
+                return registry
+            _registry = load_registry(path)
+            if registry is not None:
+                logger.info("Registo de partidos recarregado: %s", _registry.summary())
+        except Exception:
+            if registry is None:
+                raise
+            logger.exception("Falha ao recarregar %s; mantém-se o registo anterior", path)
+        return _registry
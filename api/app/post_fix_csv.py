@@ -2,13 +2,14 @@
 # post_fix_csv.py — utilitário para limpar mojibake em CSV já gerado
 import sys
 import pandas as pd
-from app.utils_text import clean_text
+from app.csv_writer import CLEAN_COLS
+from app.utils_text import clean_column
 
 def main(inp: str, outp: str):
     df = pd.read_csv(inp, sep=';', dtype=str, keep_default_na=False)
-    for col in ("NOME_CANDIDATO","NOME_LISTA","PARTIDO_PROPONENTE","SIGLA"):
+    for col in CLEAN_COLS:
         if col in df.columns:
-            df[col] = df[col].map(clean_text)
+            df[col] = clean_column(df[col])
     df.to_csv(outp, sep=';', index=False, encoding='utf-8')
     print(f"Salvo: {outp}")
 
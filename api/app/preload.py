@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Opt-in preload and warm-up of the spaCy NER model.
+
+Without preload the first ``use_ner=true`` request pays for ``spacy.load``
+and for the first inference. With ``PRELOAD_NER=1`` the model is loaded into
+``learn.infer._load_model``'s cache while ``app.main`` is being imported and
+a small warm-up batch is run through it. Importing happens before any fork:
+the extraction pool forks its workers from the API process, and
+``gunicorn --preload`` forks its workers from the master, so every child
+inherits the loaded model and shares its pages copy-on-write.
+
+``/ready`` reports the state of each model; ``/health`` stays a liveness
+probe.
+"""
+
+from __future__ import annotations
+
+import gc
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+PRELOAD_NER = os.environ.get("PRELOAD_NER", "").lower() in {"1", "true", "yes", "on"}
+
+# Frases curtas com a forma das linhas de candidatos, só para aquecer o pipeline.
+WARMUP_TEXTS = (
+    "Maria da Conceição Ferreira",
+    "João Pedro Sousa Gonçalves - Independente",
+    "Ana Rita Lopes, suplente",
+)
+
+LAZY = "lazy"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+@dataclass
+class ModelState:
+    path: str
+    state: str = LAZY
+    load_seconds: Optional[float] = None
+    warmup_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_MODELS: Dict[str, ModelState] = {}
+_lock = threading.Lock()
+
+
+def register(name: str, path: str) -> ModelState:
+    """Record a model that is loaded lazily (on first use, inside a worker)."""
+    with _lock:
+        state = _MODELS.get(name)
+        if state is None or state.path != path:
+            state = _MODELS[name] = ModelState(path=path)
+        return state
+
+
+def preload_ner(path: str, name: str = "ner_pt") -> ModelState:
+    """Load the NER model at *path* into the inference cache and warm it up.
+
+    Failures are recorded on the returned state rather than raised, so a
+    missing model only makes ``/ready`` fail; rule-only extraction keeps
+    working.
+    """
+    from app.learn.infer import _load_model
+
+    state = register(name, path)
+    state.state, state.error = LOADING, None
+    started = time.perf_counter()
+    try:
+        nlp = _load_model(path)
+        state.load_seconds = round(time.perf_counter() - started, 4)
+        started = time.perf_counter()
+        for _ in nlp.pipe(WARMUP_TEXTS):
+            pass
+        state.warmup_seconds = round(time.perf_counter() - started, 4)
+    except Exception as exc:
+        state.state, state.error = FAILED, f"{type(exc).__name__}: {exc}"
+        return state
+    # Move o que já existe para a geração permanente: o GC deixa de tocar nessas
+    # páginas e os processos filhos continuam a partilhá-las.
+    gc.freeze()
+    state.state = READY
+    return state
+
+
+def readiness() -> Dict[str, Any]:
+    """``{"ready": bool, "models": {...}}``; lazy models do not block readiness."""
+    with _lock:
+        models = {name: state.to_dict() for name, state in _MODELS.items()}
+    ready = all(m["state"] in (READY, LAZY) for m in models.values())
+    return {"ready": ready, "models": models}
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Content-addressed cache of extraction results.
+
+Entries are keyed by the SHA-256 of the uploaded document plus every option
+that changes the output (``orgao``, ``ord_reset``, ``enable_ia``,
+``use_ner``, ``encoding``, ``qa``) and a version stamp made of the pipeline
+source code, the NER model metadata and the party registry, so any code,
+model or registry change produces new keys. Entries live under ``<root>/<code_version>/``; directories left by
+older code versions are dropped on the next eviction pass.
+
+Each entry is a directory holding ``result.json``, ``output.csv`` and,
+when the original run produced one, ``qa.csv``. The entry mtime is the LRU
+clock and the cache is trimmed to ``RESULT_CACHE_MAX_BYTES``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app import qa as qa_module
+from app.party_registry import get_registry
+
+RESULT_CACHE_DIR = os.environ.get(
+    "RESULT_CACHE_DIR", os.path.join(os.environ.get("APP_DATA", "/app/data"), "cache")
+)
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+_SOURCE_ROOT = Path(__file__).resolve().parents[1]
+_SOURCE_PACKAGES = ("app", "extractor")
+
+_RESULT_FILE = "result.json"
+_OUTPUT_FILE = "output.csv"
+_QA_FILE = "qa.csv"
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """Hash of the pipeline sources; changes whenever the extraction code changes."""
+    digest = hashlib.sha256()
+    for package in _SOURCE_PACKAGES:
+        for path in sorted((_SOURCE_ROOT / package).rglob("*.py")):
+            digest.update(str(path.relative_to(_SOURCE_ROOT)).encode("utf-8"))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def model_version(model_dir: Optional[str]) -> str:
+    """Identify the NER model through its ``meta.json`` (or ``missing``)."""
+    if not model_dir:
+        return "rules"
+    meta = Path(model_dir) / "meta.json"
+    if meta.exists():
+        return hashlib.sha256(meta.read_bytes()).hexdigest()[:16]
+    return "missing"
+
+
+def cache_key(doc_sha256: str, options: Dict[str, Any], *, model_dir: Optional[str] = None) -> str:
+    payload = {
+        "doc": doc_sha256,
+        "options": {k: options[k] for k in sorted(options)},
+        "code": code_version(),
+        "model": model_version(model_dir),
+        "parties": get_registry().fingerprint,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=True)
+    return hashlib.sha256(raw.encode("ascii")).hexdigest()
+
+
+class ResultCache:
+    """Directory-backed LRU cache of extraction outputs."""
+
+    def __init__(self, root: str = RESULT_CACHE_DIR, max_bytes: int = RESULT_CACHE_MAX_BYTES) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def _current(self) -> Path:
+        return self.root / code_version()
+
+    def _entry(self, key: str) -> Path:
+        return self._current / key
+
+    def get(self, key: str, out_csv: str) -> Optional[Dict[str, Any]]:
+        """Restore a cached entry as if it had just been extracted to *out_csv*."""
+        if not self.enabled:
+            return None
+        entry = self._entry(key)
+        try:
+            result = json.loads((entry / _RESULT_FILE).read_text(encoding="utf-8"))
+            out_path = Path(out_csv)
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(entry / _OUTPUT_FILE, out_path)
+            qa_path = None
+            if (entry / _QA_FILE).exists():
+                qa_path = Path(qa_module.QA_OUTPUT_DIR) / f"{out_path.stem}_qa.csv"
+                qa_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(entry / _QA_FILE, qa_path)
+            os.utime(entry)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        result["output_csv"] = str(out_path)
+        result["qa_csv"] = str(qa_path) if qa_path else None
+        result["cached"] = True
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Store *result* and the files it points at, then trim the cache."""
+        if not self.enabled:
+            return
+        entry = self._entry(key)
+        if entry.exists():
+            os.utime(entry)
+            return
+        self._current.mkdir(parents=True, exist_ok=True)
+        tmp = self._current / f".tmp-{uuid.uuid4().hex}"
+        try:
+            tmp.mkdir()
+            shutil.copyfile(result["output_csv"], tmp / _OUTPUT_FILE)
+            if result.get("qa_csv"):
+                shutil.copyfile(result["qa_csv"], tmp / _QA_FILE)
+            (tmp / _RESULT_FILE).write_text(json.dumps(result, ensure_ascii=False), encoding="utf-8")
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries = []
+        for entry in self._current.iterdir():
+            if not entry.is_dir() or entry.name.startswith(".tmp-"):
+                continue
+            try:
+                size = sum(p.stat().st_size for p in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+            except OSError:
+                continue
+        return entries
+
+    def evict(self) -> int:
+        """Remove least-recently-used entries until the cache fits ``max_bytes``."""
+        if not self.root.exists():
+            return 0
+        removed = 0
+        for stale in self.root.iterdir():
+            if stale.is_dir() and stale != self._current:
+                shutil.rmtree(stale, ignore_errors=True)
+                removed += 1
+        if not self._current.exists():
+            return removed
+        entries = sorted(self._entries(), key=lambda item: item[0])
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+CACHE = ResultCache()
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""Incremental re-extraction of amended editais, one list section at a time.
+
+The rule engine's lines are cut into sections before every list heading
+(``is_new_list_heading``) and every órgão switch, the same boundaries the
+state machine in ``extract_pipeline`` reacts to. A section's rows depend
+only on its own lines and on the part of the list context it inherits
+(órgão, SIGLA, NOME_LISTA) that its first line does not set again, so both
+go into its fingerprint.
+
+Each extraction stores the sections of the document (fingerprint, list and
+raw rows) in a :class:`SectionStore`, keyed by the document's SHA-256. When
+an amended version names the earlier one (``previous``), sections whose
+fingerprint is already known are copied instead of re-extracted, and
+:func:`diff_lists` reports the lists that were added, removed or modified.
+A list is identified by the line of its órgão heading (e.g. "Assembleia de
+Freguesia de X"), SIGLA and NOME_LISTA, so each freguesia has its own lists.
+The rows are the same as a full run of ``iter_document_lines``.
+
+Since every section carries its starting context, sections are independent:
+:func:`extract_sections` sends them to the shared ``app.jobs.TASKS``
+executor in tasks of about ``RULES_LINES_PER_TASK`` lines and puts the rows
+back in document order. When there is nothing to reuse and the document
+fits in one task (or only one task worker is allowed), the sections are
+recorded during a single serial walk instead (:func:`walk_sections`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.extract_pipeline import advance_context, iter_document_lines
+from app.jobs import TASKS
+from app.line_lexer import lex_lines
+from app.party_registry import get_registry
+from app.result_cache import ResultCache
+from app.table_extract import CandidateTable
+from app.utils_listctx import ListContext
+
+SECTION_STORE_DIR = os.environ.get(
+    "SECTION_STORE_DIR", os.path.join(os.environ.get("APP_DATA", "/app/data"), "sections")
+)
+SECTION_STORE_MAX_BYTES = int(os.environ.get("SECTION_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+RULES_LINES_PER_TASK = int(os.environ.get("RULES_LINES_PER_TASK", "5000"))
+
+_SECTIONS_FILE = "sections.json"
+
+ListKey = Tuple[Optional[str], Optional[str], Optional[str]]
+# (órgão, linha do cabeçalho do órgão, SIGLA, NOME_LISTA)
+ListId = Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]
+
+
+def _context_key(ctx: ListContext) -> ListKey:
+    return (ctx.orgao, ctx.sigla, ctx.nome_lista)
+
+
+def _used_context(token: Any, start: ListKey) -> ListKey:
+    """The part of *start* still read after the section's first *token*."""
+    if isinstance(token, CandidateTable):
+        return start
+    orgao, sigla, nome_lista = start
+    # Um cabeçalho com SIGLA/NOME_LISTA próprios substitui os herdados (ver advance_context).
+    return (
+        None if token.orgao else orgao,
+        None if token.heading and token.sigla else sigla,
+        None if token.heading and token.nome_lista else nome_lista,
+    )
+
+
+@dataclass
+class ListSection:
+    """A list heading (or órgão switch) and the lines up to the next one."""
+
+    start: ListKey  # contexto à entrada da secção
+    items: List[Any] = field(default_factory=list)
+    lista: ListId = (None, None, None, None)  # lista depois do cabeçalho
+    used: ListKey = (None, None, None)  # parte de start que as linhas leem
+    rows: List[Dict[str, str]] = field(default_factory=list)
+    needs_review: bool = False
+    reused: bool = False
+
+    @cached_property
+    def fingerprint(self) -> str:
+        digest = _new_digest(self.used)
+        for item in self.items:
+            _hash_item(digest, item)
+        return digest.hexdigest()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "lista": list(self.lista),
+            "rows": self.rows,
+            "needs_review": self.needs_review,
+        }
+
+
+def _new_digest(used: ListKey) -> Any:
+    return hashlib.sha256(json.dumps(used, ensure_ascii=False).encode("utf-8"))
+
+
+def _hash_item(digest: Any, item: Any) -> None:
+    if isinstance(item, CandidateTable):
+        digest.update(json.dumps(item.rows, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    else:
+        digest.update(item.line.encode("utf-8"))
+    digest.update(b"\n")
+
+
+def _starts_section(token: Any) -> bool:
+    return not isinstance(token, CandidateTable) and bool(token.heading or token.orgao)
+
+
+def split_sections(items: Iterable[Any]) -> List[ListSection]:
+    """Lex *items* and cut them before every list heading and órgão switch."""
+    ctx = ListContext()
+    orgao_line = None
+    sections: List[ListSection] = []
+    for token in lex_lines(items):
+        if _starts_section(token) or not sections:
+            start = _context_key(ctx)
+            sections.append(ListSection(start, used=_used_context(token, start)))
+        if not isinstance(token, CandidateTable):
+            advance_context(token, ctx)
+            if token.orgao:
+                orgao_line = token.line
+        sections[-1].items.append(token)
+        sections[-1].lista = (ctx.orgao, orgao_line, ctx.sigla, ctx.nome_lista)
+    return sections
+
+
+def walk_sections(items: Iterable[Any], sections: List[ListSection]) -> Iterator[Dict[str, str]]:
+    """``iter_document_lines`` over *items*, appending to *sections* what :func:`split_sections` would cut.
+
+    One pass over the lines: each section is opened when the state machine
+    reads its first line and gets the rows yielded until the next one. The
+    fingerprints are hashed on the way, so the sections keep no ``items``.
+    The rows yielded are the ones kept in the sections (``finalize_rows``
+    copies them before changing anything).
+    """
+    ctx = ListContext()
+    orgao_line = None
+    digest = None
+
+    def close() -> None:
+        section = sections[-1]
+        section.lista = (ctx.orgao, orgao_line, ctx.sigla, ctx.nome_lista)
+        section.needs_review = bool(ctx.needs_review)
+        section.fingerprint = digest.hexdigest()
+
+    def tokens() -> Iterator[Any]:
+        nonlocal orgao_line, digest
+        for token in lex_lines(items):
+            if _starts_section(token) or not sections:
+                if sections:
+                    close()
+                start = _context_key(ctx)
+                used = _used_context(token, start)
+                # needs_review passa a contar por secção, como em _extract_task.
+                ctx.needs_review = 0
+                sections.append(ListSection(start, used=used))
+                digest = _new_digest(used)
+            if not isinstance(token, CandidateTable) and token.orgao:
+                orgao_line = token.line
+            _hash_item(digest, token)
+            yield token
+        if sections:
+            close()
+
+    # A máquina de estados só lê a linha seguinte depois de devolver as linhas de CNE
+    # da anterior: cada linha de CNE pertence à última secção aberta.
+    for row in iter_document_lines(tokens(), None, ctx):
+        sections[-1].rows.append(row)
+        yield row
+
+
+def _extract_task(task: List[Tuple[ListKey, List[Any]]]) -> List[Tuple[List[Dict[str, str]], bool]]:
+    """Rows and ``needs_review`` of each ``(start, items)`` section, run from its own context."""
+    out = []
+    for (orgao, sigla, nome_lista), items in task:
+        ctx = ListContext(orgao=orgao, sigla=sigla, nome_lista=nome_lista)
+        rows = list(iter_document_lines(items, None, ctx))
+        out.append((rows, bool(ctx.needs_review)))
+    return out
+
+
+def _tasks(sections: List[ListSection], lines_per_task: int) -> List[List[ListSection]]:
+    tasks: List[List[ListSection]] = []
+    size = 0
+    for section in sections:
+        if not tasks or size >= lines_per_task:
+            tasks.append([])
+            size = 0
+        tasks[-1].append(section)
+        size += len(section.items)
+    return tasks
+
+
+def extract_sections(
+    sections: List[ListSection],
+    *,
+    workers: Optional[int] = None,
+    lines_per_task: int = RULES_LINES_PER_TASK,
+) -> None:
+    """Run the rule engine over *sections*, filling their ``rows`` and ``needs_review``.
+
+    Tasks go to ``TASKS`` when more than one worker is allowed (*workers*,
+    default ``TASKS.workers``) and run in-process otherwise.
+    """
+    tasks = _tasks(sections, max(1, lines_per_task))
+    payloads = [[(s.start, s.items) for s in task] for task in tasks]
+    workers = min(workers or TASKS.workers, len(tasks))
+    # map devolve pela ordem de submissão: as secções voltam a ficar em ordem.
+    results = TASKS.map(_extract_task, payloads) if workers > 1 else map(_extract_task, payloads)
+    for task, task_results in zip(tasks, results):
+        for section, (rows, needs_review) in zip(task, task_results):
+            section.rows = rows
+            section.needs_review = needs_review
+
+
+def section_key(doc_sha256: str, enable_ia: bool) -> str:
+    """Store key of one document's sections (the line variant changes them)."""
+    payload = {"doc": doc_sha256, "enable_ia": enable_ia, "parties": get_registry().fingerprint}
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=True)
+    return hashlib.sha256(raw.encode("ascii")).hexdigest()
+
+
+class SectionStore(ResultCache):
+    """Per-document section lists, with the layout and LRU policy of :class:`ResultCache`."""
+
+    def __init__(self, root: str = SECTION_STORE_DIR, max_bytes: int = SECTION_STORE_MAX_BYTES) -> None:
+        super().__init__(root, max_bytes)
+
+    def has(self, key: str) -> bool:
+        return self.enabled and (self._entry(key) / _SECTIONS_FILE).exists()
+
+    def load(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        if not self.enabled:
+            return None
+        entry = self._entry(key)
+        try:
+            sections = json.loads((entry / _SECTIONS_FILE).read_text(encoding="utf-8"))
+            os.utime(entry)
+        except (OSError, ValueError):
+            return None
+        return sections
+
+    def save(self, key: str, sections: List[Dict[str, Any]]) -> None:
+        if not self.enabled:
+            return
+        entry = self._entry(key)
+        if entry.exists():
+            os.utime(entry)
+            return
+        self._current.mkdir(parents=True, exist_ok=True)
+        tmp = self._current / f".tmp-{uuid.uuid4().hex}"
+        try:
+            tmp.mkdir()
+            (tmp / _SECTIONS_FILE).write_text(json.dumps(sections, ensure_ascii=False), encoding="utf-8")
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
+
+
+class IncrementalRules:
+    """Rule engine that copies the rows of sections already extracted.
+
+    Called like ``iter_document_lines(items, metadata)``. *stored* holds the
+    sections kept for this document and *previous* those of the version it
+    amends; rows are copied from either. After a run, :attr:`sections` holds
+    the document's sections (the last run wins, so the plain-line fallback
+    of ``iter_document_rows`` is covered). The other sections go through
+    :func:`extract_sections` with *workers* and *lines_per_task*; without
+    anything to reuse, a document that would not be split over several
+    workers goes through :func:`walk_sections`.
+    """
+
+    def __init__(
+        self,
+        stored: Optional[List[Dict[str, Any]]] = None,
+        previous: Optional[List[Dict[str, Any]]] = None,
+        *,
+        workers: Optional[int] = None,
+        lines_per_task: int = RULES_LINES_PER_TASK,
+    ) -> None:
+        self.previous = previous
+        self.workers = workers
+        self.lines_per_task = lines_per_task
+        self.known: Dict[str, Dict[str, Any]] = {}
+        for entry in (stored or []) + (previous or []):
+            self.known.setdefault(entry["fingerprint"], entry)
+        self.sections: List[ListSection] = []
+
+    def __call__(self, items: Iterable[Any], metadata: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, str]]:
+        items = list(items)
+        workers = self.workers or TASKS.workers
+        if not self.known and (workers <= 1 or len(items) <= self.lines_per_task):
+            self.sections = []
+            yield from walk_sections(items, self.sections)
+            if metadata is not None:
+                metadata["needs_review"] = any(s.needs_review for s in self.sections)
+            return
+        self.sections = split_sections(items)
+        pending = []
+        for section in self.sections:
+            entry = self.known.get(section.fingerprint)
+            if entry is None:
+                pending.append(section)
+                continue
+            section.rows = entry["rows"]
+            section.needs_review = entry["needs_review"]
+            section.reused = True
+        extract_sections(pending, workers=self.workers, lines_per_task=self.lines_per_task)
+        for section in self.sections:
+            for row in section.rows:
+                yield dict(row)
+        if metadata is not None:
+            metadata["needs_review"] = any(s.needs_review for s in self.sections)
+
+    def stored(self) -> List[Dict[str, Any]]:
+        """The sections in the form kept by :class:`SectionStore`."""
+        return [section.to_dict() for section in self.sections]
+
+    def changes(self) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """:func:`diff_lists` against *previous* (``None`` without one)."""
+        if self.previous is None:
+            return None
+        return diff_lists(self.previous, self.stored())
+
+    def summary(self) -> Dict[str, int]:
+        reused = sum(1 for s in self.sections if s.reused)
+        return {"total": len(self.sections), "reused": reused, "extracted": len(self.sections) - reused}
+
+
+def _lists(sections: Iterable[Dict[str, Any]]) -> Dict[ListId, Tuple[str, ...]]:
+    """List -> fingerprints of its sections; sections without rows are not lists."""
+    lists: Dict[ListId, Tuple[str, ...]] = {}
+    for entry in sections:
+        if entry["rows"]:
+            key = tuple(entry["lista"])
+            lists[key] = lists.get(key, ()) + (entry["fingerprint"],)
+    return lists
+
+
+def diff_lists(previous: List[Dict[str, Any]], current: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Lists added, removed and modified between two stored section lists."""
+    before, after = _lists(previous), _lists(current)
+
+    def describe(keys: Iterable[ListId]) -> List[Dict[str, Any]]:
+        return [{"orgao": k[0], "cabecalho_orgao": k[1], "sigla": k[2], "nome_lista": k[3]} for k in keys]
+
+    return {
+        "added": describe(k for k in after if k not in before),
+        "removed": describe(k for k in before if k not in after),
+        "modified": describe(k for k in after if k in before and after[k] != before[k]),
+    }
+
+
+SECTIONS = SectionStore()
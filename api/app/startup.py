@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Startup budget report: import time and RSS of the API module.
+
+spaCy, pandas, python-docx, rapidfuzz and ftfy are imported on first use, so
+a rule-only worker never loads spaCy and a fresh worker only pays for
+FastAPI. Run ``python -m app.startup`` (``--json`` for machine output) in a
+fresh interpreter to check the budget; the API also logs the same report
+once at startup.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+HEAVY_MODULES = ("spacy", "pandas", "docx", "rapidfuzz", "ftfy")
+STARTUP_IMPORT_BUDGET_S = float(os.environ.get("STARTUP_IMPORT_BUDGET_S", "1.5"))
+
+logger = logging.getLogger("cne.startup")
+
+
+def rss_bytes() -> int:
+    """Current resident set size (peak RSS where ``/proc`` is unavailable)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def heavy_modules_loaded() -> List[str]:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def report(import_seconds: Optional[float] = None, module: str = "app.main") -> Dict[str, Any]:
+    return {
+        "module": module,
+        "import_seconds": None if import_seconds is None else round(import_seconds, 4),
+        "rss_bytes": rss_bytes(),
+        "heavy_modules_loaded": heavy_modules_loaded(),
+    }
+
+
+def measure(module: str = "app.main") -> Dict[str, Any]:
+    """Import *module* and report how long it took; meaningful in a fresh interpreter."""
+    started = time.perf_counter()
+    importlib.import_module(module)
+    return report(time.perf_counter() - started, module)
+
+
+def log_report(import_seconds: Optional[float] = None) -> Dict[str, Any]:
+    data = report(import_seconds)
+    logger.info(
+        "startup: import=%ss rss=%.1fMiB heavy_modules=%s",
+        data["import_seconds"],
+        data["rss_bytes"] / (1024 * 1024),
+        ",".join(data["heavy_modules_loaded"]) or "-",
+    )
+    return data
+
+
+def _parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure API import time and RSS.")
+    parser.add_argument("--module", default="app.main", help="Module to import (default: app.main).")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=STARTUP_IMPORT_BUDGET_S,
+        help="Fail (exit 1) when the import takes longer than this many seconds.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = _parse_args(argv)
+    data = measure(args.module)
+    data["budget_seconds"] = args.budget
+    if args.json:
+        print(json.dumps(data))
+    else:
+        print(f"import {data['module']}: {data['import_seconds']}s (budget {args.budget}s)")
+        print(f"rss: {data['rss_bytes'] / (1024 * 1024):.1f} MiB")
+        print(f"heavy modules loaded: {', '.join(data['heavy_modules_loaded']) or '-'}")
+    return 0 if data["import_seconds"] <= args.budget else 1
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
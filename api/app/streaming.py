@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Streaming bodies for ``/extract?stream=ndjson|csv``.
+
+Rows are produced by :func:`app.extraction.iter_rows` and go out to the
+client as soon as the rule engine emits them. They are also collected, so
+the CNE/QA artefacts can still be written to disk for audit once the
+response has been sent.
+"""
+
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.csv_writer import CLEAN_COLS, CNE_COLS
+from app.extraction import iter_finalized_rows, iter_rows
+from app.metrics import Timings
+from app.utils_text import ensure_clean, sanitize_rows
+from extractor.pipeline import infer_dtmnfr_from_path
+
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def iter_safe_rows(
+    params: Dict[str, Any],
+    collected: List[Dict[str, Any]],
+    metadata: Dict[str, Any],
+    timings: Optional[Timings] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield final (finalised + sanitised) rows, appending each to *collected*."""
+    rows = iter_rows(
+        params["in_path"],
+        enable_ia=params["enable_ia"],
+        use_ner=params["use_ner"],
+        ner_model_dir=params["ner_model_dir"],
+        metadata=metadata,
+        timings=timings,
+    )
+    finalized = iter_finalized_rows(
+        rows,
+        dtmnfr=infer_dtmnfr_from_path(params["in_path"]),
+        orgao=params.get("orgao"),
+        ord_reset=params["ord_reset"],
+    )
+    for row in finalized:
+        safe = sanitize_rows([row])[0]
+        collected.append(safe)
+        yield safe
+
+
+def ndjson_body(
+    rows: Iterator[Dict[str, Any]],
+    summary: Callable[[], Dict[str, Any]],
+) -> Iterator[bytes]:
+    """One JSON object per row, closed by a ``{"_summary": ...}`` line."""
+    for row in rows:
+        yield (json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8")
+    yield (json.dumps({"_summary": summary()}, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def csv_body(rows: Iterator[Dict[str, Any]], encoding: str) -> Iterator[bytes]:
+    """``;``-separated CSV in *encoding*, byte-compatible with ``write_cne_csv``."""
+    encoder = codecs.getincrementalencoder(encoding)(errors="replace")
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";", lineterminator="\n")
+
+    def flush() -> bytes:
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return encoder.encode(data)
+
+    writer.writerow(CNE_COLS)
+    yield flush()
+    for row in rows:
+        values = []
+        for col in CNE_COLS:
+            value = row.get(col, "")
+            value = "" if value is None else value
+            values.append(ensure_clean(value) if col in CLEAN_COLS else value)
+        writer.writerow(values)
+        yield flush()
+    tail = encoder.encode("", final=True)
+    if tail:
+        yield tail
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""Table-native extraction for editais that publish candidates in Word tables.
+
+A table is a candidate table when one of its first rows is a header with a
+candidate name column and an order or type column. Tables that summarise
+the lists ("Nome da lista", "Sigla", "Partido proponente") have no
+candidate name column and stay text. The data rows of a candidate table
+are mapped straight to the CNE candidate fields, without going through the
+line regexes; every other table is flattened into lines as before.
+
+:func:`document_items` gives the rule engine the document's lines with each
+candidate table in place of its cell lines, so the list context (órgão,
+sigla, NOME_LISTA) still comes from the headings around the table. Title
+rows above the header (a merged "Lista B - BE - ..." cell) stay lines, ahead
+of the table.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+
+from app.utils_party import normalize_proponente
+from app.utils_text import clean_text
+from extractor.document import ParsedDocument
+from extractor.rules import EFETIVOS_REGEX, SUPLENTES_REGEX
+
+# Papéis das colunas, pela ordem em que são tentados em cada célula do cabeçalho.
+HEADER_ROLES = (
+    ("NUM_ORDEM", re.compile(r"\b(?:ordem|numero|num)\b|^n\s?o?$")),
+    ("INDEPENDENTE", re.compile(r"\bindep")),
+    ("TIPO", re.compile(r"\b(?:tipo|qualidade|condicao)\b|efe?c?tivo.*suplente")),
+    ("PARTIDO_PROPONENTE", re.compile(r"\b(?:partido|propon|proposto)")),
+    ("NOME_CANDIDATO", re.compile(r"\b(?:nome|candidat)")),
+)
+# "Nome da lista", "Denominação" e "Lista" são colunas da lista, não do candidato.
+_LIST_NAME_RE = re.compile(r"\b(?:lista|denominacao|designacao)\b")
+# Um cabeçalho tem células curtas; células longas são conteúdo (ex.: listas de nomes).
+MAX_HEADER_WORDS = 5
+# O cabeçalho é procurado nas primeiras linhas (pode haver um título por cima).
+HEADER_SCAN_ROWS = 3
+
+_ORDER_RE = re.compile(r"\d{1,3}")
+_YES = frozenset({"sim", "s", "x", "1", "i", "independente"})
+
+
+def _fold(text: str) -> str:
+    """Lower-case, accent-free, punctuation as single spaces (``N.º`` -> ``n o``)."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def header_columns(cells: List[str]) -> Optional[Dict[str, int]]:
+    """Column index of each field for a header row, or ``None`` if it is not one."""
+    columns: Dict[str, int] = {}
+    for index, cell in enumerate(cells):
+        folded = _fold(cell)
+        if not folded or len(folded.split()) > MAX_HEADER_WORDS:
+            continue
+        for role, pattern in HEADER_ROLES:
+            if role == "NOME_CANDIDATO" and _LIST_NAME_RE.search(folded):
+                continue
+            if role not in columns and pattern.search(folded):
+                columns[role] = index
+                break
+    if "NOME_CANDIDATO" not in columns or not ("NUM_ORDEM" in columns or "TIPO" in columns):
+        return None
+    return columns
+
+
+def _marker_tipo(text: str, current: str) -> str:
+    """``TIPO`` announced by a "Candidatos efetivos/suplentes" text, else *current*."""
+    if EFETIVOS_REGEX.search(text):
+        return "2"
+    if SUPLENTES_REGEX.search(text):
+        return "3"
+    return current
+
+
+def _tipo(value: str, current: str) -> str:
+    folded = _fold(value)
+    if folded.startswith("s"):
+        return "3"
+    if folded.startswith("e"):
+        return "2"
+    return current
+
+
+@dataclass
+class CandidateTable:
+    """Candidate fields read from one table, in row order, without list context."""
+
+    columns: Dict[str, int]
+    rows: List[Dict[str, str]] = field(default_factory=list)
+    title_rows: int = 0  # linhas acima do cabeçalho (títulos, que continuam a ser texto)
+
+
+def read_candidate_table(cells: List[List[str]]) -> Optional[CandidateTable]:
+    """Map a table's cleaned cells to candidate fields, or ``None`` if it is not a candidate table."""
+    for header_at, header in enumerate(cells[:HEADER_SCAN_ROWS]):
+        columns = header_columns(header)
+        if columns is not None:
+            break
+    else:
+        return None
+
+    table = CandidateTable(columns, title_rows=header_at)
+    tipo = _marker_tipo(" ".join(header), "2")
+    for row in cells[header_at + 1 :]:
+        values = {role: row[index] if index < len(row) else "" for role, index in columns.items()}
+        name = values["NOME_CANDIDATO"]
+        if not name or EFETIVOS_REGEX.match(name) or SUPLENTES_REGEX.match(name):
+            # Linha de separação (célula fundida "Candidatos suplentes", etc.)
+            tipo = _marker_tipo(" ".join(row), tipo)
+            continue
+        order = _ORDER_RE.search(values.get("NUM_ORDEM", ""))
+        if "NUM_ORDEM" in columns and order is None:
+            # Sem número de ordem não é um candidato (notas, totais, ...).
+            continue
+        item = {
+            "NUM_ORDEM": order.group() if order else "",
+            "NOME_CANDIDATO": clean_text(name),
+            "TIPO": _tipo(values.get("TIPO", ""), tipo),
+            "INDEPENDENTE": "1" if _fold(values.get("INDEPENDENTE", "")) in _YES else "0",
+        }
+        proponente = values.get("PARTIDO_PROPONENTE")
+        if proponente:
+            item["PARTIDO_PROPONENTE"] = normalize_proponente(proponente)
+        table.rows.append(item)
+    return table
+
+
+def document_items(document: ParsedDocument, enable_ia: bool = True) -> List[Union[str, CandidateTable]]:
+    """The document's lines, with each candidate table in place of its cell lines.
+
+    Without candidate tables this is ``document.lines(enable_ia)``.
+    """
+    found = []
+    for table in document.tables:
+        candidates = read_candidate_table(document.table_cells(table))
+        if candidates is not None:
+            found.append((table, candidates))
+    if not found:
+        return document.lines(enable_ia)
+
+    items: List[Union[str, CandidateTable]] = []
+    pos = 0
+    for table, candidates in found:
+        titles = sum(len(cell) for row in table.rows[: candidates.title_rows] for cell in row)
+        items.extend(document.lines_between(pos, table.start + titles, enable_ia))
+        items.append(candidates)
+        pos = table.start + table.n_paragraphs
+    items.extend(document.lines_between(pos, None, enable_ia))
+    return items
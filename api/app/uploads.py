@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Chunked upload persistence with size limit and SHA-256 fingerprint."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+# Margem para o envelope multipart (boundaries e restantes campos do form).
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    size: int
+    sha256: str
+
+
+def too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Ficheiro excede o limite de {limit} bytes")
+
+
+def content_length_exceeds(header: Optional[str], limit: int) -> bool:
+    """True when a request ``Content-Length`` can only belong to an oversized upload."""
+    if not header:
+        return False
+    try:
+        return int(header) > limit + MULTIPART_OVERHEAD
+    except ValueError:
+        return False
+
+
+async def store_upload(
+    file: UploadFile,
+    dest: str,
+    *,
+    max_bytes: Optional[int] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> StoredUpload:
+    """Stream *file* to *dest* in chunks, hashing the content on the way.
+
+    Raises ``HTTPException(413)`` as soon as more than *max_bytes* have been
+    read; the partial file is removed.
+    """
+    limit = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    if file.size is not None and file.size > limit:
+        raise too_large(limit)
+
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = f"{dest}.part"
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise too_large(limit)
+                digest.update(chunk)
+                out.write(chunk)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return StoredUpload(path=dest, size=size, sha256=digest.hexdigest())
@@ -3,9 +3,7 @@
 from typing import Optional
 import re
 
-SIGLAS_PARTIDOS = {
-    "PS","PPD/PSD","CDS-PP","PAN","BE","PCP-PEV","CDU","IL","LIVRE","CHEGA","NC","MPT","PTP","RIR","JPP"
-}
+from app.party_registry import get_registry
 
 COALITION_RE = re.compile(r"\b([A-Z]{2,}(?:/[A-Z]{2,})?(?:\.[A-Z]{2,}(?:/[A-Z]{2,})?)*)\b")
 
@@ -20,9 +18,9 @@ PROPONENTE_PATTERNS = [
 def find_sigla(text: str) -> Optional[str]:
     if not text:
         return None
-    for sig in sorted(SIGLAS_PARTIDOS, key=len, reverse=True):
-        if re.search(rf"\b{re.escape(sig)}\b", text):
-            return sig
+    sig = get_registry().find_sigla(text)
+    if sig:
+        return sig
     m = COALITION_RE.search(text or "")
     if m:
         cand = m.group(1)
@@ -56,5 +54,4 @@ def extract_proponente_from_line(line: str) -> Optional[str]:
 def normalize_proponente(proponente: Optional[str]) -> Optional[str]:
     if not proponente:
         return None
-    p = proponente.replace("CDSPP", "CDS-PP").replace("PPDPSD","PPD/PSD")
-    return p
+    return get_registry().rewrite_aliases(proponente)
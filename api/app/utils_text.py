@@ -1,26 +1,107 @@
 # -*- coding: utf-8 -*-
 """Utilities for cleaning mojibake-heavy text extracted from DOCX files."""
 
-from typing import Optional, Any, Dict, List
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Any, Dict, Iterable, List, Tuple
 import unicodedata as ud
+import os
 import re
 
-try:
-    from ftfy import fix_text as _fix_text
-except Exception:  # pragma: no cover - ftfy is optional at runtime
-    _fix_text = None
+from app.metrics import CallTimer
+
+if TYPE_CHECKING:  # pandas só é importado por clean_column
+    import pandas as pd
+
+_fix_text = None
+_is_bad = None
+_ftfy_checked = False
+
+
+def _load_ftfy() -> None:
+    """Import ftfy on first use; leaves the hooks as ``None`` when it is missing."""
+    global _fix_text, _is_bad, _ftfy_checked
+    if not _ftfy_checked:
+        try:
+            from ftfy import fix_text as _fix_text
+            from ftfy.badness import is_bad as _is_bad
+            import ftfy.bad_codecs  # noqa: F401  (regista "sloppy-windows-1252")
+        except Exception:  # pragma: no cover - ftfy is optional at runtime
+            _fix_text = _is_bad = None
+        _ftfy_checked = True
+
+
+def _get_fix_text():
+    _load_ftfy()
+    return _fix_text
 
 MOJIBAKE_TOKENS = ("Ã", "Â", "â", "�")
-EXPLICIT_FIXES = [
-    (re.compile(r"â€“"), "–"),
-    (re.compile(r"â€”"), "—"),
-    (re.compile(r"â€œ"), "“"),
-    (re.compile(r"â€\u009d?"), "”"),
-    (re.compile(r"â€˜"), "‘"),
-    (re.compile(r"â€™"), "’"),
-    (re.compile(r"â€"), "€"),
-]
-_ACCENT_RE = re.compile(r"[áéíóúâêôãõçÁÉÍÓÚÂÊÔÃÕÇ]")
+_ACCENT_CHARS = "áéíóúâêôãõçÁÉÍÓÚÂÊÔÃÕÇ"
+_ACCENT_RE = re.compile(f"[{_ACCENT_CHARS}]")
+
+
+# As correções explícitas de sempre ("â€" + 3.º carácter -> pontuação), tal como
+# os sete re.sub em sequência as aplicavam: "â€\x9d?" corria antes das regras
+# de "˜", "™" e "€", por isso estas nunca chegavam a apanhar nada e qualquer
+# outro "â€" vira "”". Nenhuma substituição produz "â€", portanto cortar o
+# texto em "â€" e olhar para o carácter seguinte dá o mesmo resultado.
+MOJIBAKE_LEAD = "\u00e2\u20ac"
+MOJIBAKE_REPAIRS = {
+    "\u201c": "\u2013",  # â€“ -> –
+    "\u201d": "\u2014",  # â€” -> —
+    "\u0153": "\u201c",  # â€œ -> “
+    "\u009d": "\u201d",  # â€\x9d -> ”
+}
+BARE_LEAD_REPAIR = "\u201d"  # â€ sem o 0x9D (perdido) -> ”
+
+
+def _repair_text(value: str) -> str:
+    """Apply the explicit ``â€`` fixes in one split/join pass."""
+    if MOJIBAKE_LEAD not in value:
+        return value
+    head, *rest = value.split(MOJIBAKE_LEAD)
+    out = [head]
+    for part in rest:
+        replacement = MOJIBAKE_REPAIRS.get(part[:1])
+        if replacement is None:
+            out.append(BARE_LEAD_REPAIR)
+            out.append(part)
+        else:
+            out.append(replacement)
+            out.append(part[1:])
+    return "".join(out)
+
+
+class MojibakeRepair:
+    """Repaired text plus the counts ``_prefer_candidate`` compares.
+
+    ``mojibake`` (markers left) and ``accents`` are computed on first access;
+    the accent count is only needed when two candidates tie on markers.
+    """
+
+    __slots__ = ("text", "_mojibake", "_accents")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self._mojibake: Optional[int] = None
+        self._accents: Optional[int] = None
+
+    @property
+    def mojibake(self) -> int:
+        if self._mojibake is None:
+            self._mojibake = sum(map(self.text.count, MOJIBAKE_TOKENS))
+        return self._mojibake
+
+    @property
+    def accents(self) -> int:
+        if self._accents is None:
+            self._accents = len(_ACCENT_RE.findall(self.text))
+        return self._accents
+
+
+def repair_mojibake(value: str) -> MojibakeRepair:
+    """Apply the explicit ``â€`` fixes and count what is left for ``_prefer_repaired``."""
+    return MojibakeRepair(_repair_text(value))
 
 
 def looks_mojibake(value: str) -> bool:
@@ -28,13 +109,6 @@ def looks_mojibake(value: str) -> bool:
     return bool(value) and any(tok in value for tok in MOJIBAKE_TOKENS)
 
 
-def _apply_explicit_fixes(value: str) -> str:
-    fixed = value
-    for pattern, replacement in EXPLICIT_FIXES:
-        fixed = pattern.sub(replacement, fixed)
-    return fixed
-
-
 def _latin1_to_utf8(value: str) -> str:
     try:
         return value.encode("latin-1", "ignore").decode("utf-8", "ignore")
@@ -44,65 +118,288 @@ def _latin1_to_utf8(value: str) -> str:
 
 def _prefer_candidate(current: str, candidate: str) -> str:
     """Pick whichever text looks cleaner (fewer mojibake markers, more accents)."""
-    if not candidate:
-        return current
-    candidate = candidate.strip()
-    current = current.strip()
-    if not candidate:
-        return current
-
-    current_bad = looks_mojibake(current)
-    candidate_bad = looks_mojibake(candidate)
+    return _prefer_repaired(MojibakeRepair(current), MojibakeRepair(candidate))
+
+
+def _prefer_repaired(current: MojibakeRepair, candidate: MojibakeRepair) -> str:
+    # Espaços não mexem nas contagens, por isso valem também para o texto com strip().
+    if not candidate.text:
+        return current.text
+    candidate_text = candidate.text.strip()
+    current_text = current.text.strip()
+    if not candidate_text:
+        return current_text
+
+    current_bad = current.mojibake > 0
+    candidate_bad = candidate.mojibake > 0
     if current_bad and not candidate_bad:
-        return candidate
+        return candidate_text
     if candidate_bad and not current_bad:
-        return current
+        return current_text
+
+    if candidate.mojibake < current.mojibake:
+        return candidate_text
+
+    if candidate.accents > current.accents:
+        return candidate_text
+
+    return candidate_text if candidate_text != current_text else current_text
 
-    current_repl = sum(current.count(tok) for tok in MOJIBAKE_TOKENS)
-    candidate_repl = sum(candidate.count(tok) for tok in MOJIBAKE_TOKENS)
-    if candidate_repl < current_repl:
-        return candidate
 
-    current_accents = len(_ACCENT_RE.findall(current))
-    candidate_accents = len(_ACCENT_RE.findall(candidate))
-    if candidate_accents > current_accents:
-        return candidate
+# Texto que nenhuma das correções abaixo altera. ASCII imprimível sem "&" (o ftfy
+# resolve entidades HTML) sai só com ``strip()``. Letras Latin-1 pré-compostas (já
+# NFC) sem Â/Ã/â também, desde que o ftfy não as considere mojibake (``is_bad``).
+_ASCII_CLEAN_RE = re.compile(r"[\t\n\x20-\x25\x27-\x7e]*")
+_LATIN_CLEAN_RE = re.compile(r"[\t\x20-\x25\x27-\x7e\xc0\xc1\xc4-\xd6\xd8-\xe1\xe3-\xf6\xf8-\xff]*")
 
-    return candidate if candidate != current else current
+CLEAN_TEXT_CACHE_SIZE = int(os.environ.get("CLEAN_TEXT_CACHE_SIZE", "65536"))
+# Textos maiores (parágrafos inteiros) não entram na cache para não a encher.
+CLEAN_TEXT_CACHE_MAX_LEN = 1024
+
+_clean_stats = {"fast_path": 0, "uncached": 0, "already_clean": 0}
+
+
+class CleanText(str):
+    """A ``str`` produced by ``clean_text`` that ``clean_text`` leaves unchanged.
+
+    The mark travels with the value through dict copies, pickling to the
+    worker pool and pandas object columns, so later sanitising passes return
+    it as is. Anything derived from it (slices, ``+``, ``.upper()``, ...) is a
+    plain ``str`` again and gets cleaned normally.
+    """
+
+    __slots__ = ()
 
 
 def clean_text(value: Optional[str]) -> str:
     """Fixes mojibake artefacts and normalises the output to NFC."""
     if value is None:
         return ""
+    if type(value) is CleanText:
+        _clean_stats["already_clean"] += 1
+        return value
 
     text = str(value)
+    if _ASCII_CLEAN_RE.fullmatch(text):
+        _clean_stats["fast_path"] += 1
+        return CleanText(text.strip())
+    if len(text) <= CLEAN_TEXT_CACHE_MAX_LEN:
+        return _clean_text_memo(text)
+    _clean_stats["uncached"] += 1
+    return _clean_and_mark(text)
+
+
+def _is_clean_latin(text: str) -> bool:
+    if not _LATIN_CLEAN_RE.fullmatch(text):
+        return False
+    _load_ftfy()
+    return _is_bad is None or not _is_bad(text)
+
 
-    if _fix_text:
+def _clean_text(text: str) -> str:
+    if _is_clean_latin(text):
+        _clean_stats["fast_path"] += 1
+        return text.strip()
+
+    fix_text = _get_fix_text()
+    if fix_text:
         try:
-            fixed = _fix_text(text)
+            fixed = fix_text(text)
             text = _prefer_candidate(text, fixed)
         except Exception:
             pass
 
-    text = _apply_explicit_fixes(text)
+    repaired = repair_mojibake(text)
+    text = repaired.text
 
-    if looks_mojibake(text):
-        decoded = _latin1_to_utf8(text)
-        decoded = _apply_explicit_fixes(decoded)
-        text = _prefer_candidate(text, decoded)
+    if repaired.mojibake:
+        text = _prefer_repaired(repaired, repair_mojibake(_latin1_to_utf8(text)))
 
-    text = _apply_explicit_fixes(text)
+    text = _repair_text(text)
     text = ud.normalize("NFC", text)
     return text.strip()
 
 
+def _clean_and_mark(text: str) -> str:
+    # clean_text não é idempotente em todos os casos (ex.: "JOÃO" -> "JOO"), por
+    # isso só se marca o resultado quando uma nova passagem não o altera.
+    fixed = _clean_text(text)
+    if fixed == text or _clean_text(fixed) == fixed:
+        return CleanText(fixed)
+    return fixed
+
+
+_clean_text_memo = lru_cache(maxsize=CLEAN_TEXT_CACHE_SIZE)(_clean_and_mark)
+
+
+def clean_text_stats() -> Dict[str, int]:
+    """Per-process counters: fast path, memo hits/misses, uncached long texts and
+    values skipped because they were already clean."""
+    info = _clean_text_memo.cache_info()
+    return {
+        "fast_path": _clean_stats["fast_path"],
+        "hits": info.hits,
+        "misses": info.misses,
+        "uncached": _clean_stats["uncached"],
+        "already_clean": _clean_stats["already_clean"],
+        "cache_size": info.currsize,
+    }
+
+
+def clean_text_stats_since(before: Dict[str, int]) -> Dict[str, int]:
+    """Counter deltas since *before* (a previous :func:`clean_text_stats`)."""
+    now = clean_text_stats()
+    return {key: now[key] - before[key] for key in ("fast_path", "hits", "misses", "uncached", "already_clean")}
+
+
+ENCODING_CLEAN = "clean"
+ENCODING_DOUBLE = "double_encoded"
+ENCODING_MIXED = "mixed"
+
+# Pela ordem em que o ftfy as tenta: para texto que ambas codificam, dão os mesmos bytes.
+_DOUBLE_ENCODING_CODECS = ("latin-1", "sloppy-windows-1252")
+
+
+@dataclass
+class EncodingDiagnosis:
+    """Encoding health of a whole document.
+
+    ``segments`` counts the non-ASCII lines inspected and ``mojibake`` the
+    ones flagged. ``codec`` is set for ``double_encoded`` documents: every
+    flagged line is UTF-8 that was decoded once as latin-1/cp1252.
+    """
+
+    kind: str
+    segments: int = 0
+    mojibake: int = 0
+    codec: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _redecode(segment: str) -> Optional[Tuple[str, str]]:
+    for codec in _DOUBLE_ENCODING_CODECS:
+        try:
+            return segment.encode(codec).decode("utf-8"), codec
+        except UnicodeError:
+            continue
+    return None
+
+
+def diagnose_encoding(texts: Iterable[str]) -> EncodingDiagnosis:
+    """Classify *texts* (a document's paragraphs) as clean, uniformly
+    double-encoded or mixed.
+
+    Works line by line, like ``ftfy.fix_text``. A document is
+    ``double_encoded`` only when every non-ASCII line is flagged by ftfy and
+    re-decodes as strict UTF-8; that is the case in which ftfy would apply
+    exactly that re-decoding to each string. Without ftfy there is no
+    reliable signal, so such documents are reported as ``mixed``.
+    """
+    _load_ftfy()
+    segments = flagged = 0
+    uniform = _is_bad is not None
+    codecs_used = set()
+    for text in texts:
+        for segment in text.split("\n"):
+            if segment.isascii():
+                continue
+            segments += 1
+            bad = _is_bad(segment) if _is_bad is not None else looks_mojibake(segment)
+            if not bad:
+                uniform = False
+                continue
+            flagged += 1
+            if uniform:
+                redecoded = _redecode(segment)
+                if redecoded is None:
+                    uniform = False
+                else:
+                    codecs_used.add(redecoded[1])
+    if not flagged:
+        return EncodingDiagnosis(ENCODING_CLEAN, segments, 0)
+    if uniform:
+        codec = "cp1252" if "sloppy-windows-1252" in codecs_used else "latin-1"
+        return EncodingDiagnosis(ENCODING_DOUBLE, segments, flagged, codec)
+    return EncodingDiagnosis(ENCODING_MIXED, segments, flagged)
+
+
+def clean_known_good(text: str) -> str:
+    """``clean_text`` for text from a document diagnosed ``clean``.
+
+    The diagnosis already ran ftfy's ``is_bad`` on every line, so Latin-1
+    text skips straight to the fast path instead of checking it again.
+    """
+    if _LATIN_CLEAN_RE.fullmatch(text):
+        _clean_stats["fast_path"] += 1
+        return CleanText(text.strip())
+    return clean_text(text)
+
+
+def repair_double_encoding(text: str) -> str:
+    """Undo one latin-1/cp1252 round of double encoding, line by line.
+
+    Meant for text from a document diagnosed as ``double_encoded``; lines
+    that do not re-decode are returned unchanged.
+    """
+    if text.isascii():
+        return text
+    out = []
+    for segment in text.split("\n"):
+        redecoded = None if segment.isascii() else _redecode(segment)
+        out.append(redecoded[0] if redecoded else segment)
+    return "\n".join(out)
+
+
+# Tempo acumulado em clean_text (por processo), usado nas métricas por etapa.
+CLEAN_TEXT_TIMER = CallTimer()
+clean_text = CLEAN_TEXT_TIMER.wrap(clean_text)
+
+
+def ensure_clean(value: Optional[str]) -> str:
+    """``clean_text`` that returns values already marked :class:`CleanText` untouched.
+
+    Skips the call (and its timing wrapper) entirely, which is what makes the
+    repeated sanitising passes over every row cheap.
+    """
+    return value if type(value) is CleanText else clean_text(value)
+
+
+def clean_column(values: "pd.Series") -> "pd.Series":
+    """``values.map(ensure_clean)`` computed once per distinct value.
+
+    Columns such as ``SIGLA`` or ``NOME_LISTA`` repeat a handful of values
+    over thousands of rows: the column is factorised, only the uniques are
+    cleaned and the results are broadcast back through the codes.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(values)
+    cleaned = np.empty(len(uniques) + 1, dtype=object)
+    cleaned[:-1] = [ensure_clean(value) for value in uniques]
+    out = cleaned.take(codes)
+    # O factorize junta None e NaN no código -1; map() dava "" e "nan" respetivamente.
+    missing = codes < 0
+    if missing.any():
+        out[missing] = [ensure_clean(value) for value in values.to_numpy()[missing]]
+    return pd.Series(out, index=values.index, name=values.name)
+
+
 def sanitize_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Returns a deep copy of ``rows`` with ``clean_text`` applied to all strings."""
     sanitized: List[Dict[str, Any]] = []
+    # Códigos curtos (TIPO, ORGAO, NUM_ORDEM, ...) repetem-se em quase todas as linhas.
+    seen: Dict[str, str] = {}
     for row in rows:
         cleaned: Dict[str, Any] = {}
         for key, value in row.items():
-            cleaned[key] = clean_text(value) if isinstance(value, str) else value
+            if type(value) is not CleanText and isinstance(value, str):
+                fixed = seen.get(value)
+                if fixed is None:
+                    fixed = seen[value] = clean_text(value)
+                value = fixed
+            cleaned[key] = value
         sanitized.append(cleaned)
     return sanitized
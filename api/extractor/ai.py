@@ -1,17 +1,90 @@
-from rapidfuzz import process, fuzz
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
 
-CANON_SIGLAS = [
-    "PS","PPD/PSD","CDS-PP","CH","IL","BE","BE.L","PCP-PEV","PAN","LIVRE","CHEGA","CDU"
-]
+from app.party_registry import PartyRegistry, get_registry
+
+# Siglas brutas já resolvidas, guardadas entre execuções (e partilhadas pelos workers).
+SIGLA_CACHE_PATH = os.environ.get(
+    "SIGLA_CACHE_PATH", os.path.join(os.environ.get("APP_DATA", "/app/data"), "sigla_aliases.json")
+)
+SIGLA_SCORE_CUTOFF = 90
+
+_aliases: Dict[str, str] = {}
+_aliases_for: Optional[str] = None
+_lock = threading.Lock()
+
+def _read_persisted(fingerprint: str) -> Dict[str, str]:
+    try:
+        with open(SIGLA_CACHE_PATH, encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    # Resoluções feitas com outro registo de partidos deixam de valer.
+    if not isinstance(data, dict) or data.get("registry") != fingerprint:
+        return {}
+    return dict(data.get("aliases") or {})
+
+def _persist(fingerprint: str, aliases: Dict[str, str]) -> None:
+    merged = {**_read_persisted(fingerprint), **aliases}
+    tmp = f"{SIGLA_CACHE_PATH}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"registry": fingerprint, "aliases": dict(sorted(merged.items()))}, fh, ensure_ascii=False, indent=1)
+        os.replace(tmp, SIGLA_CACHE_PATH)
+    except OSError:
+        pass
+
+def _current_aliases(fingerprint: str) -> Dict[str, str]:
+    global _aliases, _aliases_for
+    if _aliases_for != fingerprint:
+        _aliases, _aliases_for = _read_persisted(fingerprint), fingerprint
+    return _aliases
+
+def _resolve(siglas: List[str], registry: PartyRegistry) -> Dict[str, str]:
+    resolved = {s: registry.canonical[s] for s in siglas if s in registry.canonical}
+    fuzzy = [s for s in siglas if s not in resolved]
+    if not fuzzy or not registry.canonical_siglas:
+        resolved.update((s, s) for s in fuzzy)
+        return resolved
+    from rapidfuzz import process, fuzz
+
+    # Uma só matriz consultas x siglas canónicas; argmax fica com a primeira em empate, como o extractOne.
+    scores = process.cdist(fuzzy, registry.canonical_siglas, scorer=fuzz.token_set_ratio)
+    for s, row in zip(fuzzy, scores):
+        best = int(row.argmax())
+        resolved[s] = registry.canonical_siglas[best] if row[best] >= SIGLA_SCORE_CUTOFF else s
+    return resolved
+
+def normalize_siglas(siglas_raw: Iterable[str]) -> Dict[str, str]:
+    """Map each raw sigla to its canonical form, resolving all unseen ones in one ``cdist`` call."""
+    registry = get_registry()
+    wanted = {raw: raw.strip() for raw in siglas_raw}
+    with _lock:
+        aliases = _current_aliases(registry.fingerprint)
+        missing = sorted({s for s in wanted.values() if s not in aliases})
+    if missing:
+        resolved = _resolve(missing, registry)
+        with _lock:
+            aliases = _current_aliases(registry.fingerprint)
+            aliases.update(resolved)
+            _persist(registry.fingerprint, resolved)
+    return {raw: aliases[s] for raw, s in wanted.items()}
 
 def normalize_sigla(sigla_raw: str) -> str:
     s = sigla_raw.strip()
-    if s == "CDU":
-        return "PCP-PEV"
-    best = process.extractOne(s, CANON_SIGLAS, scorer=fuzz.token_set_ratio)
-    if best and best[1] >= 90:
-        return best[0]
-    return s
+    aliases = _aliases
+    if _aliases_for == get_registry().fingerprint and s in aliases:
+        return aliases[s]
+    return normalize_siglas([s])[s]
+
+def sigla_aliases() -> Dict[str, str]:
+    """Every raw sigla resolved so far (this process and the persisted cache), for audit."""
+    registry = get_registry()
+    with _lock:
+        aliases = {**_read_persisted(registry.fingerprint), **_current_aliases(registry.fingerprint)}
+    return dict(sorted(aliases.items()))
 
 def guess_is_name(line: str, enable_ia: bool = True) -> bool:
     if not enable_ia:
@@ -0,0 +1,274 @@
+"""In-memory model of a parsed DOCX, built once and reused by every stage.
+
+The file is only read in :func:`load_docx`, through
+:func:`iter_docx_blocks`: ``word/document.xml`` is stream-parsed in body
+order, so a table that sits between two list headings stays between them,
+and only the paragraph or table being read is held in memory. Paragraph
+clean-up, the normalised text and the linearised line variants
+(``enable_ia`` on/off) are computed lazily on first access and cached on the
+object, so fallbacks and later stages never re-open or re-parse the file.
+
+Before cleaning, the paragraphs are diagnosed as a whole (``encoding``). A
+uniformly double-encoded document is re-decoded once per paragraph, after
+which most strings take ``clean_text``'s fast path; a clean one reuses the
+diagnosis to skip ftfy's checks; only mixed documents are cleaned fully
+string by string.
+"""
+
+import posixpath
+import zipfile
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from xml.etree import ElementTree as ET
+
+from app.utils_text import (
+    ENCODING_CLEAN,
+    ENCODING_DOUBLE,
+    EncodingDiagnosis,
+    clean_known_good,
+    clean_text,
+    diagnose_encoding,
+    repair_double_encoding,
+)
+from .rules import iter_normalized_lines, normalize_whitespace
+
+
+@dataclass
+class Paragraph:
+    raw: str
+
+    @cached_property
+    def clean(self) -> str:
+        return clean_text(self.raw.strip())
+
+
+@dataclass
+class DocxTable:
+    """A top-level table: rows of cells, each cell the text of its paragraphs.
+
+    ``start`` is the index of the table's first paragraph in
+    ``ParsedDocument.paragraphs``, where the cells are also listed in order.
+    """
+
+    rows: List[List[List[str]]] = field(default_factory=list)
+    start: int = 0
+
+    def paragraphs(self) -> Iterator[str]:
+        for row in self.rows:
+            for cell in row:
+                yield from cell
+
+    @property
+    def n_paragraphs(self) -> int:
+        return sum(len(cell) for row in self.rows for cell in row)
+
+
+@dataclass
+class ParsedDocument:
+    path: str
+    paragraphs: List[Paragraph]
+    tables: List[DocxTable] = field(default_factory=list)
+    _lines: Dict[bool, Tuple[str, ...]] = field(default_factory=dict, repr=False)
+
+    @cached_property
+    def encoding(self) -> EncodingDiagnosis:
+        return diagnose_encoding(p.raw.strip() for p in self.paragraphs)
+
+    @cached_property
+    def cleaned(self) -> List[str]:
+        """``clean_text`` of each paragraph, using the document-level diagnosis."""
+        kind = self.encoding.kind
+        if kind == ENCODING_CLEAN:
+            return [clean_known_good(p.raw.strip()) for p in self.paragraphs]
+        if kind == ENCODING_DOUBLE:
+            return [clean_text(repair_double_encoding(p.raw.strip())) for p in self.paragraphs]
+        return [p.clean for p in self.paragraphs]
+
+    @cached_property
+    def _cleaned_text(self) -> str:
+        return "\n".join(c for c in self.cleaned if c)
+
+    @cached_property
+    def text(self) -> str:
+        """Cleaned, whitespace-normalised text (what ``parse_docx`` returns)."""
+        return normalize_whitespace(self._cleaned_text)
+
+    @cached_property
+    def candidate_lines(self) -> List[str]:
+        # Normaliza e parte numa só passagem, sem construir ``text``.
+        return list(iter_normalized_lines(self._cleaned_text))
+
+    def lines(self, enable_ia: bool = True) -> List[str]:
+        """Linearised lines; ``enable_ia`` applies ``clean_text`` to each line."""
+        if enable_ia not in self._lines:
+            self._lines[enable_ia] = tuple(_line_variant(self.candidate_lines, enable_ia))
+        return list(self._lines[enable_ia])
+
+    def lines_between(self, start: int, end: Optional[int] = None, enable_ia: bool = True) -> List[str]:
+        """:meth:`lines` of ``paragraphs[start:end]`` only.
+
+        The paragraphs are joined with single newlines after ``strip()``, so
+        the lines of consecutive slices add up to the document's lines.
+        """
+        text = "\n".join(c for c in self.cleaned[start:end] if c)
+        return _line_variant(iter_normalized_lines(text), enable_ia)
+
+    def table_cells(self, table: DocxTable) -> List[List[str]]:
+        """Cleaned text of each cell of *table*, its paragraphs joined by a space."""
+        pos = table.start
+        rows = []
+        for row in table.rows:
+            cells = []
+            for cell in row:
+                cells.append(" ".join(" ".join(self.cleaned[pos : pos + len(cell)]).split()))
+                pos += len(cell)
+            rows.append(cells)
+        return rows
+
+
+def _line_variant(raw_lines: Iterable[str], enable_ia: bool) -> List[str]:
+    out = []
+    for raw in raw_lines:
+        line = clean_text(raw) if enable_ia else raw.strip()
+        if line:
+            out.append(line)
+    return out
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_P, _R, _HYPERLINK, _T, _BR = (_W + t for t in ("p", "r", "hyperlink", "t", "br"))
+_BR_TYPE = _W + "type"
+# Equivalentes de texto dos restantes elementos de um run (como no python-docx).
+_RUN_TEXT = {_W + "tab": "\t", _W + "ptab": "\t", _W + "cr": "\n", _W + "noBreakHyphen": "-"}
+_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_OFFICE_DOCUMENT = "/officeDocument"
+
+
+def _main_part(zf: zipfile.ZipFile) -> str:
+    """Name of the main document part (``word/document.xml`` unless the package says otherwise)."""
+    try:
+        rels = ET.fromstring(zf.read("_rels/.rels"))
+    except (KeyError, ET.ParseError):
+        return "word/document.xml"
+    for rel in rels.iter(_REL_NS + "Relationship"):
+        if rel.get("Type", "").endswith(_OFFICE_DOCUMENT):
+            return posixpath.normpath(rel.get("Target", "").lstrip("/"))
+    return "word/document.xml"
+
+
+def _run_text(run: ET.Element, parts: List[str]) -> None:
+    for el in run:
+        tag = el.tag
+        if tag == _T:
+            parts.append(el.text or "")
+        elif tag == _BR:
+            # Quebras de página/coluna não produzem texto.
+            if el.get(_BR_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag in _RUN_TEXT:
+            parts.append(_RUN_TEXT[tag])
+
+
+def _paragraph_text(p: ET.Element) -> str:
+    """Same text as python-docx's ``Paragraph.text``: runs and hyperlink runs only."""
+    parts: List[str] = []
+    for child in p:
+        if child.tag == _R:
+            _run_text(child, parts)
+        elif child.tag == _HYPERLINK:
+            for run in child:
+                if run.tag == _R:
+                    _run_text(run, parts)
+    return "".join(parts)
+
+
+_TBL, _TR, _TC = (_W + t for t in ("tbl", "tr", "tc"))
+
+
+def iter_docx_blocks(path: str) -> Iterator[Union[str, DocxTable]]:
+    """Yield the body of *path* in order: paragraph texts and top-level tables.
+
+    Each ``w:tc`` is read once, so merged cells are not repeated; paragraphs
+    of nested tables are kept in the enclosing top-level cell. Paragraphs
+    nested in another paragraph (text boxes) are skipped, as python-docx
+    does. Finished elements are dropped from the tree as the parse goes, so
+    memory stays bounded by the largest paragraph or table.
+    """
+    with zipfile.ZipFile(path) as zf, zf.open(_main_part(zf)) as fh:
+        stack: List[ET.Element] = []
+        in_paragraph = 0
+        in_table = 0
+        table: Optional[DocxTable] = None
+        for event, elem in ET.iterparse(fh, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                stack.append(elem)
+                if tag == _P:
+                    in_paragraph += 1
+                elif in_paragraph:
+                    pass
+                elif tag == _TBL:
+                    in_table += 1
+                    if in_table == 1:
+                        table = DocxTable()
+                elif in_table == 1 and tag == _TR:
+                    table.rows.append([])
+                elif in_table == 1 and tag == _TC:
+                    table.rows[-1].append([])
+                continue
+            stack.pop()
+            if tag == _P:
+                in_paragraph -= 1
+                if in_paragraph:
+                    continue
+                if table is None:
+                    yield _paragraph_text(elem)
+                else:
+                    table.rows[-1][-1].append(_paragraph_text(elem))
+            elif in_paragraph:
+                # Dentro de um parágrafo a subárvore só é lida quando ele fecha.
+                continue
+            elif tag == _TBL:
+                in_table -= 1
+                if not in_table:
+                    yield table
+                    table = None
+            if stack:
+                stack[-1].remove(elem)
+
+
+def iter_docx_paragraphs(path: str) -> Iterator[str]:
+    """Yield the text of every paragraph of *path* in body order.
+
+    Table-cell paragraphs come out where the table sits, row by row and cell
+    by cell (see :func:`iter_docx_blocks`).
+    """
+    for block in iter_docx_blocks(path):
+        if isinstance(block, str):
+            yield block
+        else:
+            yield from block.paragraphs()
+
+
+def load_document(path: str) -> ParsedDocument:
+    """:func:`load_docx`, or :func:`extractor.pdf.load_pdf` when *path* is a PDF."""
+    from .pdf import is_pdf, load_pdf
+
+    if is_pdf(path):
+        return load_pdf(path)
+    return load_docx(path)
+
+
+def load_docx(path: str) -> ParsedDocument:
+    """Read every paragraph of *path*, table cells included, in document order."""
+    paragraphs: List[Paragraph] = []
+    tables: List[DocxTable] = []
+    for block in iter_docx_blocks(path):
+        if isinstance(block, str):
+            paragraphs.append(Paragraph(block))
+        else:
+            block.start = len(paragraphs)
+            tables.append(block)
+            paragraphs.extend(Paragraph(text) for text in block.paragraphs())
+    return ParsedDocument(path=path, paragraphs=paragraphs, tables=tables)
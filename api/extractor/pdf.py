@@ -0,0 +1,85 @@
+"""PDF ingest: pdfminer text extracted page range by page range in parallel.
+
+pdfminer lays out each page on its own, so a document can be cut into page
+ranges, each range extracted in a process of the shared ``app.jobs.TASKS``
+executor and the texts joined back in page order; the result is the same
+text as a single ``extract_text`` call. Documents with a single range, or
+jobs left with a single task worker, are extracted in-process.
+
+The text lines become the paragraphs of a :class:`ParsedDocument`, so PDFs
+go through the same cleaning, encoding diagnosis and linearisation as DOCX.
+"""
+
+import importlib.util
+import os
+from typing import Iterator, List, Optional, Tuple
+
+from app.jobs import TASKS
+
+from .document import Paragraph, ParsedDocument
+
+PDF_PAGES_PER_TASK = int(os.environ.get("PDF_PAGES_PER_TASK", "8"))
+
+PDF_MAGIC = b"%PDF-"
+
+
+def is_pdf(path: str) -> bool:
+    """True when *path* starts with the PDF header (whatever its extension)."""
+    with open(path, "rb") as fh:
+        return fh.read(len(PDF_MAGIC)) == PDF_MAGIC
+
+
+def _require_pdfminer() -> None:
+    if importlib.util.find_spec("pdfminer.high_level") is None:
+        raise RuntimeError("PDF support requires the 'pdfminer.six' package to be installed.")
+
+
+def count_pages(path: str) -> int:
+    _require_pdfminer()
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+
+    with open(path, "rb") as fh:
+        return sum(1 for _ in PDFPage.create_pages(PDFDocument(PDFParser(fh))))
+
+
+def extract_page_range(path: str, start: int, stop: int) -> str:
+    """Text of pages ``start <= n < stop`` (0-based), as ``extract_text`` gives it."""
+    _require_pdfminer()
+    from pdfminer.high_level import extract_text
+
+    return extract_text(path, page_numbers=range(start, stop)) or ""
+
+
+def page_ranges(n_pages: int, per_task: int = PDF_PAGES_PER_TASK) -> List[Tuple[int, int]]:
+    per_task = max(1, per_task)
+    return [(start, min(start + per_task, n_pages)) for start in range(0, n_pages, per_task)]
+
+
+def iter_pdf_text(
+    path: str, *, workers: Optional[int] = None, pages_per_task: int = PDF_PAGES_PER_TASK
+) -> Iterator[str]:
+    """Yield the text of *path* range by range, in page order.
+
+    The ranges go to the shared ``app.jobs.TASKS`` executor when more than
+    one worker is allowed (*workers*, default ``TASKS.workers``).
+    """
+    ranges = page_ranges(count_pages(path), pages_per_task)
+    workers = min(workers or TASKS.workers, len(ranges))
+    if workers <= 1:
+        for start, stop in ranges:
+            yield extract_page_range(path, start, stop)
+        return
+    # map devolve pela ordem de submissão: as páginas voltam a ficar em ordem.
+    yield from TASKS.map(
+        extract_page_range, [path] * len(ranges), [s for s, _ in ranges], [e for _, e in ranges]
+    )
+
+
+def load_pdf(
+    path: str, *, workers: Optional[int] = None, pages_per_task: int = PDF_PAGES_PER_TASK
+) -> ParsedDocument:
+    """Extract *path* (in parallel page ranges) into a :class:`ParsedDocument`."""
+    text = "".join(iter_pdf_text(path, workers=workers, pages_per_task=pages_per_task))
+    return ParsedDocument(path=path, paragraphs=[Paragraph(line) for line in text.splitlines()])
@@ -1,12 +1,10 @@
 import os, re
-from typing import Optional, Dict, List
-import pandas as pd
-from docx import Document
-
-from .rules import normalize_whitespace, split_candidates_by_type
-from .ai import normalize_sigla, guess_is_name
+from typing import Optional, Dict, List, Tuple
+from .document import load_docx
+from .rules import split_candidates_by_type
+from .ai import normalize_sigla, normalize_siglas, guess_is_name
 from app.csv_writer import write_cne_csv
-from app.utils_text import clean_text, sanitize_rows
+from app.utils_text import sanitize_rows
 
 CSV_COLUMNS = ["DTMNFR","ORGAO","TIPO","SIGLA","SIMBOLO","NOME_LISTA","NUM_ORDEM","NOME_CANDIDATO","PARTIDO_PROPONENTE","INDEPENDENTE"]
 
@@ -14,20 +12,7 @@ HEADER_RE = re.compile(r"^\s*([A-Z0-9\./\-]{2,12})\s*[-–—]\s*(.+?)\s*$")
 ORG_SECTION_RE = re.compile(r"^\s*(\d+\s*[.)-]\s*)?(Assembleia Municipal|C[aâ]mara Municipal)\b", re.IGNORECASE)
 
 def parse_docx(path: str) -> str:
-    doc = Document(path)
-    lines = []
-    for p in doc.paragraphs:
-        txt = clean_text(p.text.strip())
-        if txt:
-            lines.append(txt)
-    for tbl in doc.tables:
-        for row in tbl.rows:
-            for cell in row.cells:
-                for p in cell.paragraphs:
-                    txt = clean_text(p.text.strip())
-                    if txt:
-                        lines.append(txt)
-    return normalize_whitespace("\n".join(lines))
+    return load_docx(path).text
 
 def is_sigla_like(token: str) -> bool:
     return bool(token) and token.upper() == token and len(token) <= 12
@@ -68,13 +53,15 @@ def extract_blocks_with_orgao(text: str):
     push()
     return blocks
 
-def parse_header(header_line: str, enable_ia: bool):
+def split_header(header_line: str):
     m = HEADER_RE.match(header_line)
     if m:
-        sigla, nome = m.group(1), m.group(2)
-    else:
-        parts = header_line.split(maxsplit=1)
-        sigla = parts[0]; nome = parts[1] if len(parts)>1 else parts[0]
+        return m.group(1), m.group(2)
+    parts = header_line.split(maxsplit=1)
+    return parts[0], parts[1] if len(parts)>1 else parts[0]
+
+def parse_header(header_line: str, enable_ia: bool):
+    sigla, nome = split_header(header_line)
     sigla = normalize_sigla(sigla.strip()) if enable_ia else sigla.strip()
     return sigla, nome.strip()
 
@@ -111,18 +98,19 @@ def to_rows_from_block(header_line: str, content: str, orgao_hint: str, dtmnfr:
             rows.append(build_row(3, n, c)); n += 1
     return rows
 
-def extract_to_csv(
-    in_path: str,
-    out_csv: str,
-    orgao: Optional[str] = None,
-    ord_reset: bool = True,
-    enable_ia: bool = True,
-    models_dir: Optional[str] = None,
-    encoding: str = "utf-8-sig",
-) -> Dict:
-    dtmnfr = infer_dtmnfr_from_path(in_path)
-    text = parse_docx(in_path)
+def extract_block_rows(
+    text: str,
+    dtmnfr: str,
+    orgao: Optional[str] = None,
+    ord_reset: bool = True,
+    enable_ia: bool = True,
+) -> Tuple[List[dict], Dict[str, str]]:
+    """Rows of every header block of *text*, in document order, and the sigla aliases used."""
     blocks = extract_blocks_with_orgao(text)
+    sigla_aliases: Dict[str, str] = {}
+    if enable_ia:
+        # Todas as siglas do documento num só cdist; parse_header encontra-as já resolvidas.
+        sigla_aliases = normalize_siglas(split_header(b["header"])[0].strip() for b in blocks)
     all_rows: List[dict] = []
     for b in blocks:
         all_rows.extend(to_rows_from_block(
@@ -143,6 +131,22 @@ def extract_to_csv(
                 ord_reset=ord_reset,
                 enable_ia=False
             ))
+    return all_rows, sigla_aliases
+
+def extract_to_csv(
+    in_path: str,
+    out_csv: str,
+    orgao: Optional[str] = None,
+    ord_reset: bool = True,
+    enable_ia: bool = True,
+    models_dir: Optional[str] = None,
+    encoding: str = "utf-8-sig",
+) -> Dict:
+    dtmnfr = infer_dtmnfr_from_path(in_path)
+    text = parse_docx(in_path)
+    all_rows, sigla_aliases = extract_block_rows(text, dtmnfr, orgao, ord_reset, enable_ia)
+    import pandas as pd
+
     safe_rows = sanitize_rows(all_rows)
     df = pd.DataFrame(safe_rows, columns=CSV_COLUMNS).fillna("")
     if not df.empty:
@@ -153,4 +157,5 @@ def extract_to_csv(
         "rows": int(df.shape[0]),
         "orgoes": sorted(list(set(df["ORGAO"].unique()))) if "ORGAO" in df else [],
         "siglas": sorted(list(set(df["SIGLA"].unique()))) if "SIGLA" in df else [],
+        "sigla_aliases": sigla_aliases,
     }
@@ -1,5 +1,5 @@
 import re
-from typing import List, Tuple
+from typing import Iterator, List, Optional, Tuple
 
 EFETIVOS_REGEX  = re.compile(r'Candidatos?\s+efe?etivos?:?', re.IGNORECASE)  # efetivos/efectivos
 SUPLENTES_REGEX = re.compile(r'Candidatos?\s+suplentes?:?', re.IGNORECASE)
@@ -12,18 +12,70 @@ def normalize_whitespace(text: str) -> str:
     text = re.sub(r'\s{2,}', ' ', text)
     return text.strip()
 
+_BULLET_RE = re.compile(r'^\s*[\-–—•]*\s*')
+_NUMBERING_RE = re.compile(r'^\s*\d+(?:\s*[\.\)\-º°]+)*\s*')
+# Troços de espaço em branco, menos o espaço simples (que fica tal como está).
+_WS_RUN_RE = re.compile(r'\s{2,}|[^\S ]')
+# Separadores que str.splitlines() reconhece (o \r já foi removido).
+_LINE_BREAKS = frozenset('\n\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029')
+
+def _clean_line(l: str) -> Optional[str]:
+    x = l.strip()
+    x = _BULLET_RE.sub('', x)      # bullets
+    # remove prefixos de numeração (1., 1), 1-, 1º, 1.º, 1° etc.)
+    x = _NUMBERING_RE.sub('', x)
+    x = x.strip(" -–—;:")
+    if x and not x.lower().startswith("nota"):
+        return x
+    return None
+
 def clean_lines(t: str) -> List[str]:
     lines = []
     for l in t.splitlines():
-        x = l.strip()
-        x = re.sub(r'^\s*[\-–—•]*\s*', '', x)      # bullets
-        # remove prefixos de numeração (1., 1), 1-, 1º, 1.º, 1° etc.)
-        x = re.sub(r'^\s*\d+(?:\s*[\.\)\-º°]+)*\s*', '', x)
-        x = x.strip(" -–—;:")
-        if x and not x.lower().startswith("nota"):
+        x = _clean_line(l)
+        if x:
             lines.append(x)
     return lines
 
+def _collapse_run(run: str) -> str:
+    """What normalize_whitespace leaves of one maximal whitespace run inside the text."""
+    if '\r' in run:
+        run = run.replace('\r', '')
+    if len(run) <= 1:
+        return ' ' if run in ('\t', '\u00A0') else run
+    # \s+\n reduz o troço a "\n" + o que vem depois do último \n; \s{2,} faz o resto " ".
+    last_nl = run.rfind('\n')
+    return '\n' if 0 < last_nl == len(run) - 1 else ' '
+
+def iter_normalized_lines(text: str) -> Iterator[str]:
+    """``clean_lines(normalize_whitespace(text))`` in a single pass, one line at a time.
+
+    Walks the whitespace runs of *text* once, collapsing each exactly as the
+    five ``re.sub`` passes of ``normalize_whitespace`` would, and cleans each
+    line as soon as it is complete.
+    """
+    end_of_text = len(text)
+    parts: List[str] = []
+    pos = 0
+    for m in _WS_RUN_RE.finditer(text):
+        start, end = m.span()
+        parts.append(text[pos:start])
+        pos = end
+        if start == 0 or end == end_of_text:
+            continue  # strip()
+        sep = _collapse_run(m.group())
+        if sep in _LINE_BREAKS:
+            x = _clean_line(''.join(parts))
+            if x:
+                yield x
+            parts = []
+        elif sep:
+            parts.append(sep)
+    parts.append(text[pos:])
+    x = _clean_line(''.join(parts))
+    if x:
+        yield x
+
 def split_candidates_by_type(text: str) -> Tuple[List[str], List[str]]:
     efetivos, suplentes = [], []
     e = EFETIVOS_REGEX.search(text)
@@ -0,0 +1,74 @@
+from pathlib import Path
+import io
+import sys
+import time
+import zipfile
+
+from docx import Document
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import main
+from app.main import app
+
+
+client = TestClient(app)
+
+
+def docx_bytes(sigla: str, names) -> bytes:
+    doc = Document()
+    doc.add_paragraph("Câmara Municipal")
+    doc.add_paragraph(f"Lista {sigla} - Denominação: Lista {sigla}")
+    for idx, name in enumerate(names, start=1):
+        doc.add_paragraph(f"{idx} {idx} {name}")
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def wait_for(job_id: str, timeout: float = 60.0) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        payload = client.get(f"/jobs/{job_id}").json()
+        if payload["status"] in ("done", "failed"):
+            return payload
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_batch_zip_combines_rows_and_isolates_failures(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "APP_DATA", str(tmp_path))
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("ps.docx", docx_bytes("PS", ["João Silva", "Maria Santos"]))
+        zf.writestr("pan/pan.docx", docx_bytes("PAN", ["Ana Dias"]))
+        zf.writestr("broken.docx", b"not a docx")
+        zf.writestr("readme.txt", b"ignored")
+
+    response = client.post(
+        "/extract/batch",
+        files=[
+            ("files", ("editais.zip", archive.getvalue(), "application/zip")),
+            ("files", ("be.docx", docx_bytes("BE", ["Rui Lima"]), "application/octet-stream")),
+        ],
+        data={"operator": "A", "enable_ia": "false"},
+    )
+    assert response.status_code == 202
+
+    payload = wait_for(response.json()["job_id"])
+    assert payload["status"] == "done", payload
+    manifest = payload["result"]
+    assert manifest["docs"] == 5
+    assert manifest["ok"] == 3
+    assert manifest["failed"] == 2
+    assert manifest["rows"] == 4
+    assert manifest["docs_per_s"] > 0
+    assert [doc["status"] for doc in manifest["documents"]] == ["ok", "ok", "failed", "failed", "ok"]
+
+    lines = Path(manifest["output_csv"]).read_text(encoding="utf-8-sig").splitlines()
+    assert len(lines) == 5
+    assert [line.split(";")[3] for line in lines[1:]] == ["PS", "PS", "PAN", "BE"]
+    assert Path(manifest["manifest"]).exists()
@@ -0,0 +1,105 @@
+from pathlib import Path
+import sys
+
+from docx import Document
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import extraction
+from extractor import document
+from extractor.pipeline import parse_docx
+
+
+def make_docx(path: Path) -> Path:
+    doc = Document()
+    doc.add_paragraph("Assembleia Municipal")
+    doc.add_paragraph("Lista PS - Denominação: PESSOAS â€“ ANIMAIS")
+    doc.add_paragraph("  ")
+    table = doc.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "1."
+    table.cell(0, 1).text = "JoÃ£o Silva"
+    doc.save(str(path))
+    return path
+
+
+def test_parsed_document_matches_parse_docx(tmp_path):
+    path = make_docx(tmp_path / "edital.docx")
+    parsed = document.load_docx(str(path))
+
+    assert parsed.text == parse_docx(str(path))
+    assert parsed.lines(True) == ["Assembleia Municipal", "Lista PS - Denominação: PESSOAS – ANIMAIS", "João Silva"]
+    assert parsed.lines(False) == parsed.lines(True)
+
+
+def test_enable_ia_fallback_parses_docx_once(tmp_path, monkeypatch):
+    path = make_docx(tmp_path / "edital.docx")
+    calls = []
+    real_iter = document.iter_docx_blocks
+
+    def counting_iter(src):
+        calls.append(src)
+        return real_iter(src)
+
+    monkeypatch.setattr(document, "iter_docx_blocks", counting_iter)
+
+    rows, _, _ = extraction.extract_rows(str(path), enable_ia=True, use_ner=False, ner_model_dir="")
+    assert rows == []
+    assert len(calls) == 1
+
+
+def test_tables_are_read_in_body_order(tmp_path):
+    doc = Document()
+    doc.add_paragraph("PS - Partido Socialista")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "Candidatos efetivos:\nMaria Santos"
+    table.cell(0, 1).text = "Candidatos suplentes:"
+    merged = table.cell(1, 0).merge(table.cell(1, 1))
+    merged.text = "Rui Costa"
+    doc.add_paragraph("CH - CHEGA").add_run().add_break()
+    doc.add_paragraph("fim\tdo edital")
+    path = tmp_path / "edital.docx"
+    doc.save(str(path))
+
+    assert list(document.iter_docx_paragraphs(str(path))) == [
+        "PS - Partido Socialista",
+        "Candidatos efetivos:\nMaria Santos",
+        "Candidatos suplentes:",
+        "Rui Costa",
+        "CH - CHEGA\n",
+        "fim\tdo edital",
+    ]
+
+
+def _double_encode(text: str) -> str:
+    return text.encode("utf-8").decode("latin-1")
+
+
+def test_encoding_diagnosis_and_uniform_repair(tmp_path):
+    lines = ["Assembleia de Freguesia", "Lista BE - Denominação: Bloco de Esquerda", "1 1 Inês Gonçalves"]
+    clean_doc = Document()
+    double_doc = Document()
+    for line in lines:
+        clean_doc.add_paragraph(line)
+        double_doc.add_paragraph(_double_encode(line))
+    clean_doc.save(str(tmp_path / "clean.docx"))
+    double_doc.save(str(tmp_path / "double.docx"))
+
+    clean = document.load_docx(str(tmp_path / "clean.docx"))
+    double = document.load_docx(str(tmp_path / "double.docx"))
+    mixed = document.load_docx(str(make_docx(tmp_path / "mixed.docx")))
+
+    assert clean.encoding.kind == "clean"
+    assert double.encoding.to_dict() == {"kind": "double_encoded", "segments": 2, "mojibake": 2, "codec": "latin-1"}
+    assert mixed.encoding.kind == "mixed"
+    # A reparação ao nível do documento dá o mesmo que a limpeza string a string.
+    per_string = "\n".join(p.clean for p in double.paragraphs if p.clean)
+    assert double.text == per_string == clean.text
+
+
+def test_encoding_diagnosis_is_reported_in_metadata(tmp_path):
+    path = make_docx(tmp_path / "edital.docx")
+    _, meta, _ = extraction.extract_rows(str(path), enable_ia=False, use_ner=False, ner_model_dir="")
+    assert meta["encoding"]["kind"] == "mixed"
+    assert "needs_review" in meta
@@ -0,0 +1,102 @@
+import dataclasses
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from docx import Document
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import engines, main
+from app.main import app
+from extractor.document import load_document
+
+client = TestClient(app)
+
+OPTIONS = {"enable_ia": False, "ner_model_dir": "", "orgao": None, "ord_reset": True}
+
+
+def make_docx(path: Path) -> Path:
+    doc = Document()
+    for line in (
+        "Assembleia Municipal",
+        "Lista PS - Denominação: Partido Socialista",
+        "1 1 João Silva",
+        "2 2 Maria Santos",
+    ):
+        doc.add_paragraph(line)
+    doc.save(str(path))
+    return path
+
+
+def wait_for(job_id: str, timeout: float = 60.0) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        payload = client.get(f"/jobs/{job_id}").json()
+        if payload["status"] in ("done", "failed"):
+            return payload
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_best_engine_wins_and_failures_are_reported(tmp_path, monkeypatch):
+    def broken(document, options):
+        raise RuntimeError("sem modelo")
+
+    monkeypatch.setitem(engines.ENGINES, "vazio", engines.Engine("vazio", lambda document, options: ([], {})))
+    monkeypatch.setitem(engines.ENGINES, "falha", engines.Engine("falha", broken))
+    document = load_document(str(make_docx(tmp_path / "edital.docx")))
+
+    results = engines.run_engines(document, ["vazio", "falha", "rules"], OPTIONS, workers=1)
+    assert [r.summary().get("rows") for r in results] == [0, None, 2]
+    assert results[1].error == "RuntimeError: sem modelo"
+    assert engines.best_result(results).name == "rules"
+    # Empate: ganha o primeiro pedido.
+    assert engines.best_result(results[:2]).name == "vazio"
+
+
+def test_process_engines_run_on_the_task_executor_and_report_clean_text(tmp_path, monkeypatch):
+    monkeypatch.setitem(engines.ENGINES, "blocks", dataclasses.replace(engines.ENGINES["blocks"], process=True))
+    document = load_document(str(make_docx(tmp_path / "edital.docx")))
+
+    serial = engines.run_engines(document, ["rules", "blocks"], OPTIONS, workers=1)
+    parallel = engines.run_engines(document, ["rules", "blocks"], OPTIONS, workers=2)
+    assert [r.rows for r in parallel] == [r.rows for r in serial]
+    # O motor "blocks" correu noutro processo: o seu clean_text vem no resultado.
+    assert sum(parallel[1].clean_text.values()) > 0 and not parallel[0].clean_text
+    assert not serial[1].clean_text
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError, match="turbo"):
+        engines.parse_engine_names("rules, turbo")
+    assert engines.parse_engine_names(" rules,blocks,rules ") == ["rules", "blocks"]
+
+
+def test_extract_with_engines_records_the_winner(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "APP_DATA", str(tmp_path))
+    monkeypatch.setattr(main.CACHE, "root", tmp_path / "cache")
+    docx = make_docx(tmp_path / "edital.docx")
+    with docx.open("rb") as handle:
+        response = client.post(
+            "/extract",
+            files={"file": (docx.name, handle, "application/octet-stream")},
+            data={"operator": "A", "enable_ia": "false", "engines": "blocks,rules"},
+        )
+    assert response.status_code == 202
+    result = wait_for(response.json()["job_id"])["result"]
+    assert result["engine"] == "rules" and result["rows"] == 2
+    assert set(result["engines"]) == {"blocks", "rules"}
+    assert result["engines"]["rules"]["rows"] == 2 and "seconds" in result["engines"]["blocks"]
+
+    with docx.open("rb") as handle:
+        bad = client.post(
+            "/extract",
+            files={"file": (docx.name, handle, "application/octet-stream")},
+            data={"operator": "A", "engines": "turbo"},
+        )
+    assert bad.status_code == 400
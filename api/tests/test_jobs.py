@@ -0,0 +1,207 @@
+from pathlib import Path
+import hashlib
+import json
+import sys
+import time
+
+import pytest
+from docx import Document
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import main, uploads
+from app.result_cache import ResultCache
+from app.main import app
+
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(main.CACHE, "root", tmp_path / "cache")
+
+
+def make_docx(path: Path) -> Path:
+    doc = Document()
+    for line in (
+        "Assembleia Municipal",
+        "Lista PS - Denominação: Partido Socialista",
+        "1 1 João Silva",
+        "2 2 Maria Santos",
+    ):
+        doc.add_paragraph(line)
+    doc.save(str(path))
+    return path
+
+
+def wait_for(job_id: str, timeout: float = 60.0) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        payload = client.get(f"/jobs/{job_id}").json()
+        if payload["status"] in ("done", "failed"):
+            return payload
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def post_extract(docx: Path):
+    with docx.open("rb") as handle:
+        return client.post(
+            "/extract",
+            files={"file": (docx.name, handle, "application/octet-stream")},
+            data={"operator": "A", "enable_ia": "false"},
+        )
+
+
+def test_extract_returns_job_and_completes(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "APP_DATA", str(tmp_path))
+    docx = make_docx(tmp_path / "edital.docx")
+
+    response = post_extract(docx)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    payload = wait_for(job_id)
+    assert payload["status"] == "done", payload
+    result = payload["result"]
+    assert result["rows"] == 2
+    assert result["siglas"] == ["PS"]
+    assert Path(result["output_csv"]).exists()
+
+
+def test_uploads_in_same_second_do_not_collide(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "APP_DATA", str(tmp_path))
+    docx = make_docx(tmp_path / "edital.docx")
+
+    first = post_extract(docx).json()["job_id"]
+    second = post_extract(docx).json()["job_id"]
+    assert first != second
+
+    outputs = {wait_for(job)["result"]["output_csv"] for job in (first, second)}
+    assert len(outputs) == 2
+
+
+def test_unknown_job_returns_404():
+    assert client.get("/jobs/does-not-exist").status_code == 404
+
+
+def test_upload_is_hashed_while_streaming(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "APP_DATA", str(tmp_path))
+    docx = make_docx(tmp_path / "edital.docx")
+
+    payload = wait_for(post_extract(docx).json()["job_id"])
+    assert payload["result"]["sha256"] == hashlib.sha256(docx.read_bytes()).hexdigest()
+
+
+def test_oversized_upload_returns_413(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "APP_DATA", str(tmp_path))
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 1024)
+    big = tmp_path / "big.docx"
+    big.write_bytes(b"x" * 4096)
+
+    before = set(main.JOBS._jobs)
+    response = post_extract(big)
+    assert response.status_code == 413
+    assert not list(tmp_path.glob("upload_*"))
+    # O pedido recusado não deixa um job falhado no histórico.
+    assert set(main.JOBS._jobs) == before
+
+
+def test_repeat_extract_is_served_from_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "APP_DATA", str(tmp_path))
+    docx = make_docx(tmp_path / "edital.docx")
+
+    first = wait_for(post_extract(docx).json()["job_id"])
+    assert first["result"]["cached"] is False
+
+    response = post_extract(docx)
+    assert response.status_code == 200
+    second = response.json()
+    assert second["status"] == "done"
+    assert second["result"]["cached"] is True
+    assert second["result"]["rows"] == first["result"]["rows"]
+    assert second["result"]["output_csv"] != first["result"]["output_csv"]
+    assert Path(second["result"]["output_csv"]).read_bytes() == Path(first["result"]["output_csv"]).read_bytes()
+
+
+def test_same_bytes_under_another_municipality_are_not_served_from_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "APP_DATA", str(tmp_path))
+    almada = make_docx(tmp_path / "1503_Almada.docx")
+    lisboa = tmp_path / "1106_Lisboa.docx"
+    lisboa.write_bytes(almada.read_bytes())
+
+    first = wait_for(post_extract(almada).json()["job_id"])["result"]
+    response = post_extract(lisboa)
+    assert response.status_code == 202
+    second = wait_for(response.json()["job_id"])["result"]
+    assert second["cached"] is False
+    assert "1503000000" in Path(first["output_csv"]).read_text(encoding="utf-8-sig")
+    assert "1106000000" in Path(second["output_csv"]).read_text(encoding="utf-8-sig")
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=2500)
+    for name in ("a", "b", "c"):
+        csv_path = tmp_path / f"{name}.csv"
+        csv_path.write_bytes(b"x" * 1000)
+        cache.put(name, {"output_csv": str(csv_path), "qa_csv": None})
+        if name == "b":
+            assert cache.get("a", str(tmp_path / "restored.csv")) is not None
+
+    assert cache.get("a", str(tmp_path / "a2.csv")) is not None
+    assert cache.get("b", str(tmp_path / "b2.csv")) is None
+    assert cache.get("c", str(tmp_path / "c2.csv")) is not None
+
+
+def test_extract_stream_csv_matches_artifact(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "APP_DATA", str(tmp_path))
+    docx = make_docx(tmp_path / "edital.docx")
+
+    with docx.open("rb") as handle:
+        response = client.post(
+            "/extract?stream=csv",
+            files={"file": (docx.name, handle, "application/octet-stream")},
+            data={"operator": "A", "enable_ia": "false"},
+        )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    payload = wait_for(response.headers["x-job-id"])
+    assert payload["status"] == "done", payload
+    assert payload["result"]["rows"] == 2
+    assert response.content == Path(response.headers["x-output-csv"]).read_bytes()
+
+
+def test_extract_stream_ndjson_yields_rows_and_summary(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "APP_DATA", str(tmp_path))
+    docx = make_docx(tmp_path / "edital.docx")
+
+    with docx.open("rb") as handle:
+        response = client.post(
+            "/extract?stream=ndjson",
+            files={"file": (docx.name, handle, "application/octet-stream")},
+            data={"operator": "A", "enable_ia": "false"},
+        )
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["NOME_CANDIDATO"] for r in records[:-1]] == ["João Silva", "Maria Santos"]
+    assert records[-1]["_summary"]["rows"] == 2
+
+
+def test_metrics_report_stage_timings(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "APP_DATA", str(tmp_path))
+    docx = make_docx(tmp_path / "edital.docx")
+
+    response = post_extract(docx)
+    assert "upload;dur=" in response.headers["server-timing"]
+    payload = wait_for(response.json()["job_id"])
+    assert {"parse_docx", "linearize", "rules", "clean_text", "write_cne_csv"} <= set(payload["result"]["timings"])
+
+    body = client.get("/metrics").text
+    assert 'cne_stage_seconds_count{stage="rules"}' in body
+    assert "cne_result_cache_hit_ratio" in body
+    assert 'cne_rows_total{kind="extract"}' in body
@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import line_lexer as lx
+
+
+def test_each_line_gets_one_kind_and_its_fields():
+    tokens = list(
+        lx.lex_lines(
+            [
+                "Assembleia Municipal",
+                "Lista PS - Denominação: Partido Socialista",
+                "Sigla e denominação: PESSOAS â€“ ANIMAIS",
+                "Candidatos suplentes",
+                "3. João Silva - CDSPP",
+                "Coligação proposto por PPDPSD",
+                "   ",
+                "texto solto",
+            ]
+        )
+    )
+
+    assert [t.kind for t in tokens] == [
+        lx.ORGAO,
+        lx.HEADING,
+        lx.NOME_LISTA,
+        lx.MARKER,
+        lx.CANDIDATE,
+        lx.PROPONENTE,
+        lx.NOISE,
+    ]
+    orgao, heading, nome, marker, candidate, proponente, _ = tokens
+    assert orgao.orgao == "AM"
+    assert (heading.sigla, heading.nome_lista) == ("PS", "Partido Socialista")
+    assert nome.nome_lista == "PESSOAS – ANIMAIS" and nome.sigla is None
+    assert marker.tipo == "3"
+    assert candidate.order == ("3", "João Silva - CDSPP")
+    assert candidate.proponente == "CDS-PP"
+    assert proponente.proponente == "PPD/PSD"
+
+
+def test_fields_are_computed_only_when_read(monkeypatch):
+    calls = []
+    monkeypatch.setattr(lx, "find_sigla", lambda line: calls.append(line) or None)
+
+    token = lx.lex_line("Maria Santos")
+    assert not token.heading and not token.candidate
+    assert calls == []
+    assert token.sigla is None and token.sigla is None
+    assert calls == ["Maria Santos"]
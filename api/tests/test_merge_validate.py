@@ -37,6 +37,7 @@ def test_validate_endpoint_returns_ok_for_valid_csv(tmp_path):
     assert payload["ok"] is True
     assert payload["rows"] == 1
     assert payload["issues"] == []
+    assert "validate;dur=" in response.headers["server-timing"]
 
 
 def test_merge_endpoint_creates_file_and_reports_rows(tmp_path):
@@ -0,0 +1,90 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import party_registry
+from app.utils_party import find_sigla, normalize_proponente
+from extractor.ai import normalize_sigla
+
+
+@pytest.fixture(autouse=True)
+def default_registry(monkeypatch):
+    monkeypatch.setattr(party_registry, "PARTY_REGISTRY_CHECK_S", 0.0)
+    yield
+    party_registry.reload_registry()
+
+
+def _write(path: Path, body: str, mtime: float) -> None:
+    path.write_text(body, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_default_registry_keeps_previous_rules():
+    assert find_sigla("Lista PS - Partido Socialista") == "PS"
+    assert find_sigla("PS / PPD/PSD coligação") == "PPD/PSD"
+    assert find_sigla("Lista CHEGA") == "CHEGA"
+    assert find_sigla("PSX") is None
+    assert find_sigla("Coligação PPD/PSD.CDS-PP") == "PPD/PSD"
+    assert normalize_proponente("CDSPP e PPDPSD") == "CDS-PP e PPD/PSD"
+    assert normalize_sigla(" CDU ") == "PCP-PEV"
+
+
+def test_registry_file_is_reloaded_when_it_changes(tmp_path):
+    path = tmp_path / "partidos.yaml"
+    _write(path, "partidos:\n  - sigla: PS\n", 1_000_000)
+    party_registry.reload_registry(str(path))
+    assert find_sigla("Lista NOVA.ALIANCA") == "NOVA.ALIANCA"  # só pela COALITION_RE
+    assert find_sigla("Lista PAN") is None
+
+    _write(path, "partidos:\n  - sigla: PS\n  - sigla: PAN\n    aliases: [P.A.N]\n", 1_000_010)
+    assert find_sigla("Lista PAN") == "PAN"
+    assert normalize_proponente("P.A.N") == "PAN"
+
+
+def test_invalid_reload_keeps_previous_registry(tmp_path):
+    path = tmp_path / "partidos.yaml"
+    _write(path, "partidos:\n  - sigla: PAN\n", 1_000_000)
+    party_registry.reload_registry(str(path))
+
+    _write(path, "partidos:\n  - nome: sem sigla\n", 1_000_010)
+    assert find_sigla("Lista PAN") == "PAN"
+    with pytest.raises(ValueError, match="sem 'sigla'"):
+        party_registry.load_registry(str(path))
+
+
+def test_registry_change_invalidates_result_cache_keys(tmp_path):
+    from app.result_cache import cache_key
+
+    before = cache_key("abc", {"enable_ia": True})
+    path = tmp_path / "partidos.yaml"
+    _write(path, "partidos:\n  - sigla: PS\n", 1_000_000)
+    party_registry.reload_registry(str(path))
+    assert cache_key("abc", {"enable_ia": True}) != before
+
+
+def test_sigla_normalisation_is_batched_cached_and_persisted(tmp_path, monkeypatch):
+    from rapidfuzz import process
+
+    from extractor import ai
+
+    monkeypatch.setattr(ai, "SIGLA_CACHE_PATH", str(tmp_path / "sigla_aliases.json"))
+    monkeypatch.setattr(ai, "_aliases_for", None)
+    calls = []
+    cdist = process.cdist
+    monkeypatch.setattr(process, "cdist", lambda *a, **kw: calls.append(a[0]) or cdist(*a, **kw))
+
+    resolved = ai.normalize_siglas([" CDS-PP Lista", "CDU", "XYZ", "XYZ "])
+    assert resolved == {" CDS-PP Lista": "CDS-PP", "CDU": "PCP-PEV", "XYZ": "XYZ", "XYZ ": "XYZ"}
+    assert calls == [["CDS-PP Lista", "XYZ"]]
+    assert ai.normalize_sigla("XYZ") == "XYZ" and len(calls) == 1
+
+    # Outro processo (ou um reinício) lê as resoluções do ficheiro em vez de as recalcular.
+    monkeypatch.setattr(ai, "_aliases_for", None)
+    assert ai.normalize_sigla("CDS-PP Lista") == "CDS-PP" and len(calls) == 1
+    assert ai.sigla_aliases() == {"CDS-PP Lista": "CDS-PP", "CDU": "PCP-PEV", "XYZ": "XYZ"}
@@ -0,0 +1,108 @@
+import sys
+from functools import partial
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import extraction
+from app.batch import expand_uploads
+from app.jobs import JobStore
+from app.metrics import Timings
+from extractor import pdf
+from extractor.document import load_document
+
+
+def make_pdf(path: Path, pages: List[List[str]]) -> Path:
+    """Minimal text-only PDF (Helvetica), one list of lines per page."""
+    n = len(pages)
+    font_id = 3 + 2 * n
+    objects = {
+        1: "<< /Type /Catalog /Pages 2 0 R >>",
+        2: "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{3 + 2 * i} 0 R" for i in range(n)), n),
+        font_id: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for i, lines in enumerate(pages):
+        page_id, content_id = 3 + 2 * i, 4 + 2 * i
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        stream = "BT /F1 12 Tf 16 TL 72 780 Td " + " T* ".join(f"({line}) Tj" for line in lines) + " ET"
+        objects[content_id] = f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream"
+
+    out = b"%PDF-1.4\n"
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += f"{obj_id} 0 obj\n{objects[obj_id]}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    size = max(objects) + 1
+    out += f"xref\n0 {size}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offsets[i]:010d} 00000 n \n" for i in range(1, size)).encode()
+    out += f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+    return path
+
+
+PAGES = [
+    ["Assembleia Municipal", "Lista PS - Denominacao: Partido Socialista"],
+    ["1 Maria Santos", "2 Joao Costa"],
+    ["Lista BE - Denominacao: Bloco de Esquerda", "1 Rui Lopes"],
+]
+
+
+def test_page_ranges_are_stitched_back_in_order(tmp_path):
+    path = make_pdf(tmp_path / "edital.pdf", PAGES)
+    assert pdf.count_pages(str(path)) == 3
+    assert pdf.page_ranges(3, 2) == [(0, 2), (2, 3)]
+
+    serial = "".join(pdf.iter_pdf_text(str(path), workers=1))
+    parallel = "".join(pdf.iter_pdf_text(str(path), workers=2, pages_per_task=1))
+    assert parallel == serial == pdf.extract_page_range(str(path), 0, 3)
+    assert serial.index("Assembleia") < serial.index("Maria") < serial.index("Bloco")
+
+
+def test_page_ranges_use_the_shared_task_executor(tmp_path):
+    path = make_pdf(tmp_path / "edital.pdf", PAGES)
+    "".join(pdf.iter_pdf_text(str(path), workers=2, pages_per_task=1))
+    executor = pdf.TASKS.executor()
+    "".join(pdf.iter_pdf_text(str(path), workers=2, pages_per_task=1))
+    # O mesmo executor serve todos os documentos e nunca é criado com fork.
+    assert pdf.TASKS.executor() is executor
+    assert executor._mp_context.get_start_method() in ("forkserver", "spawn")
+
+
+def test_pdf_goes_through_the_document_pipeline(tmp_path):
+    path = make_pdf(tmp_path / "edital.bin", PAGES)
+    document = load_document(str(path))
+    assert document.lines(True)[:2] == ["Assembleia Municipal", "Lista PS - Denominacao: Partido Socialista"]
+
+    timings = Timings()
+    _, metadata, n_lines = extraction.extract_rows(
+        str(path), enable_ia=True, use_ner=False, ner_model_dir="", timings=timings
+    )
+    assert metadata["encoding"]["kind"] == "clean" and n_lines == 6
+    assert "parse_pdf" in timings.as_dict()
+
+
+def test_batch_accepts_pdf(tmp_path):
+    path = make_pdf(tmp_path / "edital.pdf", PAGES)
+    docs = expand_uploads([{"file": "edital.pdf", "path": str(path)}], str(tmp_path))
+    assert docs == [{"file": "edital.pdf", "path": str(path)}]
+
+
+def test_task_executor_works_in_a_job_worker_after_the_server_used_it(tmp_path):
+    path = make_pdf(tmp_path / "edital.pdf", PAGES)
+    # O servidor usa o TASKS primeiro (caminho de stream) e só depois arranca um worker.
+    text = "".join(pdf.iter_pdf_text(str(path), workers=2, pages_per_task=1))
+    store = JobStore(workers=1)
+    try:
+        future = store.submit_task(partial(pdf.load_pdf, workers=2, pages_per_task=1), str(path))
+        document = future.result(timeout=120)
+    finally:
+        store.shutdown()
+    assert document.lines(True) == load_document(str(path)).lines(True)
+    assert [p.raw for p in document.paragraphs] == text.splitlines()
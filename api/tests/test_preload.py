@@ -0,0 +1,70 @@
+from pathlib import Path
+import gc
+import sys
+
+import pytest
+import spacy
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import preload
+from app.learn import infer
+from app.main import app
+
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def isolated_models(monkeypatch):
+    monkeypatch.setattr(preload, "_MODELS", {})
+    infer._load_model.cache_clear()
+    yield
+    infer._load_model.cache_clear()
+    gc.unfreeze()
+
+
+def test_preload_warms_the_inference_cache(tmp_path):
+    model_dir = tmp_path / "ner_pt"
+    spacy.blank("pt").to_disk(model_dir)
+
+    state = preload.preload_ner(str(model_dir))
+
+    assert state.state == preload.READY
+    assert state.load_seconds is not None and state.warmup_seconds is not None
+    assert infer._load_model.cache_info().currsize == 1
+    infer.predict_rows(["1 João Silva"], model_dir=str(model_dir))
+    assert infer._load_model.cache_info().hits == 1
+
+    payload = client.get("/ready")
+    assert payload.status_code == 200
+    assert payload.json()["models"]["ner_pt"]["state"] == "ready"
+
+
+def test_ready_reports_failed_model_without_breaking_health(tmp_path):
+    state = preload.preload_ner(str(tmp_path / "missing"))
+    assert state.state == preload.FAILED
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["models"]["ner_pt"]["error"]
+    assert client.get("/health").status_code == 200
+
+
+def test_lazy_model_does_not_block_readiness():
+    preload.register("ner_pt", "/nao/existe")
+    assert client.get("/ready").json() == {
+        "ready": True,
+        "models": {
+            "ner_pt": {
+                "path": "/nao/existe",
+                "state": "lazy",
+                "load_seconds": None,
+                "warmup_seconds": None,
+                "error": None,
+            }
+        },
+    }
@@ -1,3 +1,5 @@
+import random
+import re
 import sys
 from pathlib import Path
 
@@ -7,7 +9,7 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from extractor.rules import clean_lines, split_candidates_by_type
+from extractor.rules import clean_lines, iter_normalized_lines, normalize_whitespace, split_candidates_by_type
 
 
 def test_clean_lines_removes_ordinals():
@@ -24,3 +26,50 @@ def test_split_candidates_handles_ordinals():
     efetivos, suplentes = split_candidates_by_type(content)
     assert efetivos == ["João Silva", "Maria Sousa"]
     assert suplentes == ["Ana Dias"]
+
+
+def _legacy_normalize_whitespace(text):
+    text = text.replace('\r', '')
+    text = re.sub(r'[\t\u00A0]+', ' ', text)
+    text = re.sub(r'\s+\n', '\n', text)
+    text = re.sub(r'\n{2,}', '\n', text)
+    text = re.sub(r'\s{2,}', ' ', text)
+    return text.strip()
+
+
+def _legacy_clean_lines(t):
+    lines = []
+    for l in t.splitlines():
+        x = l.strip()
+        x = re.sub(r'^\s*[\-–—•]*\s*', '', x)
+        x = re.sub(r'^\s*\d+(?:\s*[\.\)\-º°]+)*\s*', '', x)
+        x = x.strip(" -–—;:")
+        if x and not x.lower().startswith("nota"):
+            lines.append(x)
+    return lines
+
+
+GOLDEN_TEXTS = [
+    "",
+    " \r\n ",
+    "Lista A\r\n\r\n1.º João\t Silva \n\n  2) Maria\u00a0Sousa\n- Nota: rever\n• 3- Ana",
+    "a\n b\n\n c \n d\x0be\x85f",
+    "x\r\ny\rz \t\n\t w",
+    "Candidatos efetivos:\n1. Rui\n  \n\t\nCandidatos suplentes:\n1° Inês ;",
+]
+
+
+@pytest.mark.parametrize("text", GOLDEN_TEXTS)
+def test_fused_normaliser_matches_legacy_functions(text):
+    expected = _legacy_clean_lines(_legacy_normalize_whitespace(text))
+    assert list(iter_normalized_lines(text)) == expected
+    assert clean_lines(_legacy_normalize_whitespace(text)) == expected
+    assert normalize_whitespace(text) == _legacy_normalize_whitespace(text)
+
+
+def test_fused_normaliser_matches_legacy_on_random_text():
+    rng = random.Random(18)
+    alphabet = list(" \t\n\r\u00a0\x0b\x85 ") * 3 + list("ab1.)-º°–—•;:") + ["nota", "Nota ", "12.º ", "- "]
+    for _ in range(5000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 16)))
+        assert list(iter_normalized_lines(text)) == _legacy_clean_lines(_legacy_normalize_whitespace(text)), repr(text)
@@ -0,0 +1,164 @@
+import sys
+import time
+from pathlib import Path
+
+from docx import Document
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import main
+from app.extract_pipeline import process_document_lines
+from app.main import app
+from app.sections import IncrementalRules, split_sections
+
+client = TestClient(app)
+
+LINES = [
+    "Assembleia Municipal",
+    "Lista PS - Denominação: Partido Socialista",
+    "1 1 João Silva",
+    "2 2 Maria Santos",
+    "Lista BE",
+    "1 1 Rui Lopes",
+    "Assembleia de Freguesia de Cacilhas",
+    "Lista PS - Denominação: Partido Socialista",
+    "1 1 Ana Pires",
+]
+
+
+def make_docx(path: Path, lines) -> Path:
+    doc = Document()
+    for line in lines:
+        doc.add_paragraph(line)
+    doc.save(str(path))
+    return path
+
+
+def wait_for(job_id: str, timeout: float = 60.0) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        payload = client.get(f"/jobs/{job_id}").json()
+        if payload["status"] in ("done", "failed"):
+            return payload
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_sections_start_at_headings_and_orgao_switches():
+    sections = split_sections(LINES)
+    assert [len(s.items) for s in sections] == [1, 3, 2, 1, 2]
+    # A lista BE herda o nome da lista anterior, tal como na máquina de estados.
+    assert sections[2].start == ("AM", "PS", "Partido Socialista")
+    assert sections[4].lista == ("AF", "Assembleia de Freguesia de Cacilhas", "PS", "Partido Socialista")
+    # O mesmo texto noutro órgão não tem a mesma impressão digital.
+    assert sections[1].fingerprint != sections[4].fingerprint
+
+
+def test_fingerprint_ignores_context_the_heading_sets_again():
+    other = ["Assembleia Municipal", "Lista BE - Denominação: Bloco de Esquerda", "1 1 Rui Lopes"] + LINES[1:4]
+    # A lista PS tem SIGLA e NOME_LISTA próprios: a lista que a antecede não conta.
+    assert split_sections(other)[2].fingerprint == split_sections(LINES)[1].fingerprint
+    # A lista BE só traz a SIGLA: o órgão e o NOME_LISTA herdados continuam a contar.
+    assert split_sections(LINES)[2].used == ("AM", None, "Partido Socialista")
+
+
+def test_amended_version_reuses_unchanged_sections():
+    first = IncrementalRules()
+    assert list(first(LINES)) == process_document_lines(LINES)[0]
+
+    amended = LINES[:5] + ["1 1 Rui Lopes Costa", "2 2 Inês Pato"] + LINES[6:7]
+    second = IncrementalRules(previous=first.stored())
+    metadata = {}
+    assert list(second(amended, metadata)) == process_document_lines(amended)[0]
+    assert metadata == {"needs_review": False}
+    assert second.summary() == {"total": 4, "reused": 3, "extracted": 1}
+    assert second.changes() == {
+        "added": [],
+        "removed": [
+            {
+                "orgao": "AF",
+                "cabecalho_orgao": "Assembleia de Freguesia de Cacilhas",
+                "sigla": "PS",
+                "nome_lista": "Partido Socialista",
+            }
+        ],
+        "modified": [
+            {"orgao": "AM", "cabecalho_orgao": "Assembleia Municipal", "sigla": "BE", "nome_lista": "Partido Socialista"}
+        ],
+    }
+
+
+def test_removed_freguesia_is_reported_even_if_another_has_the_same_list():
+    caparica = ["Assembleia de Freguesia de Caparica"] + LINES[7:]
+    first = IncrementalRules()
+    list(first(LINES + caparica))
+
+    second = IncrementalRules(previous=first.stored())
+    list(second(LINES))
+    assert second.changes() == {
+        "added": [],
+        "removed": [
+            {
+                "orgao": "AF",
+                "cabecalho_orgao": "Assembleia de Freguesia de Caparica",
+                "sigla": "PS",
+                "nome_lista": "Partido Socialista",
+            }
+        ],
+        "modified": [],
+    }
+
+
+def test_extract_reports_lists_changed_since_previous(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "APP_DATA", str(tmp_path))
+    monkeypatch.setattr(main.CACHE, "root", tmp_path / "cache")
+    monkeypatch.setattr(main.SECTIONS, "root", tmp_path / "sections")
+
+    def post(path, **data):
+        with path.open("rb") as handle:
+            return client.post(
+                "/extract",
+                files={"file": (path.name, handle, "application/octet-stream")},
+                data={"operator": "A", "enable_ia": "false", **data},
+            )
+
+    v1 = make_docx(tmp_path / "v1.docx", LINES)
+    first = wait_for(post(v1).json()["job_id"])["result"]
+    assert first["sections"] == {"total": 5, "reused": 0, "extracted": 5}
+    assert "listas" not in first
+
+    v2 = make_docx(tmp_path / "v2.docx", LINES + ["Lista BE - Denominação: Bloco de Esquerda", "1 1 Luís Gonçalves"])
+    second = wait_for(post(v2, previous=first["sha256"]).json()["job_id"])["result"]
+    assert second["rows"] == first["rows"] + 1
+    assert second["sections"] == {"total": 6, "reused": 5, "extracted": 1}
+    assert second["listas"]["added"] == [
+        {
+            "orgao": "AF",
+            "cabecalho_orgao": "Assembleia de Freguesia de Cacilhas",
+            "sigla": "BE",
+            "nome_lista": "Bloco de Esquerda",
+        }
+    ]
+    assert second["listas"]["removed"] == second["listas"]["modified"] == []
+
+    assert post(v2, previous="0" * 64).status_code == 404
+
+
+def test_sections_in_a_process_pool_match_the_serial_walk():
+    lines = LINES * 3
+    metadata = {}
+    rows = list(IncrementalRules(workers=2, lines_per_task=4)(lines, metadata))
+    assert (rows, metadata) == process_document_lines(lines)
+    assert len(rows) == 12
+
+
+def test_single_walk_records_the_same_sections_as_the_split():
+    lines = LINES * 3
+    walked, split = IncrementalRules(workers=1), IncrementalRules(workers=2, lines_per_task=4)
+    walked_meta, split_meta = {}, {}
+    assert list(walked(lines, walked_meta)) == list(split(lines, split_meta)) == process_document_lines(lines)[0]
+    assert walked.stored() == split.stored()
+    assert walked_meta == split_meta == process_document_lines(lines)[1]
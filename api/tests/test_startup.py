@@ -0,0 +1,27 @@
+from pathlib import Path
+import json
+import subprocess
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.startup import HEAVY_MODULES, STARTUP_IMPORT_BUDGET_S
+
+
+def test_api_import_stays_light_and_within_budget():
+    # Interpretador novo: o sys.modules do pytest já tem docx/pandas carregados.
+    proc = subprocess.run(
+        [sys.executable, "-m", "app.startup", "--json"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    assert report["heavy_modules_loaded"] == [], report
+    assert report["import_seconds"] <= STARTUP_IMPORT_BUDGET_S, report
+    assert proc.returncode == 0
+    assert set(HEAVY_MODULES) >= {"spacy", "pandas", "docx"}
@@ -0,0 +1,113 @@
+import sys
+from pathlib import Path
+
+from docx import Document
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import extraction
+from app.table_extract import document_items, header_columns, read_candidate_table
+from extractor.document import load_docx
+
+
+def make_docx(path: Path) -> Path:
+    doc = Document()
+    doc.add_paragraph("Assembleia Municipal")
+    doc.add_paragraph("Lista PS - Denominação: Partido Socialista")
+    table = doc.add_table(rows=5, cols=3)
+    for row, values in enumerate(
+        [
+            ("N.º", "Nome", "Independente"),
+            ("1.", "Maria Santos", "Não"),
+            ("2.", "João Costa", "Sim"),
+            ("", "", ""),
+            ("1.", "Rui Lopes", ""),
+        ]
+    ):
+        for col, value in enumerate(values):
+            table.cell(row, col).text = value
+    table.cell(3, 0).merge(table.cell(3, 2)).text = "Candidatos suplentes"
+    doc.add_paragraph("Lista CH - Denominação: Chega")
+    doc.save(str(path))
+    return path
+
+
+def test_header_row_detection():
+    assert header_columns(["N.º de ordem", "Nome do candidato", "Efetivo/Suplente"]) == {
+        "NUM_ORDEM": 0,
+        "NOME_CANDIDATO": 1,
+        "TIPO": 2,
+    }
+    assert header_columns(["Nome", "Morada"]) is None
+    # Células com listas de nomes (como no edital de Almada) não são cabeçalhos.
+    assert read_candidate_table([["Candidatos efetivos: Ana Pires Rui Lopes Maria Santos Costa", "Candidatos suplentes: Rui"]]) is None
+
+
+def test_candidate_table_rows_take_the_list_context(tmp_path):
+    path = make_docx(tmp_path / "edital.docx")
+    document = load_docx(str(path))
+    items = document_items(document)
+    assert items[:2] == ["Assembleia Municipal", "Lista PS - Denominação: Partido Socialista"]
+    assert [(r["NUM_ORDEM"], r["NOME_CANDIDATO"], r["TIPO"], r["INDEPENDENTE"]) for r in items[2].rows] == [
+        ("1", "Maria Santos", "2", "0"),
+        ("2", "João Costa", "2", "1"),
+        ("1", "Rui Lopes", "3", "0"),
+    ]
+    assert items[3:] == ["Lista CH - Denominação: Chega"]
+
+    rows, _, _ = extraction.extract_rows(str(path), enable_ia=True, use_ner=False, ner_model_dir="")
+    assert [(r["ORGAO"], r["SIGLA"], r["NOME_LISTA"], r["NOME_CANDIDATO"], r["TIPO"]) for r in rows] == [
+        ("AM", "PS", "Partido Socialista", "Maria Santos", "2"),
+        ("AM", "PS", "Partido Socialista", "João Costa", "2"),
+        ("AM", "PS", "Partido Socialista", "Rui Lopes", "3"),
+    ]
+
+
+def test_list_summary_table_is_not_a_candidate_table(tmp_path):
+    assert header_columns(["Nome da lista", "Sigla", "Partido proponente"]) is None
+    assert header_columns(["N.º", "Denominação", "Sigla"]) is None
+    # Sem coluna de ordem nem de tipo, um "Nome" sozinho também não chega.
+    assert header_columns(["Nome", "Partido proponente"]) is None
+
+    doc = Document()
+    doc.add_paragraph("Assembleia Municipal")
+    table = doc.add_table(rows=3, cols=3)
+    for row, values in enumerate(
+        [
+            ("Nome da lista", "Sigla", "Partido proponente"),
+            ("Partido Socialista", "PS", "PS"),
+            ("Coligação Mais Almada", "PPD/PSD.CDS-PP", "PPD/PSD"),
+        ]
+    ):
+        for col, value in enumerate(values):
+            table.cell(row, col).text = value
+    doc.save(str(tmp_path / "resumo.docx"))
+
+    document = load_docx(str(tmp_path / "resumo.docx"))
+    assert document_items(document) == document.lines()
+
+
+def test_rows_without_order_number_are_skipped():
+    table = read_candidate_table([["N.º", "Nome"], ["1", "Ana Pires"], ["", "Total: 1 candidato"]])
+    assert [r["NOME_CANDIDATO"] for r in table.rows] == ["Ana Pires"]
+
+
+def test_title_row_above_the_header_keeps_its_list_heading(tmp_path):
+    doc = Document()
+    doc.add_paragraph("Assembleia Municipal")
+    doc.add_paragraph("Lista A - PCP-PEV - CDU - Coligação Democrática Unitária")
+    doc.add_paragraph("1 1 Rui Lopes")
+    table = doc.add_table(rows=3, cols=2)
+    table.cell(0, 0).merge(table.cell(0, 1)).text = "Lista B - BE - Bloco de Esquerda"
+    for row, values in enumerate([("N.º", "Nome"), ("1", "Ana Pires")], start=1):
+        for col, value in enumerate(values):
+            table.cell(row, col).text = value
+    path = tmp_path / "titulo.docx"
+    doc.save(str(path))
+
+    items = document_items(load_docx(str(path)))
+    assert items[-2] == "Lista B - BE - Bloco de Esquerda"
+    rows, _, _ = extraction.extract_rows(str(path), enable_ia=True, use_ner=False, ner_model_dir="")
+    assert [(r["SIGLA"], r["NOME_CANDIDATO"]) for r in rows][-1] == ("BE", "Ana Pires")
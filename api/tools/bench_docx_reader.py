@@ -0,0 +1,112 @@
+"""Benchmark: streaming DOCX reader vs the python-docx object model.
+
+Uso: python tools/bench_docx_reader.py [docx] [paginas]   (a partir de api/)
+
+Reads the Almada sample (or *docx*) and a synthetic edital of about
+*paginas* pages (default 500), built by repeating the sample's body, with
+the old python-docx ``load_docx`` (body paragraphs, then table cells) and
+with ``iter_docx_paragraphs``. Each read runs in a fresh process; the
+base RSS is measured after the imports, so the gap to the peak is the
+reader's own.
+"""
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+SAMPLE = ROOT.parent / "data" / "1503_Almada_441 Listas admitidas ASSEMBLEIA E CAMARA.docx"
+REPEAT = 3
+
+
+def legacy_paragraphs(path):
+    from docx import Document
+
+    doc = Document(path)
+    texts = [p.text for p in doc.paragraphs]
+    for tbl in doc.tables:
+        for row in tbl.rows:
+            for cell in row.cells:
+                texts.extend(p.text for p in cell.paragraphs)
+    return texts
+
+
+def stream_paragraphs(path):
+    from extractor.document import iter_docx_paragraphs
+
+    return list(iter_docx_paragraphs(path))
+
+
+READERS = {"python-docx": legacy_paragraphs, "streaming": stream_paragraphs}
+
+
+def make_synthetic(sample, pages, out):
+    """Repeat the sample's body until the document has about *pages* pages."""
+    with zipfile.ZipFile(sample) as src:
+        xml = src.read("word/document.xml").decode("utf-8")
+        app = src.read("docProps/app.xml").decode("utf-8") if "docProps/app.xml" in src.namelist() else ""
+        m = re.search(r"<Pages>(\d+)</Pages>", app)
+        copies = max(1, round(pages / int(m.group(1)))) if m else pages
+        start = xml.index(">", xml.index("<w:body")) + 1
+        end = xml.rindex("<w:sectPr")
+        body = xml[start:end]
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as dst:
+            for item in src.infolist():
+                data = src.read(item.filename)
+                if item.filename == "word/document.xml":
+                    data = (xml[:start] + body * copies + xml[end:]).encode("utf-8")
+                dst.writestr(item, data)
+    return copies
+
+
+def child(reader, path):
+    READERS[reader]  # noqa: B018 - falha cedo com um leitor desconhecido
+    # Importa antes de medir, para o pico de memória ser só o da leitura.
+    import docx  # noqa: F401
+    import extractor.document  # noqa: F401
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        n = len(READERS[reader](path))
+        best = min(best, time.perf_counter() - t0)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{n} {best:.4f} {before / 1024:.1f} {peak / 1024:.1f}")
+
+
+def run(reader, path):
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", reader, str(path)],
+        check=True, capture_output=True, text=True, cwd=str(ROOT),
+    ).stdout.split()
+    return int(out[0]), float(out[1]), float(out[2]), float(out[3])
+
+
+def main(argv):
+    if len(argv) > 1 and argv[1] == "--child":
+        child(argv[2], argv[3])
+        return
+    sample = Path(argv[1]) if len(argv) > 1 else SAMPLE
+    pages = int(argv[2]) if len(argv) > 2 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic = Path(tmp) / "edital_sintetico.docx"
+        copies = make_synthetic(sample, pages, synthetic)
+        docs = [(sample.name[:28], sample), (f"sintetico x{copies}", synthetic)]
+        print(f"{'documento':<30} {'leitor':<12} {'paragrafos':>10} {'tempo (s)':>10} {'RSS base (MB)':>14} {'pico RSS (MB)':>14}")
+        for label, path in docs:
+            for reader in READERS:
+                n, seconds, base, peak = run(reader, path)
+                print(f"{label:<30} {reader:<12} {n:>10} {seconds:>10.3f} {base:>14.1f} {peak:>14.1f}")
+        print(f"({os.path.getsize(synthetic) / 1e6:.1f} MB comprimidos no sintetico)")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,62 @@
+"""Microbenchmark: split/join mojibake repair vs the old sequential regexes.
+
+Uso: python tools/bench_mojibake.py [repeticoes]   (a partir de api/)
+
+Compares, per string, the old ``_apply_explicit_fixes`` (seven ``re.sub``)
+plus the token/accent rescans of ``_prefer_candidate`` against
+``repair_mojibake`` with both of its counts read.
+"""
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.utils_text import MOJIBAKE_TOKENS, repair_mojibake  # noqa: E402
+
+LEGACY_FIXES = [
+    (re.compile(r"â€“"), "–"),
+    (re.compile(r"â€”"), "—"),
+    (re.compile(r"â€œ"), "“"),
+    (re.compile(r"â€\u009d?"), "”"),
+    (re.compile(r"â€˜"), "‘"),
+    (re.compile(r"â€™"), "’"),
+    (re.compile(r"â€"), "€"),
+]
+LEGACY_ACCENT_RE = re.compile(r"[áéíóúâêôãõçÁÉÍÓÚÂÊÔÃÕÇ]")
+
+
+def new_repair(value):
+    repaired = repair_mojibake(value)
+    return repaired.text, repaired.mojibake > 0, repaired.mojibake, repaired.accents
+
+
+def legacy_repair(value):
+    for pattern, replacement in LEGACY_FIXES:
+        value = pattern.sub(replacement, value)
+    bad = any(tok in value for tok in MOJIBAKE_TOKENS)
+    repl = sum(value.count(tok) for tok in MOJIBAKE_TOKENS)
+    accents = len(LEGACY_ACCENT_RE.findall(value))
+    return value, bad, repl, accents
+
+
+SAMPLES = {
+    "ascii": "1 1 Maria Santos Pereira - PS",
+    "acentos": "Lista PS - Denominação: Coligação Mais Almada, Câmara Municipal",
+    "mojibake": "Lista PS - DenominaÃ§Ã£o: PESSOAS â€“ ANIMAIS â€“ NATUREZA",
+    "paragrafo": " ".join(["Inês de Saint-Maurice Esteves de Medeiros, Presidente da Câmara"] * 8),
+}
+
+
+def main(argv):
+    number = int(argv[1]) if len(argv) > 1 else 20000
+    print(f"{'amostra':<10} {'antigo (us)':>12} {'novo (us)':>10} {'ganho':>7}")
+    for name, text in SAMPLES.items():
+        old = min(timeit.repeat(lambda: legacy_repair(text), number=number, repeat=5)) / number * 1e6
+        new = min(timeit.repeat(lambda: new_repair(text), number=number, repeat=5)) / number * 1e6
+        print(f"{name:<10} {old:>12.2f} {new:>10.2f} {old / new:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
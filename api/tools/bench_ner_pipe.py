@@ -0,0 +1,118 @@
+"""Benchmark: NER engine with one ``nlp()`` call per candidate vs batched ``nlp.pipe``.
+
+Uso: python tools/bench_ner_pipe.py [modelo] [batch_size...]   (a partir de api/)
+
+Runs ``predict_rows`` over the Almada sample with the spaCy model at
+*modelo* (default ``$MODEL_PATH/ner_pt``). Without a model, a small one is
+trained on the spot with ``learn.train.build_nlp`` on the sample's own
+names. Timing covers the whole per-document NER stage.
+
+The sample's candidate lines are numbered by Word's automatic numbering,
+which is not part of the text, so they carry no order number and the NER
+engine would skip them. The benchmark numbers them again, restarting after
+each heading and efetivos/suplentes marker, as they read in the rendered
+edital. "antes" is the previous behaviour (``nlp(text)`` per candidate);
+"depois" is ``nlp.pipe`` at each *batch_size* (default 1 32 256). The rows
+must be identical.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.learn import infer  # noqa: E402
+from app.line_lexer import lex_lines  # noqa: E402
+from extractor.document import load_document  # noqa: E402
+
+SAMPLE = ROOT.parent / "data" / "1503_Almada_441 Listas admitidas ASSEMBLEIA E CAMARA.docx"
+REPEAT = 5
+
+
+def numbered_lines(path):
+    """The sample's lines with candidate lines numbered per block."""
+    out = []
+    counter = None
+    for token in lex_lines(load_document(str(path)).lines(True)):
+        if token.heading or token.orgao:
+            counter = None
+        elif token.tipo:
+            counter = 0
+        elif counter is not None:
+            counter += 1
+            out.append(f"{counter} {token.line}")
+            continue
+        out.append(token.line)
+    return out
+
+
+def train_model(lines, out_dir):
+    """Tiny NER model (blank pt + ner) trained on the sample's names."""
+    from spacy.training import Example
+
+    from app.learn.train import build_nlp
+
+    nlp = build_nlp()
+    examples = []
+    for line in lines:
+        if line[0].isdigit():
+            text = line.split(" ", 1)[1]
+            examples.append(Example.from_dict(nlp.make_doc(text), {"entities": [(0, len(text), "PERSON")]}))
+    random.seed(0)
+    optimizer = nlp.initialize(lambda: examples)
+    for _ in range(3):
+        random.shuffle(examples)
+        for start in range(0, len(examples), 16):
+            nlp.update(examples[start : start + 16], sgd=optimizer, drop=0.2)
+    nlp.to_disk(out_dir)
+    return str(out_dir)
+
+
+def per_call_names(nlp, texts, *, batch_size, n_process):
+    return [infer._extract_candidate_name(nlp(text), text) for text in texts]
+
+
+def best_of(fn):
+    times = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        rows = fn()
+        times.append(time.perf_counter() - started)
+    return min(times), rows
+
+
+def main(argv):
+    lines = numbered_lines(SAMPLE)
+    model_dir = argv[1] if len(argv) > 1 else os.path.join(os.environ.get("MODEL_PATH", "/app/models"), "ner_pt")
+    batch_sizes = [int(b) for b in argv[2:]] or [1, 32, 256]
+    with tempfile.TemporaryDirectory() as tmp:
+        if not Path(model_dir, "meta.json").exists():
+            model_dir = train_model(lines, Path(tmp) / "ner_pt")
+            print("modelo treinado para o benchmark:", model_dir)
+        nlp = infer._load_model(model_dir)
+        n = sum(1 for line in lines if line[0].isdigit())
+        print(f"{SAMPLE.name}: {len(lines)} linhas, {n} candidatos, pipeline {nlp.pipe_names}")
+
+        batched = infer._candidate_names
+        infer._candidate_names = per_call_names
+        try:
+            before, reference = best_of(lambda: infer.predict_rows(lines, model_dir))
+        finally:
+            infer._candidate_names = batched
+        print(f"antes  nlp(texto)        {before:7.3f} s/documento")
+
+        for batch_size in batch_sizes:
+            after, rows = best_of(lambda: infer.predict_rows(lines, model_dir, batch_size=batch_size))
+            same = "idêntico" if rows == reference else "DIFERENTE"
+            print(f"depois pipe batch={batch_size:<5} {after:7.3f} s/documento  ({before / after:.1f}x)  {same}")
+            if rows != reference:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,91 @@
+"""Benchmark: rule engine over list sections in a process pool vs the serial walk.
+
+Uso: python tools/bench_rules_sections.py [freguesias] [workers...]   (a partir de api/)
+
+Builds a synthetic district-wide Assembleia de Freguesia edital (default
+400 freguesias with 8 lists of 13 candidates each) and runs the rule
+engine over it serially (``process_document_lines``) and through
+``app.sections`` with each worker count (default 1 2 4). The rows must be
+identical. With one worker the sections are recorded during the serial walk
+(``walk_sections``); with more, ``split`` is the serial part (cleaning,
+lexing and cutting the lines into sections) and the rest goes to the
+shared ``app.jobs.TASKS`` executor (``TASK_WORKERS`` processes). Times are
+the best of ``REPEAT`` runs.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.extract_pipeline import process_document_lines  # noqa: E402
+from app.sections import IncrementalRules, extract_sections, split_sections  # noqa: E402
+
+LISTS = [
+    ("PS", "Partido Socialista"),
+    ("PPD/PSD", "Partido Social Democrata"),
+    ("BE", "Bloco de Esquerda"),
+    ("PCP-PEV", "CDU - Coligação Democrática Unitária"),
+    ("CDS-PP", "CDS - Partido Popular"),
+    ("IL", "Iniciativa Liberal"),
+    ("L", "LIVRE"),
+    ("PAN", "Pessoas-Animais-Natureza"),
+]
+REPEAT = 3
+NAMES = ["Ana Pires", "João Silva", "Maria Santos", "Rui Lopes", "Inês Pato", "Luís Gonçalves"]
+
+
+def synthetic_af(freguesias: int):
+    lines = []
+    for f in range(freguesias):
+        lines.append(f"Assembleia de Freguesia de Freguesia {f}")
+        for sigla, nome in LISTS:
+            lines.append(f"Lista {sigla} - Denominação: {nome}")
+            lines.append("Candidatos efetivos")
+            for n in range(1, 10):
+                lines.append(f"{n} {n} {NAMES[(f + n) % len(NAMES)]} {f}")
+            lines.append("Candidatos suplentes")
+            for n in range(1, 5):
+                lines.append(f"{n} {n} {NAMES[(f + n + 3) % len(NAMES)]} {f}")
+    return lines
+
+
+def best_of(fn):
+    times = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return min(times), result
+
+
+def main(argv):
+    freguesias = int(argv[1]) if len(argv) > 1 else 400
+    workers = [int(w) for w in argv[2:]] or [1, 2, 4]
+    lines = synthetic_af(freguesias)
+    print(f"{len(lines)} linhas, {freguesias * len(LISTS)} listas, {os.cpu_count()} CPU(s)")
+
+    elapsed, (reference, meta) = best_of(lambda: process_document_lines(lines))
+    print(f"serial        {elapsed:8.3f} s  {len(reference)} linhas de CNE")
+
+    started = time.perf_counter()
+    sections = split_sections(lines)
+    split = time.perf_counter() - started
+    started = time.perf_counter()
+    extract_sections(sections, workers=1)
+    print(f"  split {split:.3f} s + secções {time.perf_counter() - started:.3f} s ({len(sections)} secções)")
+
+    for n in workers:
+        metadata = {}
+        elapsed, rows = best_of(lambda: list(IncrementalRules(workers=n)(lines, metadata)))
+        same = rows == reference and metadata == meta
+        print(f"workers={n:<5} {elapsed:8.3f} s  {'idêntico' if same else 'DIFERENTE'}")
+        if not same:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
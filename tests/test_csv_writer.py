@@ -96,3 +96,19 @@ def test_write_cne_csv_uses_utf8_sig_and_semicolon(tmp_path: Path) -> None:
     assert rows
     first_row = rows[0]
     assert ";" in first_row
+
+
+def test_clean_column_matches_map_and_cleans_each_value_once() -> None:
+    from app import utils_text
+    from app.utils_text import clean_column, clean_text
+
+    values = pd.Series(["PESSOAS â€“ ANIMAIS", " PS ", None, "PESSOAS â€“ ANIMAIS", " PS "] * 200, name="NOME_LISTA")
+    utils_text._clean_text_memo.cache_clear()
+    before = utils_text.clean_text_stats()
+
+    cleaned = clean_column(values)
+
+    delta = utils_text.clean_text_stats_since(before)
+    assert delta["misses"] + delta["fast_path"] == 2
+    assert cleaned.equals(values.map(clean_text))
+    assert cleaned.iloc[:3].tolist() == ["PESSOAS – ANIMAIS", "PS", ""]
@@ -24,3 +24,66 @@ def test_clean_text_fixes_common_mojibake(dirty: str, expected: str) -> None:
     """Ensure ``clean_text`` fixes common mojibake patterns."""
 
     assert clean_text(dirty) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("  Maria Santos  ", "Maria Santos"),
+        ("Conceição Gonçalves ", "Conceição Gonçalves"),
+        ("A &amp; B", "A & B"),
+        ("JoÃ£o", "João"),
+    ],
+)
+def test_clean_text_fast_path_and_memo_match_full_clean(text: str, expected: str) -> None:
+    from app import utils_text
+
+    before = utils_text.clean_text_stats()
+    assert clean_text(text) == expected
+    assert clean_text(text) == expected
+    delta = utils_text.clean_text_stats_since(before)
+    if text.isascii() and "&" not in text:
+        assert delta == {"fast_path": 2, "hits": 0, "misses": 0, "uncached": 0, "already_clean": 0}
+    else:
+        assert delta["hits"] >= 1
+
+
+def test_clean_values_are_marked_and_not_cleaned_again() -> None:
+    from app.utils_text import CleanText, sanitize_rows
+
+    name = clean_text("JoÃ£o Silva")
+    assert isinstance(name, CleanText)
+    rows = sanitize_rows([{"NOME_CANDIDATO": name, "TIPO": "2", "SIGLA": " PS "}])
+    assert rows[0]["NOME_CANDIDATO"] is name
+    assert rows[0] == {"NOME_CANDIDATO": "João Silva", "TIPO": "2", "SIGLA": "PS"}
+    # Derivados perdem a marca e voltam a ser limpos.
+    assert not isinstance(name.upper(), CleanText)
+
+
+def test_non_idempotent_result_is_left_unmarked() -> None:
+    from app.utils_text import CleanText
+
+    once = clean_text("â€")
+    assert once == "”" and not isinstance(once, CleanText)
+    assert clean_text(once) == '"'
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        # Só as correções explícitas de "â€"; o resto fica para o candidato latin-1.
+        ("DenominaÃ§Ã£o", "DenominaÃ§Ã£o"),
+        ("PESSOAS â€“ ANIMAIS", "PESSOAS – ANIMAIS"),
+        ("â€œCDUâ€\x9d", "“CDU”"),
+        ("â€x", "”x"),
+        ("â€â€œ", "”“"),
+        # Como nos re.sub em sequência, "â€\x9d?" apanha o "â€" antes da regra de "™".
+        ("dâ€™Ãvila", "d”™Ãvila"),
+    ],
+)
+def test_repair_mojibake_single_pass(text: str, expected: str) -> None:
+    from app.utils_text import repair_mojibake
+
+    repaired = repair_mojibake(text)
+    assert repaired.text == expected
+    assert repaired.mojibake == sum(expected.count(tok) for tok in ("Ã", "Â", "â", "�"))
@@ -25,11 +25,16 @@ class _FakeDoc:
 
 
 class _FakeNLP:
+    pipe_names = ["ner"]
+
     def __call__(self, text: str) -> _FakeDoc:
         if "João" in text:
             return _FakeDoc([_FakeEnt("João", "PERSON")])
         return _FakeDoc([])
 
+    def pipe(self, texts, **kwargs):
+        return (self(text) for text in texts)
+
 
 @pytest.fixture(autouse=True)
 def patch_model(monkeypatch: pytest.MonkeyPatch) -> None:
@@ -49,3 +54,30 @@ def test_predict_rows_extracts_basic_candidate_data() -> None:
     assert rows[0]["NOME_CANDIDATO"] == "João"
     assert rows[1]["NUM_ORDEM"] == "2"
     assert rows[1]["NOME_CANDIDATO"] == "Maria Santos"
+
+
+def test_batched_pipe_matches_one_call_per_candidate(monkeypatch: pytest.MonkeyPatch) -> None:
+    spacy = pytest.importorskip("spacy")
+    from spacy.language import Language
+    from spacy.tokens import Span
+
+    @Language.component("test_per_to_person")
+    def per_to_person(doc):
+        doc.ents = [Span(doc, ent.start, ent.end, label="PERSON") for ent in doc.ents]
+        return doc
+
+    nlp = spacy.blank("pt")
+    nlp.add_pipe("entity_ruler").add_patterns([{"label": "PER", "pattern": "Ana Pires"}])
+    # Componente depois do ner que não está em nenhuma lista: tem de correr no pipe.
+    nlp.add_pipe("test_per_to_person")
+    monkeypatch.setattr(infer, "_load_model", lambda model_dir="": nlp)
+
+    lines = ["Lista PS", "1 Dra. Ana Pires", "2 Rui Lopes, suplente", "3 Dra. Ana Pires"]
+    rows = infer.predict_rows(lines, model_dir="x", batch_size=2)
+
+    def per_call(nlp, texts, *, batch_size, n_process):
+        return [infer._extract_candidate_name(nlp(text), text) for text in texts]
+
+    monkeypatch.setattr(infer, "_candidate_names", per_call)
+    assert rows == infer.predict_rows(lines, model_dir="x")
+    assert [r["NOME_CANDIDATO"] for r in rows] == ["Ana Pires", "Rui Lopes", "Ana Pires"]